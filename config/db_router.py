@@ -0,0 +1,157 @@
+"""
+Routing of read-only API traffic to database replicas.
+
+Reads are sent to a replica only inside a ``replica_reads`` block, which the
+read-only views open around each request. Everything else, including reads
+inside a transaction on the primary, stays on ``default``. Customers whose
+loans or limits were just written are pinned to the primary for
+``REPLICA_STICKY_SECONDS``, so they read their own writes while the
+replicas catch up.
+"""
+
+import random
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+_read_alias = ContextVar("replica_read_alias", default=None)
+
+
+def replica_aliases():
+    """
+    Returns the configured replica aliases.
+    """
+
+    return [
+        alias
+        for alias in getattr(settings, "DATABASE_REPLICAS", ())
+        if alias in settings.DATABASES
+    ]
+
+
+def _pin_key(customer_id):
+    return f"replica-pin:customer:{customer_id}"
+
+
+def _pin_cache():
+    return caches[getattr(settings, "REPLICA_STICKY_CACHE", "default")]
+
+
+def pin_customers(customer_ids):
+    """
+    Sends the customers' reads to the primary for ``REPLICA_STICKY_SECONDS``.
+
+    Pins are kept in the ``REPLICA_STICKY_CACHE`` cache, which must be
+    shared between processes for stickiness to hold across workers.
+    """
+
+    seconds = getattr(settings, "REPLICA_STICKY_SECONDS", 5)
+    keys = [_pin_key(customer_id) for customer_id in customer_ids if customer_id is not None]
+    if keys and seconds > 0 and replica_aliases():
+        _pin_cache().set_many(dict.fromkeys(keys, True), timeout=seconds)
+
+
+def pin_customers_on_commit(customer_ids):
+    """
+    Pins the customers once the surrounding transaction commits.
+
+    The replicas can only fall behind a write once it is committed.
+    """
+
+    customer_ids = list(customer_ids)
+    if replica_aliases():
+        transaction.on_commit(lambda: pin_customers(customer_ids))
+
+
+def is_pinned(customer_ids):
+    keys = [_pin_key(customer_id) for customer_id in customer_ids if customer_id is not None]
+    return bool(keys) and bool(_pin_cache().get_many(keys))
+
+
+async def ais_pinned(customer_ids):
+    keys = [_pin_key(customer_id) for customer_id in customer_ids if customer_id is not None]
+    return bool(keys) and bool(await _pin_cache().aget_many(keys))
+
+
+@contextmanager
+def replica_reads(customer_ids=()):
+    """
+    Routes the block's reads to a randomly chosen replica.
+
+    Reads stay on the primary when no replica is configured or any of the
+    given customers is pinned.
+
+    Args:
+        customer_ids: Customers the reads concern.
+
+    Yields:
+        str: The alias reads are routed to, which is ``default`` inside a
+        transaction.
+    """
+
+    aliases = replica_aliases()
+    alias = None
+    if aliases and not is_pinned(customer_ids):
+        alias = random.choice(aliases)
+    token = _read_alias.set(alias)
+    try:
+        yield current_read_alias()
+    finally:
+        _read_alias.reset(token)
+
+
+@asynccontextmanager
+async def areplica_reads(customer_ids=()):
+    """
+    Async variant of ``replica_reads`` for the async views.
+
+    The pin lookup uses the cache's async API. The alias is kept in a
+    context variable, which ``sync_to_async`` carries into the threads
+    running the async ORM queries.
+    """
+
+    aliases = replica_aliases()
+    alias = None
+    if aliases and not await ais_pinned(customer_ids):
+        alias = random.choice(aliases)
+    token = _read_alias.set(alias)
+    try:
+        yield current_read_alias()
+    finally:
+        _read_alias.reset(token)
+
+
+def current_read_alias():
+    """
+    Returns the alias reads are routed to right now.
+    """
+
+    alias = _read_alias.get()
+    # Reads inside a write transaction must see its writes.
+    if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+class ReplicaRouter:
+    """
+    Sends reads inside ``replica_reads`` to a replica and everything else
+    to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _read_alias.get() is None:
+            return None
+        return current_read_alias()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
@@ -0,0 +1,27 @@
+"""
+Gunicorn configuration for serving the project over ASGI.
+
+Run with::
+
+    gunicorn config.asgi:application -c config/gunicorn_asgi.py
+
+Each worker is a uvicorn event loop, so one process serves many idle
+keep-alive connections and the async views (``/api/async/...``) wait on the
+database without holding a thread. Sync DRF views still work; Django runs
+them in a per-request thread. Settings can be overridden from the environment.
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = "uvicorn.workers.UvicornWorker"
+# Event loop workers are CPU bound, not thread bound: one per core is enough.
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count()))
+# Keep partner connections open between requests instead of reconnecting.
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 75))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = 30
+# Recycle workers now and then to bound memory growth.
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = 1000
@@ -0,0 +1,105 @@
+import os
+
+from django.http import HttpResponse
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+LABELS = ("url_name", "method")
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Total time spent handling a request, middleware included.",
+    LABELS,
+)
+VIEW_SECONDS = Histogram(
+    "http_request_view_duration_seconds",
+    "Time spent in the view, before the response is rendered.",
+    LABELS,
+)
+SERIALIZE_SECONDS = Histogram(
+    "http_request_serialize_duration_seconds",
+    "Time spent rendering the response body.",
+    LABELS,
+)
+DB_SECONDS = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent executing SQL queries.",
+    LABELS,
+)
+DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Number of SQL queries executed.",
+    LABELS,
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, float("inf")),
+)
+
+DECISION_CACHE_HITS = Counter(
+    "loan_decision_cache_hits",
+    "Eligibility decisions answered from the decision cache.",
+    ("backend",),
+)
+DECISION_CACHE_MISSES = Counter(
+    "loan_decision_cache_misses",
+    "Eligibility decisions computed on a decision cache miss.",
+    ("backend",),
+)
+DECISION_CACHE_EVICTIONS = Counter(
+    "loan_decision_cache_evictions",
+    "Decisions dropped from the in-process decision cache to make room.",
+    ("backend",),
+)
+REDIS_EVICTED_KEYS = Gauge(
+    "loan_decision_cache_redis_evicted_keys",
+    "Keys evicted by the decision cache's Redis server, as reported by INFO.",
+    multiprocess_mode="max",
+)
+
+
+def observe_request(url_name, method, timings):
+    """
+    Records the timings of one request in the histograms.
+
+    Args:
+        url_name (str): Name of the matched URL pattern.
+        method (str): HTTP method of the request.
+        timings (RequestTimings): Timings collected by ``RequestMetricsMiddleware``.
+    """
+
+    labels = (url_name, method)
+    REQUEST_SECONDS.labels(*labels).observe(timings.total)
+    VIEW_SECONDS.labels(*labels).observe(timings.view)
+    SERIALIZE_SECONDS.labels(*labels).observe(timings.serialize)
+    DB_SECONDS.labels(*labels).observe(timings.db)
+    DB_QUERIES.labels(*labels).observe(timings.queries)
+
+
+def metrics_view(request):
+    """
+    Serves the request histograms and decision cache counters in the
+    Prometheus text format.
+
+    When ``PROMETHEUS_MULTIPROC_DIR`` is set, every worker process writes its
+    samples to that directory and they are merged here, so a scrape sees the
+    whole deployment rather than the worker that happened to answer it.
+    """
+
+    # Imported here, as the cache module records into the metrics above.
+    from loan_management.cache import get_decision_cache
+
+    cache = get_decision_cache()
+    if cache is not None:
+        cache.export_metrics()
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,157 @@
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from config.metrics import observe_request
+
+_current_timings = ContextVar("request_timings", default=None)
+
+
+class RequestTimings:
+    """
+    Timings of a single request, in seconds.
+
+    Attributes:
+        queries: Number of SQL queries executed on any database.
+        db: Time spent executing those queries.
+        view: Time spent in the view, excluding rendering.
+        serialize: Time spent rendering the response body.
+        total: Time spent in the whole middleware chain.
+    """
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.db = 0.0
+        self.view = 0.0
+        self.serialize = 0.0
+        self.total = 0.0
+        self.view_started = None
+        self.render_started = None
+
+    def server_timing(self):
+        return ", ".join(
+            [
+                f'db;dur={self.db * 1000:.2f};desc="{self.queries} queries"',
+                f"view;dur={self.view * 1000:.2f}",
+                f"serialize;dur={self.serialize * 1000:.2f}",
+                f"total;dur={self.total * 1000:.2f}",
+            ]
+        )
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper adding a query to the timings of the current request.
+
+    The timings are found through a context variable, which asgiref carries
+    into the threads the async ORM runs queries in.
+    """
+
+    timings = _current_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.db += time.perf_counter() - started
+        timings.queries += 1
+
+
+@receiver(connection_created)
+def install_query_recorder(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures every request and reports it in ``Server-Timing`` and ``/metrics``.
+
+    SQL queries on every database are counted and timed by an execute
+    wrapper. Rendering of DRF and template responses is timed separately
+    from the view, since it happens after the view returns. Durations are
+    recorded in per URL name histograms (see ``config.metrics``).
+
+    The middleware runs natively under both WSGI and ASGI, so it never forces
+    async requests through a thread. It should be the first middleware, so
+    ``total`` covers the whole chain. Queries run while a streaming response
+    is consumed are not included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        for connection in connections.all(initialized_only=True):
+            install_query_recorder(connection)
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Hooks must match the handler's mode, or Django runs them in a thread.
+            process_view = self.process_view
+            process_template_response = self.process_template_response
+
+            async def aprocess_view(*args):
+                return process_view(*args)
+
+            async def aprocess_template_response(*args):
+                return process_template_response(*args)
+
+            self.process_view = aprocess_view
+            self.process_template_response = aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        timings, token, started = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        return self.finish(request, response, timings, started)
+
+    async def __acall__(self, request):
+        timings, token, started = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        return self.finish(request, response, timings, started)
+
+    def start(self, request):
+        timings = RequestTimings()
+        request.timings = timings
+        return timings, _current_timings.set(timings), time.perf_counter()
+
+    def finish(self, request, response, timings, started):
+        finished = time.perf_counter()
+        timings.total = finished - started
+        if timings.view_started is not None and timings.render_started is None:
+            timings.view = finished - timings.view_started - timings.serialize
+        response["Server-Timing"] = timings.server_timing()
+
+        match = request.resolver_match
+        url_name = match.url_name if match and match.url_name else "unmatched"
+        observe_request(url_name, request.method, timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timings.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        timings = request.timings
+        timings.render_started = time.perf_counter()
+        if timings.view_started is not None:
+            timings.view = timings.render_started - timings.view_started
+
+        def rendered(response):
+            timings.serialize = time.perf_counter() - timings.render_started
+
+        response.add_post_render_callback(rendered)
+        return response
@@ -0,0 +1,24 @@
+"""
+Settings running the tests against two local SQLite databases, a primary and
+a replica that is never replicated to, so the routing in ``config.db_router``
+can be observed:
+
+    python manage.py test --settings=config.replica_test_settings
+"""
+
+from config.settings import *  # noqa: F401,F403
+from config.settings import BASE_DIR
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "primary.sqlite3",
+    },
+    "replica": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": BASE_DIR / "replica.sqlite3",
+    },
+}
+DATABASE_REPLICAS = ["replica"]
+
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 import os
 from pathlib import Path
+from celery.schedules import crontab
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -46,6 +47,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -87,9 +89,40 @@ DATABASES = {
         "PORT": os.getenv("DB_PORT"),
         "USER": os.getenv("DB_USER"),
         "PASSWORD": os.getenv("DB_PASSWORD"),
+        # Lets CSV imports use LOAD DATA LOCAL INFILE.
+        "OPTIONS": {"local_infile": 1},
     }
 }
 
+# Read replicas as a comma-separated list of host[:port]. The read-only API
+# views read from them; see config/db_router.py.
+DATABASE_REPLICAS = []
+for index, replica in enumerate(filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(","))):
+    alias = "replica" if index == 0 else f"replica_{index + 1}"
+    host, _, port = replica.strip().partition(":")
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["config.db_router.ReplicaRouter"]
+
+# Seconds a customer's reads stay on the primary after their loans or limits
+# change, kept in the REPLICA_STICKY_CACHE cache.
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+REPLICA_STICKY_CACHE = "default"
+
+if os.getenv("DJANGO_CACHE_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("DJANGO_CACHE_URL"),
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -133,4 +166,52 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 CELERY_BROKER_URL = 'redis://localhost:6379/0'
-CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
\ No newline at end of file
+CELERY_RESULT_BACKEND = 'redis://localhost:6379/0'
+CELERY_BEAT_SCHEDULE = {
+    "nightly-portfolio-rescore": {
+        "task": "loan_management.tasks.rescore_portfolio",
+        "schedule": crontab(hour=2, minute=0),
+    },
+}
+
+# Load whole CSV imports with the database's native bulk loader where available.
+IMPORT_NATIVE_BULK_LOAD = os.getenv("IMPORT_NATIVE_BULK_LOAD", "true").lower() == "true"
+
+# Eligibility decision cache: "lru" (single process only), "redis", or empty to disable.
+# MAX_ENTRIES and MAX_VERSIONS bound the decisions and customer versions the
+# lru backend keeps.
+LOAN_DECISION_CACHE = {
+    "BACKEND": os.getenv("LOAN_DECISION_CACHE_BACKEND", ""),
+    "LOCATION": os.getenv("LOAN_DECISION_CACHE_URL", "redis://localhost:6379/1"),
+    "MAX_ENTRIES": 10000,
+    "MAX_VERSIONS": 10000,
+    "TIMEOUT": 24 * 60 * 60,
+}
+
+# Idempotency-Key support of create-loan. Keys are kept in the CACHE alias,
+# which must be shared between processes (see CACHES). Repeats wait up to
+# WAIT_TIMEOUT seconds for the first request; its claim expires after
+# LOCK_TIMEOUT seconds, plus LOCK_TIMEOUT_PER_ITEM seconds per application
+# of a bulk request, and stored responses after TIMEOUT seconds.
+LOAN_IDEMPOTENCY = {
+    "CACHE": "default",
+    "TIMEOUT": 24 * 60 * 60,
+    "LOCK_TIMEOUT": 60,
+    "LOCK_TIMEOUT_PER_ITEM": 0.01,
+    "WAIT_TIMEOUT": 10,
+    "POLL_INTERVAL": 0.05,
+}
+
+# Render the loan view endpoints from .values() rows with orjson instead of the
+# DRF serializers. The output is byte-identical; only disable it to compare.
+LOAN_LEAN_SERIALIZATION = os.getenv("LOAN_LEAN_SERIALIZATION", "true").lower() == "true"
+
+# Serve eligibility reads from the nightly score snapshot. Customers whose
+# loans, salary or limit changed since are scored live unless LIVE_IF_CHANGED
+# is off; MAX_AGE_DAYS allows reading an older snapshot.
+LOAN_SCORE_SNAPSHOTS = {
+    "ENABLED": os.getenv("LOAN_SCORE_SNAPSHOTS", "false").lower() == "true",
+    "MAX_AGE_DAYS": 0,
+    "LIVE_IF_CHANGED": True,
+    "KEEP_DAYS": 30,
+}
@@ -0,0 +1,782 @@
+import csv
+import hashlib
+import itertools
+import json
+import logging
+import mmap
+import os
+import time
+import uuid
+
+import openpyxl
+from celery import chord
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from customer_management.models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+MAX_REPORTED_REJECTS = 1000
+
+
+def iter_xlsx_rows(file_path, start_row=2, end_row=None):
+    """
+    Lazily yields the rows of the active sheet of an Excel file.
+
+    The workbook is opened in read-only mode, so rows are streamed from the
+    file instead of being loaded into memory up front.
+
+    Args:
+        file_path (str): The path to the Excel file.
+        start_row (int): First row to read; row 1 holds the headers.
+        end_row (int): Last row to read, or None to read to the end.
+
+    Yields:
+        tuple: The row number and a tuple of cell values.
+    """
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        rows = sheet.iter_rows(min_row=start_row, max_row=end_row, values_only=True)
+        for row_num, row in enumerate(rows, start=start_row):
+            yield row_num, row
+    finally:
+        workbook.close()
+
+
+def count_xlsx_rows(file_path):
+    """
+    Returns the number of rows in the active sheet of an Excel file.
+
+    The sheet dimensions are used when the file records them; otherwise the
+    rows are counted by streaming through the sheet.
+    """
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        if sheet.max_row is not None:
+            return sheet.max_row
+        return sum(1 for _ in sheet.iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+def iter_csv_rows(file_path, start_row=2, end_row=None):
+    """
+    Lazily yields the records of a CSV file with a header line.
+
+    Args:
+        file_path (str): The path to the CSV file.
+        start_row (int): First record to read; record 1 is the header.
+        end_row (int): Last record to read, or None to read to the end.
+
+    Yields:
+        tuple: The record number and a tuple of field values. Empty lines
+        are skipped.
+    """
+
+    with open(file_path, newline="", encoding="utf-8") as csv_file:
+        records = enumerate(csv.reader(csv_file), start=1)
+        for row_num, row in itertools.islice(records, start_row - 1, end_row):
+            if row:
+                yield row_num, tuple(row)
+
+
+def iter_jsonl_rows(file_path, columns, start_row=1, end_row=None):
+    """
+    Lazily yields the records of a JSON Lines file.
+
+    Each line holds either a list of values in column order or an object
+    keyed by column name, which is mapped onto ``columns``.
+
+    Args:
+        file_path (str): The path to the JSONL file.
+        columns (tuple): Column names in the order the row builders expect.
+        start_row (int): First line to read.
+        end_row (int): Last line to read, or None to read to the end.
+
+    Yields:
+        tuple: The line number and a tuple of values. Blank lines are skipped.
+    """
+
+    with open(file_path, encoding="utf-8") as jsonl_file:
+        lines = enumerate(jsonl_file, start=1)
+        for row_num, line in itertools.islice(lines, start_row - 1, end_row):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict):
+                record = [record.get(column) for column in columns]
+            yield row_num, tuple(record)
+
+
+FILE_FORMATS = {
+    ".xlsx": "xlsx",
+    ".csv": "csv",
+    ".jsonl": "jsonl",
+    ".ndjson": "jsonl",
+}
+
+
+def file_format(file_path):
+    """
+    Returns the format of a data file ("xlsx", "csv" or "jsonl") from its extension.
+
+    Raises:
+        ValueError: If the extension is not supported.
+    """
+
+    extension = os.path.splitext(file_path)[1].lower()
+    try:
+        return FILE_FORMATS[extension]
+    except KeyError:
+        raise ValueError(f"Unsupported data file format: {extension}")
+
+
+def first_data_row(file_path):
+    """
+    Returns the number of the first data row; JSONL files have no header.
+    """
+
+    return 1 if file_format(file_path) == "jsonl" else 2
+
+
+def iter_rows(file_path, columns, start_row=None, end_row=None):
+    """
+    Lazily yields ``(row_num, row)`` pairs from an XLSX, CSV or JSONL file.
+
+    Args:
+        file_path (str): The path to the data file.
+        columns (tuple): Column names in the order the row builders expect.
+        start_row (int): First row to read, or None for the first data row.
+        end_row (int): Last row to read, or None to read to the end.
+    """
+
+    start_row = start_row or first_data_row(file_path)
+    data_format = file_format(file_path)
+    if data_format == "csv":
+        return iter_csv_rows(file_path, start_row, end_row)
+    if data_format == "jsonl":
+        return iter_jsonl_rows(file_path, columns, start_row, end_row)
+    return iter_xlsx_rows(file_path, start_row, end_row)
+
+
+def count_rows(file_path):
+    """
+    Returns the number of the last row of an XLSX, CSV or JSONL file.
+    """
+
+    data_format = file_format(file_path)
+    if data_format == "xlsx":
+        return count_xlsx_rows(file_path)
+    with open(file_path, newline="", encoding="utf-8") as data_file:
+        if data_format == "csv":
+            return sum(1 for _ in csv.reader(data_file))
+        return sum(1 for _ in data_file)
+
+
+def row_ranges(last_row, chunk_size, first_row=2):
+    """
+    Splits the rows of a data file into inclusive ``(start_row, end_row)`` ranges.
+
+    Args:
+        last_row (int): Number of the last row in the file.
+        chunk_size (int): Maximum number of rows per range.
+        first_row (int): First data row; row 1 holds the headers.
+
+    Returns:
+        list: Consecutive, non-overlapping row ranges.
+    """
+
+    return [
+        (start, min(start + chunk_size - 1, last_row))
+        for start in range(first_row, last_row + 1, chunk_size)
+    ]
+
+
+def current_rss():
+    """
+    Returns the resident set size of the process in bytes.
+
+    Returns:
+        int: The current RSS, or None where ``/proc`` is not available.
+    """
+
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * mmap.PAGESIZE
+    except OSError:
+        return None
+
+
+class ImportStats:
+    """
+    Collects row counts, rejected rows, timings and peak memory of an import run.
+
+    The peak memory is the largest growth of the process's resident memory
+    over its size when the run started, sampled after every batch. It is
+    measured per run because the worker's lifetime peak would keep
+    reporting the largest import it ever ran.
+    """
+
+    def __init__(self) -> None:
+        self.rows_read = 0
+        self.rows_imported = 0
+        self.rows_rejected = 0
+        self.rejects = []
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+        self.start_rss = current_rss()
+        self.peak_memory = 0
+
+    def reject(self, row_num, error):
+        self.rows_rejected += 1
+        if len(self.rejects) < MAX_REPORTED_REJECTS:
+            self.rejects.append({"row": row_num, "error": str(error)})
+
+    def sample_memory(self):
+        rss = current_rss()
+        if rss is not None and self.start_rss is not None:
+            self.peak_memory = max(self.peak_memory, rss - self.start_rss)
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+        self.sample_memory()
+        return self
+
+    def as_dict(self):
+        return {
+            "rows_read": self.rows_read,
+            "rows_imported": self.rows_imported,
+            "rows_rejected": self.rows_rejected,
+            "rejects": self.rejects,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_read / self.elapsed, 1)
+            if self.elapsed
+            else 0.0,
+            "peak_memory_mb": round(self.peak_memory / (1024 * 1024), 1),
+        }
+
+
+def upsert_options(model):
+    """
+    Returns the ``bulk_create`` arguments that turn inserts into upserts.
+
+    Rows are matched on the primary key. Backends without upsert support get
+    plain inserts.
+    """
+
+    features = connection.features
+    if not features.supports_update_conflicts:
+        return {}
+    pk = model._meta.pk
+    options = {
+        "update_conflicts": True,
+        "update_fields": [
+            field.name
+            for field in model._meta.concrete_fields
+            if not field.primary_key
+        ],
+    }
+    # MySQL matches on every unique key and does not accept a target.
+    if features.supports_update_conflicts_with_target:
+        options["unique_fields"] = [pk.name]
+    return options
+
+
+def _write_batch(model, batch, stats, after_batch):
+    """
+    Upserts one batch in a transaction, isolating bad rows if it fails.
+    """
+
+    # A key repeated within the batch keeps its last row, as it would
+    # across batches.
+    latest = {}
+    for row_num, instance in batch:
+        latest[instance.pk] = (row_num, instance)
+    batch = list(latest.values())
+
+    options = upsert_options(model)
+    instances = [instance for _, instance in batch]
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(instances, **options)
+            if after_batch:
+                after_batch(instances)
+        stats.rows_imported += len(instances)
+        return
+    except Exception as e:
+        if len(batch) == 1:
+            stats.reject(batch[0][0], e)
+            return
+
+    for row_num, instance in batch:
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([instance], **options)
+                if after_batch:
+                    after_batch([instance])
+            stats.rows_imported += 1
+        except Exception as e:
+            stats.reject(row_num, e)
+
+
+def _flush(model, batch, stats, validate_batch, after_batch):
+    if validate_batch:
+        batch, rejected = validate_batch(batch)
+        for row_num, error in rejected:
+            stats.reject(row_num, error)
+    if batch:
+        _write_batch(model, batch, stats, after_batch)
+    stats.sample_memory()
+
+
+def import_rows(
+    rows,
+    build_instance,
+    model,
+    batch_size=1000,
+    validate_batch=None,
+    after_batch=None,
+    checkpoint=None,
+):
+    """
+    Upserts rows into the database with ``bulk_create`` in batches.
+
+    Each batch is written in its own transaction and matched on the primary
+    key, so importing the same rows twice updates them rather than failing
+    or duplicating them. When a batch fails, its rows are retried one by one
+    so a single bad row only rejects itself.
+
+    Args:
+        rows: Iterable of ``(row_num, row)`` pairs.
+        build_instance: Turns a row into an unsaved model instance, or None
+            for rows that should be skipped silently (e.g. blank rows).
+        model: The model class to insert into.
+        batch_size (int): Number of rows per ``bulk_create``.
+        validate_batch: Optional callable checking a whole batch of
+            ``(row_num, instance)`` pairs at once. It returns the accepted
+            pairs and a list of ``(row_num, error)`` rejects.
+        after_batch: Optional callable run with the inserted instances inside
+            the batch transaction.
+        checkpoint: Optional callable run with the last processed row number
+            and the running stats after every batch.
+
+    Returns:
+        ImportStats: Row counts, rejects and timings of the run.
+    """
+
+    stats = ImportStats()
+    batch = []
+    row_num = None
+    for row_num, row in rows:
+        stats.rows_read += 1
+        try:
+            instance = build_instance(row)
+        except Exception as e:
+            stats.reject(row_num, e)
+            continue
+        if instance is None:
+            continue
+
+        batch.append((row_num, instance))
+        if len(batch) >= batch_size:
+            _flush(model, batch, stats, validate_batch, after_batch)
+            batch = []
+            if checkpoint:
+                checkpoint(row_num, stats)
+    if batch:
+        _flush(model, batch, stats, validate_batch, after_batch)
+    if checkpoint and row_num is not None:
+        checkpoint(row_num, stats)
+    return stats.finish()
+
+
+def import_file(
+    file_path,
+    columns,
+    build_instance,
+    model,
+    batch_size=1000,
+    start_row=None,
+    end_row=None,
+    bulk_load=None,
+    validate_batch=None,
+    after_batch=None,
+    checkpoint=None,
+):
+    """
+    Imports an XLSX, CSV or JSONL data file.
+
+    Whole CSV files take the database-native ``bulk_load`` path when the
+    backend supports it (see ``can_bulk_load``); everything else, including
+    a native load the server refuses, goes through ``import_rows``.
+
+    Args:
+        file_path (str): The path to the data file.
+        columns (tuple): Column names in the order ``build_instance`` unpacks them.
+        build_instance: Turns a row into an unsaved model instance.
+        model: The model class to insert into.
+        batch_size (int): Number of rows per ``bulk_create``.
+        start_row (int): First row to import, or None for the first data row.
+        end_row (int): Last row to import, or None for the rest of the file.
+        bulk_load: Optional callable importing a whole CSV file natively.
+        validate_batch: See ``import_rows``.
+        after_batch: See ``import_rows``.
+        checkpoint: See ``import_rows``.
+
+    Returns:
+        ImportStats: Row counts, rejects and timings of the run.
+    """
+
+    if (
+        bulk_load
+        and start_row is None
+        and end_row is None
+        and can_bulk_load(file_path)
+    ):
+        try:
+            return bulk_load(file_path)
+        except DatabaseError:
+            logger.warning(
+                "Native bulk load of %s failed, falling back to bulk_create",
+                file_path,
+                exc_info=True,
+            )
+    return import_rows(
+        iter_rows(file_path, columns, start_row, end_row),
+        build_instance,
+        model,
+        batch_size=batch_size,
+        validate_batch=validate_batch,
+        after_batch=after_batch,
+        checkpoint=checkpoint,
+    )
+
+
+def file_signature(file_path):
+    """
+    Identifies a data file by its path, size and modification time.
+    """
+
+    stat = os.stat(file_path)
+    signature = f"{os.path.abspath(file_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    return hashlib.sha256(signature.encode()).hexdigest()
+
+
+def run_import_job(kind, file_path, run, start_row=None, end_row=None, restart=False):
+    """
+    Runs an import as a resumable job recorded in ``ImportJob``.
+
+    The job checkpoints the last processed row after every batch. Running
+    the same file (and row range) again resumes after the checkpoint, and a
+    completed job returns its stored summary without touching the data.
+    Rows are upserted, so replaying the batch in flight when a worker died
+    is harmless.
+
+    Args:
+        kind (str): Kind of data imported, e.g. "customer" or "loan".
+        file_path (str): The path to the data file.
+        run: Callable running the import from a start row (None for the
+            first data row) with a checkpoint callback, returning ``ImportStats``.
+        start_row (int): First row of the job's range, or None.
+        end_row (int): Last row of the job's range, or None.
+        restart (bool): Ignore any checkpoint and import the whole range again.
+
+    Returns:
+        dict: Summary of the import including the job's totals.
+    """
+
+    job, _ = ImportJob.objects.get_or_create(
+        kind=kind,
+        file_signature=file_signature(file_path),
+        start_row=start_row or 0,
+        end_row=end_row or 0,
+        defaults={"file_path": file_path},
+    )
+    if job.status == ImportJob.COMPLETED and not restart:
+        return dict(job.summary, already_completed=True)
+    if restart:
+        job.last_row = job.rows_imported = job.rows_rejected = 0
+
+    resumed = bool(job.last_row)
+    resume_row = job.last_row + 1 if resumed else start_row
+    job.status = ImportJob.RUNNING
+    job.save()
+    imported, rejected = job.rows_imported, job.rows_rejected
+
+    def checkpoint(last_row, stats):
+        ImportJob.objects.filter(pk=job.pk).update(
+            last_row=last_row,
+            rows_imported=imported + stats.rows_imported,
+            rows_rejected=rejected + stats.rows_rejected,
+            updated_at=timezone.now(),
+        )
+
+    try:
+        stats = run(resume_row, checkpoint)
+    except Exception:
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.FAILED, updated_at=timezone.now()
+        )
+        raise
+
+    job.refresh_from_db()
+    job.rows_imported = imported + stats.rows_imported
+    job.rows_rejected = rejected + stats.rows_rejected
+    summary = stats.as_dict()
+    summary["resumed_from_row"] = resume_row if resumed else None
+    summary["job_rows_imported"] = job.rows_imported
+    summary["job_rows_rejected"] = job.rows_rejected
+    job.summary = summary
+    job.status = ImportJob.COMPLETED
+    job.save()
+    return summary
+
+
+def log_import(name, file_path, summary):
+    """
+    Logs the summary of an import run and returns it.
+    """
+
+    if summary.get("already_completed"):
+        logger.info("%s import of %s was already completed", name, file_path)
+        return summary
+
+    logger.info(
+        "%s import of %s: %s rows imported, %s rejected in %ss "
+        "(%s rows/sec, peak memory %s MB)",
+        name,
+        file_path,
+        summary["rows_imported"],
+        summary["rows_rejected"],
+        summary["elapsed_seconds"],
+        summary["rows_per_second"],
+        summary["peak_memory_mb"],
+    )
+    return summary
+
+
+def merge_import_summaries(summaries, started_at=None):
+    """
+    Merges the summaries of import chunks into one summary.
+
+    Args:
+        summaries (list): Summaries returned by the chunk tasks.
+        started_at (float): ``time.time()`` at dispatch, used for the wall
+            clock duration. Falls back to the slowest chunk when omitted.
+
+    Returns:
+        dict: Combined row counts, rejects and timings.
+    """
+
+    merged = {
+        "rows_read": sum(summary["rows_read"] for summary in summaries),
+        "rows_imported": sum(summary["rows_imported"] for summary in summaries),
+        "rows_rejected": sum(summary["rows_rejected"] for summary in summaries),
+        "rejects": [
+            reject for summary in summaries for reject in summary["rejects"]
+        ][:MAX_REPORTED_REJECTS],
+        "chunks": len(summaries),
+        "chunk_seconds": round(
+            sum(summary["elapsed_seconds"] for summary in summaries), 3
+        ),
+        "peak_memory_mb": max(
+            (summary["peak_memory_mb"] for summary in summaries), default=0.0
+        ),
+    }
+    if started_at is not None:
+        elapsed = time.time() - started_at
+    else:
+        elapsed = max((summary["elapsed_seconds"] for summary in summaries), default=0.0)
+    merged["elapsed_seconds"] = round(elapsed, 3)
+    merged["rows_per_second"] = (
+        round(merged["rows_read"] / elapsed, 1) if elapsed else 0.0
+    )
+    return merged
+
+
+def chunked_import(
+    task, merge_task, file_path, name, chunk_size, timed=True, **task_kwargs
+):
+    """
+    Builds a chord importing a file in row ranges across Celery workers.
+
+    Only CSV and JSONL files are split. openpyxl has to parse every row
+    before a range's first one, so XLSX chunks would parse the file again
+    and again; an XLSX file is imported by a single task instead.
+
+    Args:
+        task: Import task accepting ``file_path``, ``start_row`` and ``end_row``.
+        merge_task: Callback task merging the chunk summaries.
+        file_path (str): The path to the data file.
+        name (str): Name of the import used in the merged summary log.
+        chunk_size (int): Number of rows per subtask.
+        timed (bool): Measure wall clock time from now. Chords that wait on
+            earlier work in a chain should pass False, so the slowest chunk
+            is reported instead.
+        **task_kwargs: Extra keyword arguments for every chunk task.
+
+    Returns:
+        celery.chord: The chord; header tasks are immutable so it can be chained.
+    """
+
+    if file_format(file_path) == "xlsx":
+        header = [task.si(file_path, **task_kwargs)]
+    else:
+        ranges = row_ranges(count_rows(file_path), chunk_size, first_data_row(file_path))
+        header = [
+            task.si(file_path, start_row=start_row, end_row=end_row, **task_kwargs)
+            for start_row, end_row in ranges
+        ]
+    return chord(
+        header,
+        merge_task.s(
+            name=name,
+            file_path=file_path,
+            started_at=time.time() if timed else None,
+        ),
+    )
+
+
+def can_bulk_load(file_path):
+    """
+    Checks whether a file can take the database-native bulk-load path.
+
+    Only CSV files on MySQL qualify, and ``IMPORT_NATIVE_BULK_LOAD`` must be on.
+    """
+
+    return (
+        getattr(settings, "IMPORT_NATIVE_BULK_LOAD", False)
+        and connection.vendor == "mysql"
+        and file_format(file_path) == "csv"
+    )
+
+
+def _csv_line_terminator(file_path):
+    with open(file_path, "rb") as csv_file:
+        first_line = csv_file.readline()
+    return "\\r\\n" if first_line.endswith(b"\r\n") else "\\n"
+
+
+def mysql_bulk_load(
+    file_path,
+    model,
+    columns,
+    key,
+    select,
+    skip,
+    checks,
+    before_insert=None,
+    after_load=None,
+):
+    """
+    Imports a CSV file with MySQL ``LOAD DATA LOCAL INFILE`` and set-based SQL.
+
+    The file is loaded into a staging table of text columns. Each row's
+    validation checks run as ``UPDATE`` statements that record a reject
+    reason. The remaining rows are upserted with one
+    ``INSERT ... SELECT ... ON DUPLICATE KEY UPDATE``.
+    The staging table is a regular table because MySQL cannot refer to a
+    temporary table twice in one statement, and it is dropped afterwards.
+
+    Args:
+        file_path (str): The path to the CSV file; the first line is a header.
+        model: The model class to insert into.
+        columns (tuple): Staging column names, in file order.
+        key (str): Staging column holding the target primary key.
+        select (dict): Target column mapped to the SQL expression producing it
+            from the staging row ``s``.
+        skip (str): SQL condition for rows skipped silently, e.g. blank rows.
+        checks (list): ``(condition, reason)`` SQL pairs; rows matching a
+            condition are rejected with the given reason.
+        before_insert: Optional callable run with the SQL selecting the
+            accepted staging rows just before they are written.
+        after_load: Optional callable run with the same SQL and the result
+            of ``before_insert``, inside the insert transaction.
+
+    Returns:
+        ImportStats: Row counts, rejects and timings of the run.
+    """
+
+    stats = ImportStats()
+    qn = connection.ops.quote_name
+    staging = qn(f"import_staging_{uuid.uuid4().hex[:16]}")
+    target = qn(model._meta.db_table)
+    target_pk = model._meta.pk.column
+    column_list = ", ".join(qn(column) for column in columns)
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE {staging} ("
+            "row_num BIGINT AUTO_INCREMENT PRIMARY KEY, "
+            + "".join(f"{qn(column)} VARCHAR(255), " for column in columns)
+            + f"reject_reason VARCHAR(255) NULL, INDEX ({qn(key)}))"
+        )
+        try:
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE {staging} "
+                "CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+                f"LINES TERMINATED BY '{_csv_line_terminator(file_path)}' "
+                f"IGNORE 1 LINES ({column_list})",
+                [os.path.abspath(file_path)],
+            )
+            cursor.execute(f"SELECT COUNT(*) FROM {staging}")
+            stats.rows_read = cursor.fetchone()[0]
+            cursor.execute(f"DELETE FROM {staging} WHERE {skip}")
+
+            with transaction.atomic():
+                for condition, reason in checks:
+                    cursor.execute(
+                        f"UPDATE {staging} s SET s.reject_reason = {reason} "
+                        f"WHERE s.reject_reason IS NULL AND ({condition})"
+                    )
+                # A key repeated within the file keeps its last row, as the
+                # batched path does.
+                cursor.execute(
+                    f"DELETE s FROM {staging} s JOIN (SELECT * FROM ("
+                    f"SELECT {qn(key)}, MAX(row_num) AS last_row FROM {staging} "
+                    f"WHERE reject_reason IS NULL GROUP BY {qn(key)}) f) d "
+                    f"ON d.{qn(key)} = s.{qn(key)} "
+                    "WHERE s.reject_reason IS NULL AND s.row_num < d.last_row"
+                )
+
+                accepted_rows_sql = (
+                    f"SELECT * FROM {staging} s WHERE s.reject_reason IS NULL"
+                )
+                previous = before_insert(accepted_rows_sql) if before_insert else None
+                cursor.execute(
+                    f"INSERT INTO {target} ({', '.join(qn(c) for c in select)}) "
+                    f"SELECT {', '.join(select.values())} FROM {staging} s "
+                    "WHERE s.reject_reason IS NULL "
+                    "ON DUPLICATE KEY UPDATE "
+                    + ", ".join(
+                        f"{qn(c)} = VALUES({qn(c)})" for c in select if c != target_pk
+                    )
+                )
+                cursor.execute(
+                    f"SELECT COUNT(*) FROM {staging} WHERE reject_reason IS NULL"
+                )
+                stats.rows_imported = cursor.fetchone()[0]
+                if after_load:
+                    after_load(accepted_rows_sql, previous)
+
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {staging} WHERE reject_reason IS NOT NULL"
+            )
+            rows_rejected = cursor.fetchone()[0]
+            cursor.execute(
+                f"SELECT row_num + 1, reject_reason FROM {staging} "
+                f"WHERE reject_reason IS NOT NULL ORDER BY row_num LIMIT {MAX_REPORTED_REJECTS}"
+            )
+            for row_num, reason in cursor.fetchall():
+                stats.reject(row_num, reason)
+            stats.rows_rejected = rows_rejected
+        finally:
+            cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+    return stats.finish()
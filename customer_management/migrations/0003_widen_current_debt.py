@@ -0,0 +1,18 @@
+# Generated by Django 4.2.10 on 2026-10-18 04:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0002_importjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customerdata',
+            name='current_debt',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+    ]
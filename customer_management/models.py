@@ -9,8 +9,39 @@ class CustomerData(models.Model):
     phone_number = models.BigIntegerField()
     monthly_salary = models.IntegerField()
     approved_limit = models.IntegerField()
-    current_debt = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    current_debt = models.DecimalField(max_digits=14, decimal_places=2, default=0)
 
     @property
     def name(self):
-        return f"{self.first_name} {self.last_name}"
\ No newline at end of file
+        return f"{self.first_name} {self.last_name}"
+
+class ImportJob(models.Model):
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (RUNNING, "Running"),
+        (COMPLETED, "Completed"),
+        (FAILED, "Failed"),
+    )
+
+    kind = models.CharField(max_length=32)
+    file_path = models.CharField(max_length=1024)
+    file_signature = models.CharField(max_length=64)
+    start_row = models.IntegerField(default=0)
+    end_row = models.IntegerField(default=0)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=RUNNING)
+    last_row = models.IntegerField(default=0)
+    rows_imported = models.IntegerField(default=0)
+    rows_rejected = models.IntegerField(default=0)
+    summary = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "file_signature", "start_row", "end_row"],
+                name="unique_import_job",
+            )
+        ]
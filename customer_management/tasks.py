@@ -1,60 +1,236 @@
-import openpyxl
+import logging
+
 from celery import shared_task
+from django.db import connection
 
+from customer_management.ingest import (
+    chunked_import,
+    import_file,
+    log_import,
+    merge_import_summaries,
+    mysql_bulk_load,
+    run_import_job,
+)
 from customer_management.models import CustomerData
+from loan_management.cache import bump_customer_versions
+from loan_management.debt import recompute_current_debt
 
+logger = logging.getLogger(__name__)
 
-@shared_task
-def inject_customer_data(file_path):
+CUSTOMER_COLUMNS = (
+    "customer_id",
+    "first_name",
+    "last_name",
+    "age",
+    "phone_number",
+    "monthly_salary",
+    "approved_limit",
+)
+
+
+def build_customer(row):
     """
-    Asynchronous task to inject customer data from an Excel file into the database.
+    Builds an unsaved customer from a row of the customer data file.
 
     Args:
-        file_path (str): The path to the Excel file containing customer data.
+        row (tuple): Cell values of one row.
+
+    Returns:
+        CustomerData: The customer, or None for rows without a first name.
+    """
+
+    (
+        customer_id,
+        first_name,
+        last_name,
+        age,
+        phone_number,
+        monthly_salary,
+        approved_limit,
+    ) = row
+    if not first_name:
+        return None
+    return CustomerData(
+        customer_id=customer_id,
+        first_name=first_name,
+        last_name=last_name,
+        age=age,
+        phone_number=phone_number,
+        monthly_salary=monthly_salary,
+        approved_limit=approved_limit,
+    )
+
+
+def update_imported_customers(customers):
+    """
+    Invalidates cached decisions of customers whose rows were upserted.
+
+    The upsert also resets ``current_debt``, which the data file does not
+    carry, so it is recomputed from the customers' loans. ``bulk_create``
+    skips model signals, so this runs inside each batch transaction instead.
+    """
+
+    customer_ids = {customer.customer_id for customer in customers}
+    recompute_current_debt(customer_ids)
+    bump_customer_versions(customer_ids)
 
-    Raises:
-        Exception: Any unexpected error during data insertion.
 
-    Prints:
-        str: Print statements indicating the creation of customer data objects.
+def update_bulk_loaded_customers(accepted_rows_sql, previous=None):
     """
+    Counterpart of ``update_imported_customers`` for natively bulk-loaded rows.
 
-    workbook = openpyxl.load_workbook(file_path)
-    sheet = workbook.active
-    count = 1
-    for row_num in range(2, sheet.max_row + 1):
-        try:
-            row = [cell.value for cell in sheet[row_num]]
+    Args:
+        accepted_rows_sql (str): SQL selecting the upserted staging rows.
+        previous: Unused, see ``mysql_bulk_load``.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT CAST(a.customer_id AS UNSIGNED) FROM ({accepted_rows_sql}) a"
+        )
+        customer_ids = [row[0] for row in cursor.fetchall()]
+    recompute_current_debt(customer_ids)
+    bump_customer_versions(customer_ids)
+
+
+def bulk_load_customers(file_path):
+    """
+    Imports a customer CSV file through MySQL ``LOAD DATA LOCAL INFILE``.
+
+    Applies the same column mapping and checks as ``build_customer``.
+    """
+
+    return mysql_bulk_load(
+        file_path,
+        CustomerData,
+        CUSTOMER_COLUMNS,
+        key="customer_id",
+        select={
+            "customer_id": "CAST(s.customer_id AS UNSIGNED)",
+            "first_name": "s.first_name",
+            "last_name": "s.last_name",
+            "age": "CAST(s.age AS UNSIGNED)",
+            "phone_number": "CAST(s.phone_number AS SIGNED)",
+            "monthly_salary": "CAST(s.monthly_salary AS SIGNED)",
+            "approved_limit": "CAST(s.approved_limit AS SIGNED)",
+            "current_debt": "0",
+        },
+        skip="COALESCE(first_name, '') = ''",
+        checks=[
             (
-                customer_id,
-                first_name,
-                last_name,
-                age,
-                phone_number,
-                monthly_salary,
-                approved_limit,
-            ) = row
-            if first_name:
-                CustomerData.objects.create(
-                    customer_id=customer_id,
-                    first_name=first_name,
-                    last_name=last_name,
-                    age=age,
-                    phone_number=phone_number,
-                    monthly_salary=monthly_salary,
-                    approved_limit=approved_limit,
-                )
-                print(f"Created customer data object: {count}")
-                count += 1
-        except Exception as e:
-            print("Error while inserting data:", e)
-
-
-def start_data_import(file_path):
-    """
-    Initiates the asynchronous task to import customer data from an Excel file.
+                "NOT (s.customer_id REGEXP '^[0-9]+$' "
+                "AND s.age REGEXP '^[0-9]+$' "
+                "AND s.phone_number REGEXP '^-?[0-9]+$' "
+                "AND s.monthly_salary REGEXP '^-?[0-9]+$' "
+                "AND s.approved_limit REGEXP '^-?[0-9]+$')",
+                "'Invalid values'",
+            ),
+        ],
+        after_load=update_bulk_loaded_customers,
+    )
+
+
+@shared_task
+def inject_customer_data(
+    file_path, batch_size=1000, start_row=None, end_row=None, restart=False
+):
+    """
+    Asynchronous task to inject customer data from a data file into the database.
+
+    Accepts XLSX, CSV and JSONL files. Rows are streamed from the file and
+    upserted with ``bulk_create`` in batches, each in its own transaction.
+    Whole CSV files are loaded natively on MySQL. The import runs as a
+    resumable job (see ``run_import_job``): a retried task continues after
+    the last committed batch, and a completed file is not imported again.
+
+    Args:
+        file_path (str): The path to the file containing customer data.
+        batch_size (int): Number of rows inserted per batch.
+        start_row (int): First row to import, or None for the first data row.
+        end_row (int): Last row to import, or None for the rest of the file.
+        restart (bool): Import the whole file or range again even if an
+            earlier run completed or left a checkpoint.
+
+    Returns:
+        dict: Row counts, rejected rows, rows/sec and peak memory of the import.
+    """
+
+    def run(resume_row, checkpoint):
+        return import_file(
+            file_path,
+            CUSTOMER_COLUMNS,
+            build_customer,
+            CustomerData,
+            batch_size=batch_size,
+            start_row=resume_row,
+            end_row=end_row,
+            bulk_load=bulk_load_customers,
+            after_batch=update_imported_customers,
+            checkpoint=checkpoint,
+        )
+
+    summary = run_import_job(
+        "customer", file_path, run, start_row, end_row, restart=restart
+    )
+    return log_import("Customer", file_path, summary)
+
+
+@shared_task
+def merge_import_results(summaries, name, file_path, started_at=None):
+    """
+    Chord callback merging the summaries of a chunked import.
+
+    Args:
+        summaries (list): Summaries returned by the chunk tasks.
+        name (str): Name of the import, e.g. "Customer" or "Loan".
+        file_path (str): The imported file.
+        started_at (float): ``time.time()`` when the chunks were dispatched.
+
+    Returns:
+        dict: Combined row counts, rejects and timings.
+    """
+
+    merged = merge_import_summaries(summaries, started_at)
+    logger.info(
+        "%s import of %s finished in %s chunks: %s rows imported, %s rejected "
+        "in %ss (%s rows/sec)",
+        name,
+        file_path,
+        merged["chunks"],
+        merged["rows_imported"],
+        merged["rows_rejected"],
+        merged["elapsed_seconds"],
+        merged["rows_per_second"],
+    )
+    return merged
+
+
+def customer_import_chord(file_path, chunk_size=50000, batch_size=1000):
+    """
+    Builds the chord importing customer data in row ranges across workers.
+    """
+
+    return chunked_import(
+        inject_customer_data,
+        merge_import_results,
+        file_path,
+        "Customer",
+        chunk_size,
+        batch_size=batch_size,
+    )
+
+
+def start_data_import(file_path, parallel=False, chunk_size=50000):
+    """
+    Initiates the asynchronous task to import customer data from a data file.
 
     Args:
-        file_path (str): The path to the Excel file containing customer data.
+        file_path (str): The path to the XLSX, CSV or JSONL file containing customer data.
+        parallel (bool): Split the file into row ranges imported by one
+            subtask each, merged by a final callback. XLSX files are not
+            split (see ``chunked_import``).
+        chunk_size (int): Number of rows per subtask in parallel mode.
     """
-    inject_customer_data.delay(file_path)
+    if parallel:
+        return customer_import_chord(file_path, chunk_size).apply_async()
+    return inject_customer_data.delay(file_path)
@@ -1,9 +1,31 @@
+import os
+import tempfile
+from unittest import mock, skipUnless
+
+import openpyxl
+from django.db import DatabaseError
 from django.urls import reverse
 from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from customer_management.models import CustomerData
+from customer_management import ingest
+from customer_management.ingest import (
+    ImportStats,
+    can_bulk_load,
+    chunked_import,
+    current_rss,
+    import_file,
+    merge_import_summaries,
+    row_ranges,
+)
+from customer_management.models import CustomerData, ImportJob
+from customer_management.tasks import (
+    CUSTOMER_COLUMNS,
+    build_customer,
+    inject_customer_data,
+    merge_import_results,
+)
 
 
 class CustomerRegisterAPITestCase(TestCase):
@@ -40,3 +62,212 @@ class CustomerRegisterAPITestCase(TestCase):
             "phone_number": 1234567890,
         }
         self.assertEqual(response.data, expected_response_data)
+
+
+class InjectCustomerDataTestCase(TestCase):
+    def setUp(self):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(
+            [
+                "Customer ID",
+                "First Name",
+                "Last Name",
+                "Age",
+                "Phone Number",
+                "Monthly Salary",
+                "Approved Limit",
+            ]
+        )
+        sheet.append([1, "Aaron", "Garcia", 63, 9629317944, 300000, 10800000])
+        sheet.append([2, "Adrian", "Spears", 40, 9310270450, 41000, 1500000])
+        sheet.append([None, None, None, None, None, None, None])
+        sheet.append([1, "Dup", "Licate", 30, 9999999999, 50000, 1800000])
+        sheet.append([3, "Agnes", "Lamb", 34, 9513640532, 26000, 900000])
+
+        self.file = tempfile.NamedTemporaryFile(suffix=".xlsx")
+        workbook.save(self.file.name)
+
+    def tearDown(self):
+        self.file.close()
+
+    def test_inject_customer_data(self):
+        summary = inject_customer_data(self.file.name, batch_size=2)
+
+        self.assertEqual(
+            list(CustomerData.objects.order_by("customer_id").values_list("first_name", flat=True)),
+            ["Dup", "Adrian", "Agnes"],
+        )
+        self.assertEqual(summary["rows_read"], 5)
+        self.assertEqual(summary["rows_imported"], 4)
+        self.assertEqual(summary["rows_rejected"], 0)
+        self.assertIn("rows_per_second", summary)
+        self.assertIn("peak_memory_mb", summary)
+
+    def test_inject_customer_data_row_range(self):
+        summary = inject_customer_data(self.file.name, start_row=3, end_row=4)
+
+        self.assertEqual(list(CustomerData.objects.values_list("first_name", flat=True)), ["Adrian"])
+        self.assertEqual(summary["rows_read"], 2)
+
+    def test_inject_customer_data_resumes_after_crash(self):
+        iter_rows = ingest.iter_rows
+
+        def crashing_iter_rows(*args):
+            for row_num, row in iter_rows(*args):
+                if row_num == 5:
+                    raise RuntimeError("worker lost")
+                yield row_num, row
+
+        with mock.patch("customer_management.ingest.iter_rows", crashing_iter_rows):
+            with self.assertRaises(RuntimeError):
+                inject_customer_data(self.file.name, batch_size=2)
+
+        job = ImportJob.objects.get(kind="customer")
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertEqual(job.last_row, 3)
+        self.assertEqual(CustomerData.objects.count(), 2)
+
+        summary = inject_customer_data(self.file.name, batch_size=2)
+
+        self.assertEqual(summary["resumed_from_row"], 4)
+        self.assertEqual(summary["rows_read"], 3)
+        self.assertEqual(summary["job_rows_imported"], 4)
+        self.assertEqual(
+            list(CustomerData.objects.order_by("customer_id").values_list("first_name", flat=True)),
+            ["Dup", "Adrian", "Agnes"],
+        )
+
+        summary = inject_customer_data(self.file.name, batch_size=2)
+        self.assertTrue(summary["already_completed"])
+        self.assertEqual(ImportJob.objects.get().status, ImportJob.COMPLETED)
+
+    def test_inject_customer_data_restart_upserts(self):
+        inject_customer_data(self.file.name)
+        CustomerData.objects.filter(customer_id=2).update(first_name="Changed")
+
+        summary = inject_customer_data(self.file.name, restart=True)
+
+        self.assertNotIn("already_completed", summary)
+        self.assertIsNone(summary["resumed_from_row"])
+        # Both rows for customer 1 fall in one batch and are written once.
+        self.assertEqual(summary["job_rows_imported"], 3)
+        self.assertEqual(CustomerData.objects.get(customer_id=2).first_name, "Adrian")
+        self.assertEqual(CustomerData.objects.count(), 3)
+
+    def test_row_ranges(self):
+        self.assertEqual(row_ranges(6, 2), [(2, 3), (4, 5), (6, 6)])
+        self.assertEqual(row_ranges(1, 2), [])
+
+    def test_xlsx_import_is_not_split(self):
+        job = chunked_import(
+            inject_customer_data, merge_import_results, self.file.name, "Customer", 2
+        )
+
+        self.assertEqual([task.kwargs for task in job.tasks], [{}])
+
+    @skipUnless(current_rss(), "needs /proc")
+    def test_peak_memory_is_measured_per_import(self):
+        stats = ImportStats()
+        rows = b"x" * (32 * 1024 * 1024)
+        stats.sample_memory()
+        del rows
+        self.assertGreaterEqual(stats.finish().as_dict()["peak_memory_mb"], 32)
+
+        self.assertLess(ImportStats().finish().as_dict()["peak_memory_mb"], 32)
+
+    def test_merge_import_summaries(self):
+        summaries = [
+            {
+                "rows_read": 2,
+                "rows_imported": 2,
+                "rows_rejected": 0,
+                "rejects": [],
+                "elapsed_seconds": 1.0,
+                "rows_per_second": 2.0,
+                "peak_memory_mb": 50.0,
+            },
+            {
+                "rows_read": 2,
+                "rows_imported": 1,
+                "rows_rejected": 1,
+                "rejects": [{"row": 5, "error": "duplicate"}],
+                "elapsed_seconds": 2.0,
+                "rows_per_second": 1.0,
+                "peak_memory_mb": 60.0,
+            },
+        ]
+
+        merged = merge_import_summaries(summaries)
+
+        self.assertEqual(merged["rows_imported"], 3)
+        self.assertEqual(merged["rows_rejected"], 1)
+        self.assertEqual(merged["rejects"], [{"row": 5, "error": "duplicate"}])
+        self.assertEqual(merged["chunks"], 2)
+        self.assertEqual(merged["elapsed_seconds"], 2.0)
+        self.assertEqual(merged["rows_per_second"], 2.0)
+        self.assertEqual(merged["peak_memory_mb"], 60.0)
+
+
+class InjectCustomerTextDataTestCase(TestCase):
+    def write_file(self, suffix, content):
+        data_file = tempfile.NamedTemporaryFile("w", suffix=suffix, delete=False)
+        self.addCleanup(os.remove, data_file.name)
+        with data_file:
+            data_file.write(content)
+        return data_file.name
+
+    def test_inject_customer_csv(self):
+        file_path = self.write_file(
+            ".csv",
+            "Customer ID,First Name,Last Name,Age,Phone Number,Monthly Salary,Approved Limit\n"
+            "1,Aaron,Garcia,63,9629317944,300000,10800000\n"
+            ",,,,,,\n"
+            "2,Adrian,Spears,forty,9310270450,41000,1500000\n",
+        )
+
+        summary = inject_customer_data(file_path)
+
+        self.assertEqual(list(CustomerData.objects.values_list("first_name", "age")), [("Aaron", 63)])
+        self.assertEqual(summary["rows_imported"], 1)
+        self.assertEqual([reject["row"] for reject in summary["rejects"]], [4])
+
+    def test_inject_customer_jsonl(self):
+        file_path = self.write_file(
+            ".jsonl",
+            '[1, "Aaron", "Garcia", 63, 9629317944, 300000, 10800000]\n'
+            "\n"
+            '{"customer_id": 2, "first_name": "Adrian", "last_name": "Spears", "age": 40, '
+            '"phone_number": 9310270450, "monthly_salary": 41000, "approved_limit": 1500000}\n',
+        )
+
+        summary = inject_customer_data(file_path)
+
+        self.assertEqual(
+            list(CustomerData.objects.order_by("customer_id").values_list("first_name", flat=True)),
+            ["Aaron", "Adrian"],
+        )
+        self.assertEqual(summary["rows_imported"], 2)
+
+    def test_native_bulk_load_falls_back(self):
+        file_path = self.write_file(
+            ".csv",
+            "Customer ID,First Name,Last Name,Age,Phone Number,Monthly Salary,Approved Limit\n"
+            "1,Aaron,Garcia,63,9629317944,300000,10800000\n",
+        )
+        self.assertFalse(can_bulk_load(file_path))
+
+        bulk_load = mock.Mock(side_effect=DatabaseError("local_infile disabled"))
+        with mock.patch(
+            "customer_management.ingest.can_bulk_load", return_value=True
+        ), self.assertLogs("customer_management.ingest", "WARNING"):
+            stats = import_file(
+                file_path,
+                CUSTOMER_COLUMNS,
+                build_customer,
+                CustomerData,
+                bulk_load=bulk_load,
+            )
+
+        bulk_load.assert_called_once_with(file_path)
+        self.assertEqual(stats.rows_imported, 1)
@@ -2,8 +2,20 @@
 
 sleep 2
 
+# Services with a command of their own (celery worker and beat) run it
+# instead of the server; migrations are left to the server.
+if [ "$#" -gt 0 ]; then
+    exec "$@"
+fi
+
 echo "Apply database migrations"
 python manage.py migrate
 
+# Samples of earlier server processes would otherwise be merged into /metrics.
+rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
 echo "Running Server"
+if [ "$SERVER_MODE" = "asgi" ]; then
+    exec gunicorn config.asgi:application -c config/gunicorn_asgi.py
+fi
 python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
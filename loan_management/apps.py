@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class LoanManagementConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'loan_management'
+
+    def ready(self):
+        from loan_management import signals  # noqa: F401
@@ -0,0 +1,120 @@
+import json
+import time
+
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from config.db_router import areplica_reads
+from loan_management.lean import (
+    build_loan,
+    customer_loan_rows,
+    lean_enabled,
+    loan_rows,
+    render_lean,
+)
+from loan_management.models import LoanData
+from loan_management.utils import CheckLoanApproval
+from .serializers import ViewCustomerLoanSerializer, ViewLoanSerializer
+
+
+def render_json(request, data, status_code=status.HTTP_200_OK):
+    """
+    Renders data the way the DRF views do, so both paths return the same bytes.
+
+    The rendering time is reported as ``serialize`` in ``request.timings``
+    when ``RequestMetricsMiddleware`` is active.
+    """
+
+    started = time.perf_counter()
+    content = JSONRenderer().render(data)
+    timings = getattr(request, "timings", None)
+    if timings is not None:
+        timings.serialize = time.perf_counter() - started
+    return HttpResponse(content, status=status_code, content_type="application/json")
+
+
+class AsyncAPIView(View):
+    """
+    Base class of the async API views.
+
+    DRF 3.14 views are synchronous, so these are plain Django views with
+    ``async`` handlers. Like DRF's ``APIView`` they are exempt from CSRF.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+
+class AsyncCheckEligibility(AsyncAPIView):
+    """
+    Async variant of ``CheckEligibility``.
+
+    Scores the customer with ``CheckLoanApproval.aloan_approval``, so the
+    worker's event loop keeps serving other connections while the query runs.
+    Reads go to a replica like in the sync view.
+
+    Returns:
+        HttpResponse: The loan eligibility result or an error message.
+    """
+
+    async def post(self, request, *args, **kwargs):
+        try:
+            data = json.loads(request.body)
+            check_loan_ins = CheckLoanApproval(data["customer_id"])
+            async with areplica_reads([data["customer_id"]]):
+                result = await check_loan_ins.aloan_approval()
+            response_data = data
+            del response_data["loan_amount"]
+            response_data.update(result)
+
+            return render_json(request, response_data)
+        except Exception as e:
+            error_response_data = {"error_message": str(e)}
+            return render_json(request, error_response_data, status.HTTP_400_BAD_REQUEST)
+
+
+class AsyncViewLoan(AsyncAPIView):
+    """
+    Async variant of ``ViewLoan``, reading the loan and its customer in one
+    query from a replica, and from the primary when the replica does not
+    have the loan yet.
+    """
+
+    async def get(self, request, loan_id, *args, **kwargs):
+        lean = lean_enabled(request)
+        async with areplica_reads() as alias:
+            data = await self.loan_data(loan_id, lean)
+        if not data and alias != DEFAULT_DB_ALIAS:
+            # A loan created moments ago may not have reached the replica yet.
+            data = await self.loan_data(loan_id, lean)
+        if lean:
+            return render_lean(request, data)
+        return render_json(request, data)
+
+    async def loan_data(self, loan_id, lean):
+        queryset = LoanData.objects.select_related("customer_id").filter(loan_id=loan_id)
+        if lean:
+            return [build_loan(row) async for row in loan_rows(queryset)]
+        return [ViewLoanSerializer(loan).data async for loan in queryset]
+
+
+class AsyncViewCustomerLoans(AsyncAPIView):
+    """
+    Async variant of ``ViewCustomerLoans``, returning the full list read
+    from a replica unless the customer is pinned to the primary.
+    """
+
+    async def get(self, request, customer_id, *args, **kwargs):
+        queryset = LoanData.objects.filter(customer_id=customer_id).order_by("loan_id")
+        async with areplica_reads([customer_id]):
+            if lean_enabled(request):
+                loans = [row async for row in customer_loan_rows(queryset)]
+                return render_lean(request, loans)
+            data = [ViewCustomerLoanSerializer(loan).data async for loan in queryset]
+        return render_json(request, data)
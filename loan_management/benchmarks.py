@@ -0,0 +1,477 @@
+import asyncio
+import platform
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+import django
+from django.conf import settings
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from customer_management.models import CustomerData
+from customer_management.tasks import inject_customer_data
+from loan_management.models import LoanData
+from loan_management.synthetic import SyntheticBook, insert_book, write_book
+from loan_management.tasks import inject_loan_data
+from loan_management.utils import CheckLoanApproval
+
+
+def percentile(samples, fraction):
+    """
+    Returns the nearest-rank percentile of a list of samples.
+    """
+
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize_latencies(latencies, elapsed):
+    """
+    Summarizes latencies in milliseconds measured over ``elapsed`` seconds.
+    """
+
+    return {
+        "iterations": len(latencies),
+        "throughput_per_second": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "p99_ms": round(percentile(latencies, 0.99), 3),
+    }
+
+
+def measure(call, iterations):
+    """
+    Runs a callable repeatedly and summarizes its latency and query count.
+
+    Args:
+        call: Callable taking the iteration number.
+        iterations (int): Number of calls.
+
+    Returns:
+        dict: Throughput, latency percentiles in milliseconds and queries per call.
+    """
+
+    latencies = []
+    queries = []
+    started = time.perf_counter()
+    for iteration in range(iterations):
+        with CaptureQueriesContext(connection) as captured:
+            call_started = time.perf_counter()
+            call(iteration)
+            latencies.append((time.perf_counter() - call_started) * 1000)
+        queries.append(len(captured))
+    elapsed = time.perf_counter() - started
+
+    result = summarize_latencies(latencies, elapsed)
+    result["queries_per_call"] = (
+        round(sum(queries) / len(queries), 2) if queries else 0.0
+    )
+    result["max_queries"] = max(queries, default=0)
+    return result
+
+
+def _check_response(response, expected_status):
+    if response.status_code != expected_status:
+        raise AssertionError(
+            f"{response.request['PATH_INFO']} returned {response.status_code}: "
+            f"{response.content[:200]!r}"
+        )
+
+
+def endpoint_benchmarks(customer_ids, loan_ids, requests, seed=0):
+    """
+    Benchmarks every API endpoint through the Django test client.
+
+    Returns:
+        dict: ``measure`` results keyed by benchmark name.
+    """
+
+    rng = random.Random(seed)
+    client = Client()
+
+    def post(name, payload, expected_status):
+        response = client.post(reverse(name), payload, content_type="application/json")
+        _check_response(response, expected_status)
+
+    def get(name, expected_status=200, **kwargs):
+        response = client.get(reverse(name, kwargs=kwargs))
+        _check_response(response, expected_status)
+
+    def eligibility_payload():
+        return {
+            "customer_id": rng.choice(customer_ids),
+            "loan_amount": rng.randrange(10000, 200000, 1000),
+            "interest_rate": 12,
+            "tenure": 12,
+        }
+
+    book = SyntheticBook(requests, seed=seed)
+
+    def register(iteration):
+        _, first_name, last_name, age, phone_number, monthly_salary, _ = book.customer_row(None)
+        customer = {
+            "first_name": first_name,
+            "last_name": last_name,
+            "age": age,
+            "phone_number": phone_number,
+            "monthly_salary": monthly_salary,
+        }
+        post("customer_register", customer, 201)
+
+    def create_loan(iteration):
+        response = client.post(
+            reverse("create_loan"), eligibility_payload(), content_type="application/json"
+        )
+        # Declined applications are answered with 200.
+        if response.status_code not in (200, 201):
+            _check_response(response, 201)
+
+    return {
+        "api_register": measure(register, requests),
+        "api_check_eligibility": measure(
+            lambda i: post("check_eligibility", eligibility_payload(), 200), requests
+        ),
+        "api_create_loan": measure(create_loan, requests),
+        "api_view_loan": measure(
+            lambda i: get("view_loan", loan_id=rng.choice(loan_ids)), requests
+        ),
+        "api_view_loans": measure(
+            lambda i: get("view_loans", customer_id=rng.choice(customer_ids)), requests
+        ),
+    }
+
+
+def import_benchmarks(rows, seed=0):
+    """
+    Benchmarks ``inject_customer_data`` and ``inject_loan_data`` directly.
+
+    Returns:
+        dict: ``measure`` results with the import's rows per second added.
+    """
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        book = SyntheticBook(rows, min_loans=1, max_loans=1, seed=seed)
+        customer_path, loan_path = write_book(book, directory)
+        for name, task, file_path in (
+            ("import_customers", inject_customer_data, customer_path),
+            ("import_loans", inject_loan_data, loan_path),
+        ):
+            summaries = []
+            result = measure(
+                lambda i: summaries.append(task(file_path, restart=True)), 1
+            )
+            summary = summaries[0]
+            if summary["rows_rejected"]:
+                raise AssertionError(f"{name} rejected rows: {summary['rejects'][:5]}")
+            result["rows"] = summary["rows_imported"]
+            result["rows_per_second"] = summary["rows_per_second"]
+            results[name] = result
+    return results
+
+
+def concurrency_benchmarks(
+    customer_ids,
+    requests,
+    concurrency,
+    sync_threads=8,
+    slow_client_ms=0,
+    seed=0,
+):
+    """
+    Compares the sync and async views under many concurrent clients.
+
+    ``concurrency`` clients each send their share of ``requests`` back to
+    back. On the sync path a request holds one of ``sync_threads`` worker
+    threads, like a threaded WSGI worker; on the async path it is served by
+    the ASGI handler's event loop. ``slow_client_ms`` models a client that
+    is slow to send or read: it holds a sync worker thread, but the event
+    loop keeps serving others. Latencies include time spent waiting for a
+    worker.
+
+    Returns:
+        dict: ``summarize_latencies`` results keyed by benchmark name.
+    """
+
+    rng = random.Random(seed)
+    payloads = [
+        {
+            "customer_id": rng.choice(customer_ids),
+            "loan_amount": rng.randrange(10000, 200000, 1000),
+            "interest_rate": 12,
+            "tenure": 12,
+        }
+        for _ in range(requests)
+    ]
+    share = [payloads[client::concurrency] for client in range(concurrency)]
+    slow_seconds = slow_client_ms / 1000
+
+    def run_sync(url_name):
+        workers = threading.BoundedSemaphore(sync_threads)
+        latencies = []
+
+        def client_loop(client_payloads):
+            client = Client()
+            try:
+                for payload in client_payloads:
+                    started = time.perf_counter()
+                    with workers:
+                        client.post(reverse(url_name), payload, content_type="application/json")
+                        time.sleep(slow_seconds)
+                    latencies.append((time.perf_counter() - started) * 1000)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=client_loop, args=(p,)) for p in share]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return summarize_latencies(latencies, time.perf_counter() - started)
+
+    async def run_async(url_name):
+        client = AsyncClient()
+        latencies = []
+
+        async def client_loop(client_payloads):
+            for payload in client_payloads:
+                started = time.perf_counter()
+                await client.post(reverse(url_name), payload, content_type="application/json")
+                await asyncio.sleep(slow_seconds)
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop(p) for p in share))
+        return summarize_latencies(latencies, time.perf_counter() - started)
+
+    return {
+        f"concurrent_sync_check_eligibility_c{concurrency}": run_sync("check_eligibility"),
+        f"concurrent_async_check_eligibility_c{concurrency}": asyncio.run(
+            run_async("async_check_eligibility")
+        ),
+    }
+
+
+def contention_benchmarks(threads, rounds, seed=0):
+    """
+    Races concurrent create-loan requests from many threads.
+
+    Every round seeds fresh customers without loans, then each thread posts
+    one application at the same moment: all for one customer in the
+    ``same_customer`` benchmark, each for its own customer in the
+    ``distinct_customers`` one. Every application needs more than half the
+    salary as EMI, so a customer can only ever be granted one of them; more
+    would mean two requests passed the checks concurrently. Comparing the
+    two benchmarks shows what the per-customer lock costs, and that
+    requests of different customers are not serialized. It needs a
+    database other threads can read, like ``concurrency_benchmarks``, and
+    is only meaningful on one with row locks: SQLite locks whole tables and
+    fails most of the racing requests.
+
+    Returns:
+        dict: ``summarize_latencies`` results, with the highest number of
+        loans granted to one customer and the number of failed requests,
+        keyed by benchmark name.
+    """
+
+    rng = random.Random(seed)
+
+    def fresh_customers(count):
+        customer_ids = []
+        for _ in range(count):
+            monthly_salary = rng.randrange(20000, 100000, 1000)
+            customer = CustomerData.objects.create(
+                first_name="Contention",
+                last_name="Benchmark",
+                age=rng.randrange(21, 60),
+                phone_number=rng.randrange(6000000000, 9999999999),
+                monthly_salary=monthly_salary,
+                approved_limit=round(36 * monthly_salary, -5),
+            )
+            customer_ids.append(customer.customer_id)
+        return customer_ids
+
+    def race(rounds_customers):
+        start = threading.Barrier(threads)
+        latencies = []
+        failures = []
+
+        def client_loop(index):
+            client = Client()
+            try:
+                for customer_ids in rounds_customers:
+                    customer_id = customer_ids[index]
+                    limit = CustomerData.objects.get(customer_id=customer_id).approved_limit
+                    payload = {
+                        "customer_id": customer_id,
+                        "loan_amount": limit // 2,
+                        "interest_rate": 12,
+                        "tenure": 12,
+                    }
+                    start.wait()
+                    started = time.perf_counter()
+                    response = client.post(
+                        reverse("create_loan"), payload, content_type="application/json"
+                    )
+                    latencies.append((time.perf_counter() - started) * 1000)
+                    if response.status_code not in (200, 201):
+                        failures.append(response.status_code)
+            finally:
+                connections.close_all()
+
+        workers = [threading.Thread(target=client_loop, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        result = summarize_latencies(latencies, time.perf_counter() - started)
+
+        customer_ids = {pk for customer_ids in rounds_customers for pk in customer_ids}
+        loans = Counter(
+            LoanData.objects.filter(customer_id__in=customer_ids).values_list(
+                "customer_id", flat=True
+            )
+        )
+        result["max_loans_per_customer"] = max(loans.values(), default=0)
+        result["failed_requests"] = len(failures)
+        return result
+
+    same_customer = [[customer_id] * threads for customer_id in fresh_customers(rounds)]
+    distinct_customers = [fresh_customers(threads) for _ in range(rounds)]
+    return {
+        f"contention_create_loan_same_customer_t{threads}": race(same_customer),
+        f"contention_create_loan_distinct_customers_t{threads}": race(distinct_customers),
+    }
+
+
+def run_benchmarks(
+    customers=1000,
+    loans_per_customer=10,
+    requests=200,
+    import_rows=5000,
+    seed=0,
+    concurrency=0,
+    sync_threads=8,
+    slow_client_ms=0,
+    contention_threads=0,
+):
+    """
+    Seeds a synthetic book and runs every benchmark against the current database.
+
+    Args:
+        customers (int): Number of customers in the seeded book.
+        loans_per_customer (int): Number of loans per seeded customer.
+        requests (int): Number of calls per endpoint benchmark.
+        import_rows (int): Number of rows in each import file.
+        seed (int): Seed of the random generators.
+        concurrency (int): Number of concurrent clients comparing the sync
+            and async views, or 0 to skip that comparison. It needs a
+            database other threads can read, which rules out running it
+            inside a test transaction.
+        sync_threads (int): Worker threads of the simulated sync server.
+        slow_client_ms (int): Time each concurrent client takes to send and
+            read a request.
+        contention_threads (int): Number of threads racing create-loan
+            requests, or 0 to skip ``contention_benchmarks``. Like
+            ``concurrency``, it cannot run inside a test transaction.
+
+    Returns:
+        dict: Run metadata and results keyed by benchmark name.
+    """
+
+    started = time.perf_counter()
+    book = SyntheticBook(
+        customers, min_loans=loans_per_customer, max_loans=loans_per_customer, seed=seed
+    )
+    customer_ids, loan_ids = insert_book(book)
+    seed_seconds = time.perf_counter() - started
+
+    rng = random.Random(seed)
+    benchmarks = {
+        "loan_approval": measure(
+            lambda i: CheckLoanApproval(rng.choice(customer_ids)).loan_approval(),
+            requests,
+        ),
+    }
+    benchmarks.update(endpoint_benchmarks(customer_ids, loan_ids, requests, seed))
+    if concurrency:
+        benchmarks.update(
+            concurrency_benchmarks(
+                list(customer_ids), requests, concurrency, sync_threads, slow_client_ms, seed
+            )
+        )
+    if contention_threads:
+        rounds = max(1, requests // contention_threads)
+        benchmarks.update(contention_benchmarks(contention_threads, rounds, seed))
+    benchmarks.update(import_benchmarks(import_rows, seed))
+
+    return {
+        "meta": {
+            "vendor": connection.vendor,
+            "decision_cache": getattr(settings, "LOAN_DECISION_CACHE", {}).get("BACKEND")
+            or None,
+            "customers": customers,
+            "loans_per_customer": loans_per_customer,
+            "requests": requests,
+            "import_rows": import_rows,
+            "concurrency": concurrency,
+            "sync_threads": sync_threads,
+            "slow_client_ms": slow_client_ms,
+            "contention_threads": contention_threads,
+            "seed": seed,
+            "seed_seconds": round(seed_seconds, 3),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+        },
+        "benchmarks": benchmarks,
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance=0.2):
+    """
+    Lists the benchmarks that got worse than a stored baseline.
+
+    Latency and import throughput may move by ``tolerance`` before they count
+    as a regression. Query counts are deterministic and may not grow at all.
+
+    Args:
+        results (dict): Output of ``run_benchmarks``.
+        baseline (dict): An earlier output of ``run_benchmarks``.
+        tolerance (float): Allowed relative slowdown, e.g. 0.2 for 20%.
+
+    Returns:
+        list: One message per regression.
+    """
+
+    regressions = []
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if previous is None:
+            continue
+        if current.get("max_queries", 0) > previous.get("max_queries", 0):
+            regressions.append(
+                f"{name}: max queries {previous['max_queries']} -> {current['max_queries']}"
+            )
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms"
+            )
+        if "rows_per_second" in previous and current.get(
+            "rows_per_second", 0
+        ) < previous["rows_per_second"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: {previous['rows_per_second']} -> "
+                f"{current.get('rows_per_second', 0)} rows/sec"
+            )
+    return regressions
@@ -0,0 +1,313 @@
+import json
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.dispatch import receiver
+
+from config.db_router import current_read_alias, pin_customers_on_commit
+from config.metrics import (
+    DECISION_CACHE_EVICTIONS,
+    DECISION_CACHE_HITS,
+    DECISION_CACHE_MISSES,
+    REDIS_EVICTED_KEYS,
+)
+
+
+class BaseDecisionCache(ABC):
+    """
+    Base class for eligibility decision caches.
+
+    Decisions are keyed on the customer, a per-customer version counter and
+    the current date. Every loan write and every change to a customer's
+    salary or limit bumps the version, so a stale decision is never read
+    back and no TTL is needed for correctness.
+
+    The counters are also exported on ``/metrics``, labelled with
+    ``backend``.
+
+    Attributes:
+        backend: Name of the backend in ``LOAN_DECISION_CACHE``.
+        hits: Number of lookups answered from the cache.
+        misses: Number of lookups that had to compute the decision.
+        evictions: Number of decisions dropped to make room.
+    """
+
+    backend = None
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, customer_id, version):
+        return f"loan-decision:{customer_id}:{version}:{date.today().isoformat()}"
+
+    def _initial_version(self):
+        return random.randrange(1 << 62)
+
+    @abstractmethod
+    def get_version(self, customer_id):
+        """
+        Returns the customer's current version.
+        """
+
+    @abstractmethod
+    def bump_version(self, customer_id):
+        """
+        Moves the customer to a new version.
+        """
+
+    @abstractmethod
+    def get(self, key):
+        """
+        Returns the decision stored under a key, or None.
+        """
+
+    @abstractmethod
+    def set(self, key, value, timeout=None):
+        """
+        Stores a decision, for ``timeout`` seconds when one is given.
+        """
+
+    def get_or_compute(self, customer_id, compute):
+        """
+        Returns the cached decision for a customer, computing it on a miss.
+
+        The version is read before computing, so a decision computed while a
+        write is in flight is stored under the superseded version and never
+        served. Decisions computed from a replica are only kept for
+        ``REPLICA_STICKY_SECONDS``: the replica may not have caught up with
+        the write behind the version, but the customer is read from the
+        primary for that long after a write.
+        """
+
+        key = self.make_key(customer_id, self.get_version(customer_id))
+        decision = self.get(key)
+        if decision is not None:
+            self.hits += 1
+            DECISION_CACHE_HITS.labels(self.backend).inc()
+            return dict(decision)
+
+        self.misses += 1
+        DECISION_CACHE_MISSES.labels(self.backend).inc()
+        decision = compute()
+        if current_read_alias() == DEFAULT_DB_ALIAS:
+            self.set(key, dict(decision))
+        else:
+            seconds = getattr(settings, "REPLICA_STICKY_SECONDS", 5)
+            if seconds > 0:
+                self.set(key, dict(decision), timeout=seconds)
+        return decision
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def export_metrics(self):
+        """
+        Updates metrics read from the backend itself, before a scrape.
+        """
+
+
+class LRUDecisionCache(BaseDecisionCache):
+    """
+    In-process LRU decision cache.
+
+    Versions live in process memory, so this backend is only safe when every
+    loan and customer write happens in the same process (tests, single-process
+    development). Use ``RedisDecisionCache`` otherwise.
+
+    Only the versions of the ``max_versions`` most recently used customers
+    are kept. A dropped version restarts at a random value, as in
+    ``RedisDecisionCache``, so decisions stored under it are never matched
+    again.
+    """
+
+    backend = "lru"
+
+    def __init__(self, max_entries=10000, max_versions=None) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_versions = max_versions or max_entries
+        self._entries = OrderedDict()
+        self._versions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _current_version(self, customer_id):
+        version = self._versions.get(customer_id)
+        if version is None:
+            version = self._versions[customer_id] = self._initial_version()
+            while len(self._versions) > self.max_versions:
+                self._versions.popitem(last=False)
+        else:
+            self._versions.move_to_end(customer_id)
+        return version
+
+    def get_version(self, customer_id):
+        with self._lock:
+            return self._current_version(str(customer_id))
+
+    def bump_version(self, customer_id):
+        with self._lock:
+            customer_id = str(customer_id)
+            self._versions[customer_id] = self._current_version(customer_id) + 1
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            decision, expires = entry
+            if expires is not None and expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return decision
+
+    def set(self, key, value, timeout=None):
+        with self._lock:
+            expires = None if timeout is None else time.monotonic() + timeout
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                DECISION_CACHE_EVICTIONS.labels(self.backend).inc()
+
+
+class RedisDecisionCache(BaseDecisionCache):
+    """
+    Redis-backed decision cache shared by every web and Celery process.
+
+    A missing version key starts at a random value rather than zero, so
+    decisions stored before the key was lost can never be matched again.
+    Hit and miss counters are per process; evictions are read from Redis.
+
+    Args:
+        location: Redis URL, used when no client is given.
+        timeout: Expiry of stored decisions in seconds. Only bounds memory.
+        client: A ready redis client, or any object with the same
+            ``get``/``set``/``incr``/``info`` methods.
+    """
+
+    backend = "redis"
+
+    def __init__(self, location=None, timeout=86400, client=None) -> None:
+        super().__init__()
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(location)
+        self.client = client
+        self.timeout = timeout
+
+    def version_key(self, customer_id):
+        return f"loan-decision-version:{customer_id}"
+
+    def get_version(self, customer_id):
+        key = self.version_key(customer_id)
+        version = self.client.get(key)
+        if version is None:
+            self.client.set(key, self._initial_version(), nx=True)
+            version = self.client.get(key)
+        return int(version)
+
+    def bump_version(self, customer_id):
+        key = self.version_key(customer_id)
+        if not self.client.set(key, self._initial_version(), nx=True):
+            self.client.incr(key)
+
+    def get(self, key):
+        decision = self.client.get(key)
+        if decision is None:
+            return None
+        return json.loads(decision)
+
+    def set(self, key, value, timeout=None):
+        self.client.set(key, json.dumps(value), ex=timeout or self.timeout)
+
+    def stats(self):
+        stats = super().stats()
+        stats["evictions"] = int(self.client.info("stats").get("evicted_keys", 0))
+        return stats
+
+    def export_metrics(self):
+        REDIS_EVICTED_KEYS.set(self.stats()["evictions"])
+
+
+_decision_cache = None
+_decision_cache_lock = threading.Lock()
+
+
+def get_decision_cache():
+    """
+    Returns the decision cache configured by ``LOAN_DECISION_CACHE``.
+
+    Returns:
+        BaseDecisionCache: The configured cache, or None when caching is disabled.
+    """
+
+    global _decision_cache
+    config = getattr(settings, "LOAN_DECISION_CACHE", {})
+    backend = config.get("BACKEND")
+    if not backend:
+        return None
+
+    with _decision_cache_lock:
+        if _decision_cache is None:
+            if backend == "lru":
+                _decision_cache = LRUDecisionCache(
+                    max_entries=config.get("MAX_ENTRIES", 10000),
+                    max_versions=config.get("MAX_VERSIONS"),
+                )
+            elif backend == "redis":
+                _decision_cache = RedisDecisionCache(
+                    location=config.get("LOCATION"),
+                    timeout=config.get("TIMEOUT", 86400),
+                )
+            else:
+                raise ValueError(f"Unknown decision cache backend: {backend}")
+        return _decision_cache
+
+
+@receiver(setting_changed)
+def reset_decision_cache(setting, **kwargs):
+    global _decision_cache
+    if setting == "LOAN_DECISION_CACHE":
+        _decision_cache = None
+
+
+def bump_customer_versions(customer_ids):
+    """
+    Invalidates the cached decisions of the given customers.
+
+    The versions are bumped right away and again once the surrounding
+    transaction commits, so a decision computed from uncommitted data is
+    never stored under the final version.
+
+    The customers are also pinned to the primary database for a while, so
+    their next reads do not hit a replica that has not caught up yet.
+
+    Args:
+        customer_ids: Customer IDs whose loans or limits changed.
+    """
+
+    customer_ids = [customer_id for customer_id in customer_ids if customer_id is not None]
+    pin_customers_on_commit(customer_ids)
+
+    cache = get_decision_cache()
+    if cache is None:
+        return
+
+    def bump():
+        for customer_id in customer_ids:
+            cache.bump_version(customer_id)
+
+    bump()
+    transaction.on_commit(bump)
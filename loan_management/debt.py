@@ -0,0 +1,128 @@
+"""
+Maintenance of ``CustomerData.current_debt``.
+
+A customer's current debt is the total ``loan_amount`` of their open loans.
+A loan is open until every EMI is paid (``emi_paid_on_time`` reaches
+``tenure``) or it is deleted. Loan saves and deletes adjust the column with
+atomic ``F()`` updates (see ``loan_management.signals``); imports, which
+skip signals, recompute it for the customers of each batch.
+"""
+
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from customer_management.models import CustomerData
+from loan_management.models import LoanData
+
+DEBT_FIELDS = ("customer_id_id", "loan_amount", "tenure", "emi_paid_on_time")
+
+
+def open_loan_amount(loan_amount, tenure, emi_paid_on_time):
+    """
+    Returns what a loan adds to its customer's current debt.
+    """
+
+    return loan_amount if emi_paid_on_time < tenure else Decimal(0)
+
+
+def debt_contribution(values):
+    """
+    Returns the customer a loan is owed by and the debt it adds.
+
+    Args:
+        values (tuple): The loan's ``DEBT_FIELDS`` values. The amount may
+            still be a float or string from request data.
+    """
+
+    customer_id, loan_amount, tenure, emi_paid_on_time = values
+    field = LoanData._meta.get_field("loan_amount")
+    amount = Decimal(field.get_db_prep_save(loan_amount, connection))
+    return customer_id, open_loan_amount(amount, int(tenure), int(emi_paid_on_time))
+
+
+def adjust_current_debt(changes):
+    """
+    Applies debt changes with one atomic ``F()`` update per customer.
+
+    Args:
+        changes (dict): Amount to add, keyed by customer ID. Zero changes
+            are skipped.
+    """
+
+    for customer_id, amount in changes.items():
+        if customer_id is not None and amount:
+            CustomerData.objects.filter(customer_id=customer_id).update(
+                current_debt=F("current_debt") + amount
+            )
+
+
+def open_debt_subquery():
+    """
+    Sums the open loans of the customer in the outer query.
+    """
+
+    field = CustomerData._meta.get_field("current_debt")
+    return Subquery(
+        LoanData.objects.filter(
+            customer_id=OuterRef("customer_id"), emi_paid_on_time__lt=F("tenure")
+        )
+        .order_by()
+        .values("customer_id")
+        .annotate(total=Sum("loan_amount"))
+        .values("total"),
+        output_field=DecimalField(
+            max_digits=field.max_digits, decimal_places=field.decimal_places
+        ),
+    )
+
+
+def recompute_current_debt(customer_ids, batch_size=1000):
+    """
+    Recomputes the current debt of customers from their loans.
+
+    Each batch is a single ``UPDATE`` with a correlated subquery, so
+    concurrent ``F()`` adjustments are never lost.
+
+    Args:
+        customer_ids: Customer IDs whose debt should be recomputed.
+        batch_size: Maximum number of customers per query.
+
+    Returns:
+        int: Number of customers updated.
+    """
+
+    customer_ids = list(dict.fromkeys(customer_ids))
+    updated = 0
+    for start in range(0, len(customer_ids), batch_size):
+        updated += CustomerData.objects.filter(
+            customer_id__in=customer_ids[start : start + batch_size]
+        ).update(current_debt=Coalesce(open_debt_subquery(), Value(Decimal(0))))
+    return updated
+
+
+def find_debt_drift(customer_ids):
+    """
+    Compares stored current debt against the customers' open loans.
+
+    Args:
+        customer_ids: Customer IDs to check.
+
+    Returns:
+        list: ``(customer_id, stored, expected)`` for every customer that differs.
+    """
+
+    rows = (
+        CustomerData.objects.filter(customer_id__in=customer_ids)
+        .annotate(expected=open_debt_subquery())
+        .values_list("customer_id", "current_debt", "expected")
+    )
+    cents = Decimal("0.01")
+    drift = []
+    for customer_id, stored, expected in rows:
+        expected = Decimal(expected or 0).quantize(cents)
+        if stored != expected:
+            drift.append((customer_id, stored, expected))
+    return drift
@@ -0,0 +1,232 @@
+"""
+Idempotency keys for retried write requests.
+
+A client may send an ``Idempotency-Key`` header with a write request. The
+first request with a key claims it and runs; its response is stored and
+replayed for every repeat of the key, so a retried request is neither
+scored nor written twice. A repeat that arrives while the first request is
+still running waits for it instead of doing the same work.
+
+Keys live in the Django cache named by ``LOAN_IDEMPOTENCY["CACHE"]``. It
+must be shared between processes (Redis, or the database cache backend)
+for repeats to be recognised across workers; the default local memory
+cache only covers a single process.
+"""
+
+import functools
+import hashlib
+import json
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+DEFAULT_IDEMPOTENCY_SETTINGS = {
+    "CACHE": "default",
+    "TIMEOUT": 24 * 60 * 60,
+    "LOCK_TIMEOUT": 60,
+    "LOCK_TIMEOUT_PER_ITEM": 0.01,
+    "WAIT_TIMEOUT": 10,
+    "POLL_INTERVAL": 0.05,
+}
+
+
+class IdempotencyError(Exception):
+    status_code = status.HTTP_409_CONFLICT
+
+
+class IdempotencyKeyInProgress(IdempotencyError):
+    pass
+
+
+class IdempotencyKeyReused(IdempotencyError):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def idempotency_settings():
+    """
+    Returns ``LOAN_IDEMPOTENCY`` merged over the defaults.
+    """
+
+    return {**DEFAULT_IDEMPOTENCY_SETTINGS, **getattr(settings, "LOAN_IDEMPOTENCY", {})}
+
+
+def per_item_lock_timeout(request):
+    """
+    Returns a claim timeout for list requests that grows with their length.
+
+    ``LOCK_TIMEOUT`` covers the request itself and ``LOCK_TIMEOUT_PER_ITEM``
+    is added for each item, so the claim of a long bulk request does not
+    expire while it is still running.
+    """
+
+    options = idempotency_settings()
+    items = request.data if isinstance(request.data, list) else ()
+    return options["LOCK_TIMEOUT"] + len(items) * options["LOCK_TIMEOUT_PER_ITEM"]
+
+
+def request_fingerprint(data):
+    """
+    Hashes request data, ignoring the order of object keys.
+    """
+
+    content = json.dumps(data, cls=JSONEncoder, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Claims idempotency keys and stores the responses they produced.
+
+    A key holds either a pending claim, which expires after ``LOCK_TIMEOUT``
+    seconds so a crashed request cannot block its key forever, or the
+    stored response, kept for ``TIMEOUT`` seconds.
+
+    Args:
+        scope (str): Name of the endpoint, so keys of different endpoints
+            never collide.
+        options (dict): Overrides of ``idempotency_settings()``.
+    """
+
+    def __init__(self, scope, options=None) -> None:
+        self.scope = scope
+        self.options = {**idempotency_settings(), **(options or {})}
+        self.cache = caches[self.options["CACHE"]]
+
+    def make_key(self, idempotency_key):
+        digest = hashlib.sha256(idempotency_key.encode()).hexdigest()
+        return f"idempotency:{self.scope}:{digest}"
+
+    def acquire(self, idempotency_key, fingerprint):
+        """
+        Claims a key, or waits for the request that holds it.
+
+        Args:
+            idempotency_key (str): The client's key.
+            fingerprint (str): ``request_fingerprint`` of the request data.
+
+        Returns:
+            tuple: ``(token, None)`` when the key was claimed, where the token
+            is passed to ``release``, or ``(None, record)`` with the stored
+            ``status`` and ``data`` when the key already has a response.
+
+        Raises:
+            IdempotencyKeyReused: The key was used with different request data.
+            IdempotencyKeyInProgress: The request holding the key did not
+                finish within ``WAIT_TIMEOUT`` seconds.
+        """
+
+        key = self.make_key(idempotency_key)
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.options["WAIT_TIMEOUT"]
+        while True:
+            claim = {"fingerprint": fingerprint, "token": token}
+            if self.cache.add(key, claim, timeout=self.options["LOCK_TIMEOUT"]):
+                return token, None
+            record = self.cache.get(key)
+            if record is not None:
+                if record["fingerprint"] != fingerprint:
+                    raise IdempotencyKeyReused(
+                        f"{IDEMPOTENCY_HEADER} was already used with a different request."
+                    )
+                if "status" in record:
+                    return None, record
+            if time.monotonic() >= deadline:
+                raise IdempotencyKeyInProgress(
+                    f"A request with this {IDEMPOTENCY_HEADER} is still in progress."
+                )
+            time.sleep(self.options["POLL_INTERVAL"])
+
+    def complete(self, idempotency_key, fingerprint, status_code, data):
+        """
+        Stores the response of a claimed key for replay.
+        """
+
+        record = {"fingerprint": fingerprint, "status": status_code, "data": data}
+        self.cache.set(
+            self.make_key(idempotency_key), record, timeout=self.options["TIMEOUT"]
+        )
+
+    def release(self, idempotency_key, token):
+        """
+        Drops a claim without storing a response, so the key can be retried.
+
+        Claims that expired and were taken over by another request are kept.
+        """
+
+        key = self.make_key(idempotency_key)
+        record = self.cache.get(key)
+        if record is not None and record.get("token") == token:
+            self.cache.delete(key)
+
+
+def idempotent(
+    scope, replay_statuses=(status.HTTP_200_OK, status.HTTP_201_CREATED), lock_timeout=None
+):
+    """
+    Makes a DRF view handler honour the ``Idempotency-Key`` header.
+
+    Requests without the header run as before. Responses with a status in
+    ``replay_statuses`` are stored and replayed with an
+    ``Idempotent-Replayed: true`` header; any other response or exception
+    releases the key, so the client can fix the request and retry it.
+
+    Args:
+        scope (str): Name of the endpoint keys are scoped to.
+        replay_statuses (tuple): Response statuses that are stored.
+        lock_timeout (callable): Returns the claim timeout in seconds for a
+            request, for handlers that can outlast ``LOCK_TIMEOUT``, such as
+            ``per_item_lock_timeout``.
+    """
+
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+            if not idempotency_key:
+                return handler(view, request, *args, **kwargs)
+            if len(idempotency_key) > MAX_KEY_LENGTH:
+                error_message = (
+                    f"{IDEMPOTENCY_HEADER} must be at most {MAX_KEY_LENGTH} characters."
+                )
+                error_response_data = {"error_message": error_message}
+                return Response(error_response_data, status=status.HTTP_400_BAD_REQUEST)
+
+            options = {}
+            if lock_timeout is not None:
+                options["LOCK_TIMEOUT"] = lock_timeout(request)
+            store = IdempotencyStore(scope, options)
+            fingerprint = request_fingerprint(request.data)
+            try:
+                token, record = store.acquire(idempotency_key, fingerprint)
+            except IdempotencyError as e:
+                error_response_data = {"error_message": str(e)}
+                return Response(error_response_data, status=e.status_code)
+            if record is not None:
+                response = Response(record["data"], status=record["status"])
+                response[REPLAYED_HEADER] = "true"
+                return response
+
+            try:
+                response = handler(view, request, *args, **kwargs)
+            except BaseException:
+                store.release(idempotency_key, token)
+                raise
+            if response.status_code in replay_statuses:
+                data = json.loads(json.dumps(response.data, cls=JSONEncoder))
+                store.complete(idempotency_key, fingerprint, response.status_code, data)
+            else:
+                store.release(idempotency_key, token)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,160 @@
+"""
+Lean serialization of the loan views.
+
+Response bodies are built straight from ``.values()`` rows, with
+``repayments_left`` computed in SQL, and rendered with orjson when it is
+installed. The bytes are identical to what the DRF serializers and
+``JSONRenderer`` produce: decimals are rendered as strings at their
+column's scale and U+2028/U+2029 are escaped the way ``JSONRenderer`` does.
+"""
+
+import json
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import F
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+CUSTOMER_LOAN_FIELDS = (
+    "loan_id",
+    "loan_amount",
+    "interest_rate",
+    "emi_monthly_repayment",
+    "repayments_left",
+)
+LOAN_FIELDS = (
+    "loan_id",
+    "customer_id",
+    "customer_id__first_name",
+    "customer_id__last_name",
+    "customer_id__phone_number",
+    "customer_id__age",
+    "loan_amount",
+    "interest_rate",
+    "emi_monthly_repayment",
+    "tenure",
+)
+
+
+def lean_enabled(request=None):
+    """
+    Checks whether responses can take the lean path.
+
+    The lean path only reproduces DRF's default JSON output, so it is off
+    when ``LOAN_LEAN_SERIALIZATION`` is False, when DRF settings change the
+    JSON format, or when content negotiation picked another renderer.
+    """
+
+    if not getattr(settings, "LOAN_LEAN_SERIALIZATION", True):
+        return False
+    if not (
+        api_settings.UNICODE_JSON
+        and api_settings.COMPACT_JSON
+        and api_settings.COERCE_DECIMAL_TO_STRING
+    ):
+        return False
+    renderer = getattr(request, "accepted_renderer", None)
+    return renderer is None or type(renderer) is JSONRenderer
+
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return format(value, "f")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(data):
+    """
+    Renders data to JSON bytes matching ``JSONRenderer``.
+    """
+
+    if orjson is not None:
+        content = orjson.dumps(data, default=_default)
+    else:
+        content = json.dumps(
+            data, default=_default, ensure_ascii=False, separators=(",", ":")
+        ).encode()
+    return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+        b"\xe2\x80\xa9", b"\\u2029"
+    )
+
+
+def render_lean(request, data):
+    """
+    Renders data into a JSON response.
+
+    The rendering time is reported as ``serialize`` in ``request.timings``
+    when ``RequestMetricsMiddleware`` is active.
+    """
+
+    started = time.perf_counter()
+    content = dumps(data)
+    timings = getattr(request, "timings", None)
+    if timings is not None:
+        timings.serialize = time.perf_counter() - started
+    return HttpResponse(content, content_type="application/json")
+
+
+def customer_loan_rows(queryset):
+    """
+    Reads loans in the shape of ``ViewCustomerLoanSerializer``.
+
+    Returns:
+        QuerySet: Dicts with ``CUSTOMER_LOAN_FIELDS`` in order.
+    """
+
+    return queryset.annotate(
+        repayments_left=F("tenure") - F("emi_paid_on_time")
+    ).values(*CUSTOMER_LOAN_FIELDS)
+
+
+def loan_rows(queryset):
+    """
+    Reads loans in the shape of ``ViewLoanSerializer``, joined to their customer.
+
+    Returns:
+        QuerySet: Tuples with ``LOAN_FIELDS`` in order, see ``build_loan``.
+    """
+
+    return queryset.values_list(*LOAN_FIELDS)
+
+
+def build_loan(row):
+    """
+    Nests a ``loan_rows`` tuple the way ``ViewLoanSerializer`` does.
+    """
+
+    (
+        loan_id,
+        customer_id,
+        first_name,
+        last_name,
+        phone_number,
+        age,
+        loan_amount,
+        interest_rate,
+        emi_monthly_repayment,
+        tenure,
+    ) = row
+    return {
+        "loan_id": loan_id,
+        "customer": {
+            "customer_id": customer_id,
+            "first_name": first_name,
+            "last_name": last_name,
+            "phone_number": phone_number,
+            "age": age,
+        },
+        "loan_amount": loan_amount,
+        "interest_rate": interest_rate,
+        "emi_monthly_repayment": emi_monthly_repayment,
+        "tenure": tenure,
+    }
@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from customer_management.models import CustomerData
+
+
+def customer_id_batches(batch_size):
+    """
+    Yields every customer ID in primary key order, ``batch_size`` at a time.
+    """
+
+    customer_ids = CustomerData.objects.order_by("customer_id").values_list(
+        "customer_id", flat=True
+    )
+    batch = []
+    for customer_id in customer_ids.iterator(chunk_size=batch_size):
+        batch.append(customer_id)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class CustomerBatchCommand(BaseCommand):
+    """
+    Base class of commands that check or repair per-customer data in batches.
+
+    Every customer is passed to ``process_batch`` once, in batches of
+    ``--batch-size``. With ``--check`` nothing is written, and the command
+    fails when any customer drifted. The messages are formatted with the
+    ``processed`` and ``drifted`` counts.
+
+    Attributes:
+        check_help (str): Help text of the ``--check`` option.
+        drifted_message (str): Error raised by ``--check`` when customers drifted.
+        up_to_date_message (str): Output of ``--check`` when none drifted.
+        done_message (str): Output after a repair run.
+    """
+
+    check_help = None
+    drifted_message = None
+    up_to_date_message = None
+    done_message = None
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help=self.check_help)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        processed = 0
+        drifted = 0
+        for batch in customer_id_batches(options["batch_size"]):
+            drifted += self.process_batch(batch, options["check"])
+            processed += len(batch)
+
+        counts = {"processed": processed, "drifted": drifted}
+        if options["check"]:
+            if drifted:
+                raise CommandError(self.drifted_message.format(**counts))
+            self.stdout.write(self.up_to_date_message.format(**counts))
+        else:
+            self.stdout.write(self.done_message.format(**counts))
+
+    def process_batch(self, batch, check):
+        """
+        Checks or repairs one batch of customers.
+
+        Args:
+            batch (list): Customer IDs.
+            check (bool): Only report drift, without writing.
+
+        Returns:
+            int: Number of customers in the batch that drifted.
+        """
+
+        raise NotImplementedError
@@ -0,0 +1,105 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from loan_management.benchmarks import compare_to_baseline, run_benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a synthetic book in a throwaway test database and benchmarks "
+        "the API endpoints, loan scoring, concurrent loan creation and the "
+        "import tasks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=1000)
+        parser.add_argument("--loans-per-customer", type=int, default=10)
+        parser.add_argument(
+            "--requests", type=int, default=200, help="Calls per endpoint benchmark."
+        )
+        parser.add_argument(
+            "--import-rows", type=int, default=5000, help="Rows per import file."
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=50,
+            help="Concurrent clients comparing the sync and async views; 0 skips it.",
+        )
+        parser.add_argument(
+            "--sync-threads",
+            type=int,
+            default=8,
+            help="Worker threads of the simulated sync server.",
+        )
+        parser.add_argument(
+            "--slow-client-ms",
+            type=int,
+            default=0,
+            help="Time each concurrent client takes to send and read a request.",
+        )
+        parser.add_argument(
+            "--contention-threads",
+            type=int,
+            default=16,
+            help="Threads racing create-loan requests for the same customer; 0 skips it.",
+        )
+        parser.add_argument(
+            "--output", default="benchmark.json", help="File the results are written to."
+        )
+        parser.add_argument(
+            "--baseline", help="Earlier results to compare against."
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.2,
+            help="Allowed relative slowdown against the baseline.",
+        )
+
+    def handle(self, *args, **options):
+        # The book is seeded into a fresh test database next to the
+        # configured one, so benchmarks never touch real data. Only the
+        # primary gets a test database, so reads are kept off the replicas.
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with override_settings(DATABASE_REPLICAS=[]):
+                results = run_benchmarks(
+                    customers=options["customers"],
+                    loans_per_customer=options["loans_per_customer"],
+                    requests=options["requests"],
+                    import_rows=options["import_rows"],
+                    seed=options["seed"],
+                    concurrency=options["concurrency"],
+                    sync_threads=options["sync_threads"],
+                    slow_client_ms=options["slow_client_ms"],
+                    contention_threads=options["contention_threads"],
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        with open(options["output"], "w") as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+        for name, result in sorted(results["benchmarks"].items()):
+            self.stdout.write(
+                f"{name}: {result['throughput_per_second']}/s, "
+                f"p50 {result['p50_ms']}ms, p95 {result['p95_ms']}ms, "
+                f"p99 {result['p99_ms']}ms, {result.get('queries_per_call', '-')} queries"
+            )
+        self.stdout.write(f"Results written to {options['output']}.")
+
+        if options["baseline"]:
+            with open(options["baseline"]) as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = compare_to_baseline(results, baseline, options["tolerance"])
+            if regressions:
+                for regression in regressions:
+                    self.stdout.write(regression)
+                raise CommandError(f"{len(regressions)} benchmarks regressed.")
+            self.stdout.write("No regressions against the baseline.")
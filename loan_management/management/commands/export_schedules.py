@@ -0,0 +1,48 @@
+import csv
+import time
+
+from django.core.management.base import BaseCommand
+
+from loan_management.schedules import SCHEDULE_COLUMNS, iter_book_schedules
+
+
+def format_cents(cents):
+    return [f"{value // 100}.{value % 100:02d}" for value in cents.tolist()]
+
+
+class Command(BaseCommand):
+    help = "Exports the amortization schedule of every loan to a CSV file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="CSV file the schedules are written to.")
+        parser.add_argument(
+            "--batch-size", type=int, default=10000, help="Loans scheduled at a time."
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        loans = 0
+        installments = 0
+        with open(options["output"], "w", newline="") as output_file:
+            writer = csv.writer(output_file)
+            writer.writerow(SCHEDULE_COLUMNS)
+            for schedule in iter_book_schedules(batch_size=options["batch_size"]):
+                writer.writerows(
+                    zip(
+                        schedule["loan_id"].tolist(),
+                        schedule["installment"].tolist(),
+                        schedule["due_date"].astype(str).tolist(),
+                        format_cents(schedule["payment"]),
+                        format_cents(schedule["principal"]),
+                        format_cents(schedule["interest"]),
+                        format_cents(schedule["balance"]),
+                    )
+                )
+                loans += int((schedule["installment"] == 1).sum())
+                installments += len(schedule["installment"])
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Wrote {installments} installments of {loans} loans to "
+            f"{options['output']} in {elapsed:.1f}s."
+        )
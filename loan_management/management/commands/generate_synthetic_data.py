@@ -0,0 +1,79 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from loan_management.synthetic import SyntheticBook, insert_book, write_book
+
+
+class Command(BaseCommand):
+    help = (
+        "Generates synthetic customers and loans for load testing, either "
+        "inserted directly or written to import files."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=1000)
+        parser.add_argument("--min-loans", type=int, default=0, help="Fewest loans per customer.")
+        parser.add_argument("--max-loans", type=int, default=10, help="Most loans per customer.")
+        parser.add_argument(
+            "--on-time-ratio",
+            type=float,
+            default=0.6,
+            help="Share of loans with every EMI paid on time.",
+        )
+        parser.add_argument("--start-year", type=int, default=2015)
+        parser.add_argument("--end-year", type=int, default=2023)
+        parser.add_argument("--min-salary", type=int, default=20000)
+        parser.add_argument("--max-salary", type=int, default=200000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--batch-size", type=int, default=10000, help="Loans inserted per transaction."
+        )
+        parser.add_argument(
+            "--skip-profiles",
+            action="store_true",
+            help="Leave credit profiles to be rebuilt on first use.",
+        )
+        parser.add_argument(
+            "--output-dir",
+            help="Write customer and loan data files here instead of inserting rows.",
+        )
+        parser.add_argument("--format", choices=("csv", "xlsx"), default="csv")
+
+    def handle(self, *args, **options):
+        try:
+            book = SyntheticBook(
+                options["customers"],
+                min_loans=options["min_loans"],
+                max_loans=options["max_loans"],
+                on_time_ratio=options["on_time_ratio"],
+                start_year=options["start_year"],
+                end_year=options["end_year"],
+                min_salary=options["min_salary"],
+                max_salary=options["max_salary"],
+                seed=options["seed"],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        started = time.perf_counter()
+        if options["output_dir"]:
+            customer_path, loan_path = write_book(
+                book, options["output_dir"], options["format"]
+            )
+            self.stdout.write(
+                f"Wrote {customer_path} and {loan_path} "
+                f"in {time.perf_counter() - started:.1f}s."
+            )
+            return
+
+        customer_ids, loan_ids = insert_book(
+            book,
+            batch_size=options["batch_size"],
+            refresh_profiles=not options["skip_profiles"],
+        )
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Inserted {len(customer_ids)} customers and {len(loan_ids)} loans "
+            f"in {elapsed:.1f}s ({len(loan_ids) / elapsed:.0f} loans/s)."
+        )
@@ -0,0 +1,20 @@
+from loan_management.management.base import CustomerBatchCommand
+from loan_management.profiles import find_profile_drift, refresh_credit_profiles
+
+
+class Command(CustomerBatchCommand):
+    help = "Rebuilds the per-customer credit profiles or checks them for drift."
+    check_help = "Only report profiles that drifted from the loan table."
+    drifted_message = "{drifted} of {processed} credit profiles drifted."
+    up_to_date_message = "All {processed} credit profiles are up to date."
+    done_message = "Rebuilt {processed} credit profiles."
+
+    def process_batch(self, batch, check):
+        if not check:
+            refresh_credit_profiles(batch, batch_size=len(batch))
+            return 0
+
+        drift = find_profile_drift(batch)
+        for customer_id, fields in drift:
+            self.stdout.write(f"Customer {customer_id}: {', '.join(fields)}")
+        return len(drift)
@@ -0,0 +1,23 @@
+from loan_management.debt import find_debt_drift, recompute_current_debt
+from loan_management.management.base import CustomerBatchCommand
+
+
+class Command(CustomerBatchCommand):
+    help = "Recomputes every customer's current debt from their open loans."
+    check_help = "Only report customers whose current debt drifted."
+    drifted_message = "{drifted} of {processed} customers have drifted debt."
+    up_to_date_message = "Current debt of all {processed} customers is up to date."
+    done_message = (
+        "Reconciled the current debt of {processed} customers, {drifted} had drifted."
+    )
+
+    def process_batch(self, batch, check):
+        drift = find_debt_drift(batch)
+        if check:
+            for customer_id, stored, expected in drift:
+                self.stdout.write(
+                    f"Customer {customer_id}: {stored} stored, {expected} expected"
+                )
+        elif drift:
+            recompute_current_debt([customer_id for customer_id, _, _ in drift])
+        return len(drift)
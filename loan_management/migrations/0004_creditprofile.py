@@ -0,0 +1,28 @@
+# Generated by Django 4.2.10 on 2026-10-18 04:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0001_initial'),
+        ('loan_management', '0003_alter_loandata_customer_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditProfile',
+            fields=[
+                ('customer_id', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='credit_profile', serialize=False, to='customer_management.customerdata')),
+                ('total_loans', models.IntegerField(default=0)),
+                ('loans_paid_on_time', models.IntegerField(default=0)),
+                ('total_loan_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('active_emi_sum', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('active_emi_expires', models.DateField(null=True)),
+                ('loans_per_year', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.10 on 2026-10-18 04:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loan_management', '0004_creditprofile'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='loandata',
+            index=models.Index(fields=['customer_id', 'end_date', 'emi_monthly_repayment'], name='loan_customer_end_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loandata',
+            index=models.Index(fields=['customer_id', 'start_date'], name='loan_customer_start_date_idx'),
+        ),
+    ]
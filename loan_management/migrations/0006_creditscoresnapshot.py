@@ -0,0 +1,33 @@
+# Generated by Django 4.2.10 on 2026-10-18 04:36
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customer_management', '0002_importjob'),
+        ('loan_management', '0005_loandata_scoring_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CreditScoreSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField()),
+                ('credit_score', models.FloatField()),
+                ('approval', models.BooleanField(null=True)),
+                ('interest_rate', models.IntegerField(null=True)),
+                ('approved_limit', models.IntegerField()),
+                ('monthly_salary', models.IntegerField()),
+                ('computed_at', models.DateTimeField()),
+                ('customer_id', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='score_snapshots', to='customer_management.customerdata')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='creditscoresnapshot',
+            constraint=models.UniqueConstraint(fields=('customer_id', 'snapshot_date'), name='score_snapshot_customer_date_uniq'),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 from customer_management.models import CustomerData
 
@@ -15,3 +15,62 @@ class LoanData(models.Model):
     emi_paid_on_time = models.IntegerField()
     start_date = models.DateField(auto_now=True)
     end_date = models.DateField()
+
+    class Meta:
+        indexes = [
+            # Active EMIs: customer_id IN (...) AND end_date >= today.
+            models.Index(
+                fields=["customer_id", "end_date", "emi_monthly_repayment"],
+                name="loan_customer_end_date_idx",
+            ),
+            # Loans per start year, read without touching the rows.
+            models.Index(
+                fields=["customer_id", "start_date"],
+                name="loan_customer_start_date_idx",
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        # Credit profile updates run from post_save and must commit with the loan.
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+
+
+class CreditProfile(models.Model):
+    customer_id = models.OneToOneField(
+        CustomerData,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="credit_profile",
+    )
+    total_loans = models.IntegerField(default=0)
+    loans_paid_on_time = models.IntegerField(default=0)
+    total_loan_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    active_emi_sum = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    active_emi_expires = models.DateField(null=True)
+    loans_per_year = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class CreditScoreSnapshot(models.Model):
+    customer_id = models.ForeignKey(
+        CustomerData, on_delete=models.CASCADE, related_name="score_snapshots"
+    )
+    snapshot_date = models.DateField()
+    credit_score = models.FloatField()
+    # Null for scores falling between the interest tiers.
+    approval = models.BooleanField(null=True)
+    interest_rate = models.IntegerField(null=True)
+    # The customer values the score was computed from.
+    approved_limit = models.IntegerField()
+    monthly_salary = models.IntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            # Also serves the latest-snapshot lookup per customer.
+            models.UniqueConstraint(
+                fields=["customer_id", "snapshot_date"],
+                name="score_snapshot_customer_date_uniq",
+            ),
+        ]
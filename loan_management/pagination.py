@@ -0,0 +1,73 @@
+import json
+
+from django.conf import settings
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class LoanCursorPagination(CursorPagination):
+    """
+    Keyset pagination over ``loan_id``.
+
+    Each page is a ``loan_id > cursor`` range scan, so the cost of a page does
+    not grow with its position in the listing. Pagination is opt-in: it only
+    applies when the request passes ``cursor`` or ``page_size``, and plain
+    requests keep receiving the full list.
+    """
+
+    ordering = "loan_id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+    def is_requested(self, request):
+        return bool(
+            {self.cursor_query_param, self.page_size_query_param}
+            & set(request.query_params)
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request):
+            return None
+        return super().paginate_queryset(queryset, request, view)
+
+
+def iter_keyset(queryset, key="pk", batch_size=1000):
+    """
+    Iterates over a queryset in keyset-ordered batches.
+
+    Only one batch is held in memory at a time, whatever the database driver
+    does with the result set.
+
+    Args:
+        queryset: The queryset to iterate over.
+        key (str): Unique field to order and resume on.
+        batch_size (int): Number of rows fetched per query.
+    """
+
+    queryset = queryset.order_by(key)
+    last = None
+    while True:
+        batch = queryset if last is None else queryset.filter(**{f"{key}__gt": last})
+        batch = list(batch[:batch_size])
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        last = getattr(batch[-1], key)
+
+
+def stream_json_array(items):
+    """
+    Encodes serialized items as a JSON array, one chunk per item.
+
+    The output matches what ``JSONRenderer`` produces for the whole list.
+    """
+
+    ensure_ascii = not getattr(settings, "REST_FRAMEWORK", {}).get("UNICODE_JSON", True)
+    yield "["
+    for index, item in enumerate(items):
+        chunk = json.dumps(
+            item, cls=JSONEncoder, ensure_ascii=ensure_ascii, separators=(",", ":")
+        )
+        yield chunk if index == 0 else "," + chunk
+    yield "]"
@@ -0,0 +1,243 @@
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, Q, Sum
+from django.db.models.functions import ExtractYear
+
+from customer_management.models import CustomerData
+from loan_management.models import CreditProfile, LoanData
+
+PROFILE_FIELDS = (
+    "total_loans",
+    "loans_paid_on_time",
+    "total_loan_amount",
+    "active_emi_sum",
+    "active_emi_expires",
+    "loans_per_year",
+)
+
+
+def stored_value(loan, field_name):
+    """
+    Returns a loan attribute the way the database stores it.
+
+    Loans built from request data or spreadsheets may still hold floats or
+    datetimes, so the value is run through the field's own preparation.
+    """
+
+    field = LoanData._meta.get_field(field_name)
+    value = getattr(loan, field_name)
+    if field.get_internal_type() == "DecimalField":
+        return Decimal(field.get_db_prep_save(value, connection))
+    return field.to_python(value)
+
+
+def is_current(active_emi_expires, today=None):
+    """
+    Checks whether a profile's active EMI sum is still valid.
+
+    The active EMI sum only covers loans whose ``end_date`` has not passed, so
+    it goes stale once the earliest of those loans ends.
+    """
+
+    today = today or date.today()
+    return active_emi_expires is None or active_emi_expires >= today
+
+
+def active_loans_queryset(customer_ids, today):
+    """
+    Sums the EMIs of loans still running on ``today``, per customer.
+
+    Covered by the ``loan_customer_end_date_idx`` index.
+    """
+
+    return (
+        LoanData.objects.filter(customer_id__in=customer_ids, end_date__gte=today)
+        .order_by()
+        .values("customer_id")
+        .annotate(
+            active_emi_sum=Sum("emi_monthly_repayment"),
+            active_emi_expires=Min("end_date"),
+        )
+    )
+
+
+def loans_per_year_queryset(customer_ids):
+    """
+    Counts loans per customer and start year.
+
+    Covered by the ``loan_customer_start_date_idx`` index.
+    """
+
+    return (
+        LoanData.objects.filter(customer_id__in=customer_ids)
+        .order_by()
+        .values("customer_id", year=ExtractYear("start_date"))
+        .annotate(count=Count("pk"))
+    )
+
+
+def compute_credit_profiles(customer_ids, today=None):
+    """
+    Computes credit profiles from the loan table with grouped queries.
+
+    Args:
+        customer_ids: Customer IDs to compute profiles for.
+        today: Date deciding which loans count as active.
+
+    Returns:
+        dict: Unsaved ``CreditProfile`` instances keyed by customer ID.
+    """
+
+    today = today or date.today()
+    loans = LoanData.objects.filter(customer_id__in=customer_ids).order_by()
+
+    profiles = {
+        customer_id: CreditProfile(customer_id_id=customer_id)
+        for customer_id in CustomerData.objects.filter(
+            customer_id__in=customer_ids
+        ).values_list("customer_id", flat=True)
+    }
+    for row in loans.values("customer_id").annotate(
+        total_loans=Count("pk"),
+        loans_paid_on_time=Count("pk", filter=Q(tenure=F("emi_paid_on_time"))),
+        total_loan_amount=Sum("loan_amount"),
+    ):
+        profile = profiles.get(row["customer_id"])
+        if profile is None:
+            continue
+        profile.total_loans = row["total_loans"]
+        profile.loans_paid_on_time = row["loans_paid_on_time"]
+        profile.total_loan_amount = row["total_loan_amount"] or 0
+
+    # A range on end_date, read from the (customer_id, end_date, emi) index.
+    for row in active_loans_queryset(customer_ids, today):
+        profile = profiles.get(row["customer_id"])
+        if profile is None:
+            continue
+        profile.active_emi_sum = row["active_emi_sum"] or 0
+        profile.active_emi_expires = row["active_emi_expires"]
+
+    loans_per_year = defaultdict(dict)
+    for row in loans_per_year_queryset(customer_ids):
+        loans_per_year[row["customer_id"]][str(row["year"])] = row["count"]
+    for customer_id, profile in profiles.items():
+        profile.loans_per_year = loans_per_year.get(customer_id, {})
+    return profiles
+
+
+def refresh_credit_profiles(customer_ids, create=True, batch_size=1000):
+    """
+    Recomputes and stores the credit profiles of the given customers.
+
+    Args:
+        customer_ids: Customer IDs whose profiles should be rebuilt.
+        create: Whether missing profiles should be created. When False only
+            existing profiles are updated, which is what deletes need while a
+            customer is being removed.
+        batch_size: Maximum number of customers per query.
+
+    Returns:
+        dict: Stored ``CreditProfile`` instances keyed by customer ID.
+    """
+
+    customer_ids = list(dict.fromkeys(customer_ids))
+    refreshed = {}
+    for start in range(0, len(customer_ids), batch_size):
+        batch = customer_ids[start : start + batch_size]
+        # In a transaction, so the loans are read from the primary.
+        with transaction.atomic():
+            profiles = compute_credit_profiles(batch)
+            if not create:
+                existing = set(
+                    CreditProfile.objects.filter(customer_id__in=batch).values_list(
+                        "customer_id", flat=True
+                    )
+                )
+                profiles = {pk: p for pk, p in profiles.items() if pk in existing}
+            options = {
+                "update_conflicts": True,
+                "update_fields": PROFILE_FIELDS + ("updated_at",),
+            }
+            # MySQL matches on every unique key and does not accept a target.
+            if connection.features.supports_update_conflicts_with_target:
+                options["unique_fields"] = ["customer_id"]
+            CreditProfile.objects.bulk_create(profiles.values(), **options)
+        refreshed.update(profiles)
+    return refreshed
+
+
+def apply_loan_created(loan):
+    """
+    Folds a newly created loan into its customer's credit profile.
+
+    The profile row is locked for the update. Profiles that are missing or
+    whose active EMI sum went stale are recomputed instead.
+
+    Args:
+        loan (LoanData): The loan that has just been inserted.
+    """
+
+    today = date.today()
+    with transaction.atomic():
+        profile = (
+            CreditProfile.objects.select_for_update()
+            .filter(customer_id=loan.customer_id_id)
+            .first()
+        )
+        if profile is None or not is_current(profile.active_emi_expires, today):
+            refresh_credit_profiles([loan.customer_id_id])
+            return
+
+        profile.total_loans += 1
+        if loan.tenure == loan.emi_paid_on_time:
+            profile.loans_paid_on_time += 1
+        profile.total_loan_amount += stored_value(loan, "loan_amount")
+
+        end_date = stored_value(loan, "end_date")
+        if end_date >= today:
+            profile.active_emi_sum += stored_value(loan, "emi_monthly_repayment")
+            if profile.active_emi_expires is None or end_date < profile.active_emi_expires:
+                profile.active_emi_expires = end_date
+
+        year = str(stored_value(loan, "start_date").year)
+        profile.loans_per_year[year] = profile.loans_per_year.get(year, 0) + 1
+        profile.save()
+
+
+def find_profile_drift(customer_ids, today=None):
+    """
+    Compares stored credit profiles against freshly computed ones.
+
+    Args:
+        customer_ids: Customer IDs to check.
+        today: Date deciding which loans count as active.
+
+    Returns:
+        list: ``(customer_id, field names)`` for every profile that differs.
+    """
+
+    today = today or date.today()
+    expected = compute_credit_profiles(customer_ids, today)
+    stored = CreditProfile.objects.in_bulk(list(expected))
+
+    drift = []
+    for customer_id, profile in expected.items():
+        current = stored.get(customer_id)
+        if current is None:
+            drift.append((customer_id, ["missing"]))
+            continue
+        fields = ["total_loans", "loans_paid_on_time", "total_loan_amount", "loans_per_year"]
+        # A stale active EMI sum is refreshed lazily and is not drift.
+        if is_current(current.active_emi_expires, today):
+            fields += ["active_emi_sum", "active_emi_expires"]
+        changed = [
+            field
+            for field in fields
+            if getattr(current, field) != getattr(profile, field)
+        ]
+        if changed:
+            drift.append((customer_id, changed))
+    return drift
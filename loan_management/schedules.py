@@ -0,0 +1,191 @@
+"""
+Amortization schedules of loans.
+
+Schedules follow the flat-rate method ``CreateLoan`` prices EMIs with: the
+interest is ``loan_amount * interest_rate / 100`` over the whole tenure, and
+principal and interest are repaid in equal monthly parts. Amounts are
+computed in integer cents; the cents left over by the equal split are added
+to the last installment, so every schedule repays the loan amount and the
+interest exactly. Installment ``k`` is due ``k`` months after the loan's
+start date, clipped to the end of shorter months, so the last one falls on
+the loan's end date.
+
+``iter_schedule`` lazily yields the installments of one loan.
+``bulk_schedules`` builds the installments of many loans at once with NumPy.
+"""
+
+from decimal import Decimal
+
+import numpy as np
+from dateutil.relativedelta import relativedelta
+
+from loan_management.models import LoanData
+from loan_management.scoring import to_cents
+
+SCHEDULE_COLUMNS = (
+    "loan_id",
+    "installment",
+    "due_date",
+    "payment",
+    "principal",
+    "interest",
+    "balance",
+)
+LOAN_SCHEDULE_FIELDS = ("loan_id", "loan_amount", "interest_rate", "tenure", "start_date")
+
+
+def flat_interest_cents(amount_cents, rate_hundredths):
+    """
+    Returns the interest of a loan over its whole tenure, in cents.
+
+    Args:
+        amount_cents: Loan amount in cents, an int or an int64 array.
+        rate_hundredths: Interest rate in hundredths of a percent.
+
+    Returns:
+        The interest in cents, rounded half up.
+    """
+
+    return (amount_cents * rate_hundredths + 5000) // 10000
+
+
+def cents_to_decimal(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def iter_schedule(loan):
+    """
+    Lazily yields the installments of one loan.
+
+    Args:
+        loan (LoanData): The loan, with ``loan_amount``, ``interest_rate``,
+            ``tenure`` and ``start_date`` set.
+
+    Yields:
+        dict: ``installment`` number, ``due_date``, and the ``payment``,
+        ``principal``, ``interest`` and remaining ``balance`` as Decimals.
+    """
+
+    tenure = loan.tenure
+    if tenure <= 0:
+        return
+    amount = to_cents(loan.loan_amount)
+    interest = flat_interest_cents(amount, to_cents(loan.interest_rate))
+    principal_part, principal_rest = divmod(amount, tenure)
+    interest_part, interest_rest = divmod(interest, tenure)
+
+    balance = amount
+    for installment in range(1, tenure + 1):
+        principal = principal_part
+        interest = interest_part
+        if installment == tenure:
+            principal += principal_rest
+            interest += interest_rest
+        balance -= principal
+        yield {
+            "installment": installment,
+            "due_date": loan.start_date + relativedelta(months=installment),
+            "payment": cents_to_decimal(principal + interest),
+            "principal": cents_to_decimal(principal),
+            "interest": cents_to_decimal(interest),
+            "balance": cents_to_decimal(balance),
+        }
+
+
+def add_months(dates, months):
+    """
+    Adds months to ``datetime64[D]`` dates, clipping to the end of the month.
+
+    Matches ``date + relativedelta(months=...)``.
+    """
+
+    start_month = dates.astype("datetime64[M]")
+    day = dates - start_month.astype("datetime64[D]")
+    month = start_month + months
+    month_start = month.astype("datetime64[D]")
+    month_length = (month + 1).astype("datetime64[D]") - month_start
+    return month_start + np.minimum(day, month_length - 1)
+
+
+def bulk_schedules(loan_id, amount_cents, rate_hundredths, tenure, start_date):
+    """
+    Builds the installments of many loans at once.
+
+    Every argument holds one element per loan.
+
+    Args:
+        loan_id: Loan IDs.
+        amount_cents: Loan amounts in cents.
+        rate_hundredths: Interest rates in hundredths of a percent.
+        tenure: Tenures in months. Loans without a positive tenure get no
+            installments.
+        start_date: Start dates, as dates or ``datetime64[D]``.
+
+    Returns:
+        dict: One array per ``SCHEDULE_COLUMNS`` entry with one element per
+        installment, ordered by loan and installment. Amounts are int64
+        cents and ``due_date`` is ``datetime64[D]``.
+    """
+
+    loan_id = np.asarray(loan_id, dtype=np.int64)
+    amount = np.asarray(amount_cents, dtype=np.int64)
+    interest = flat_interest_cents(amount, np.asarray(rate_hundredths, dtype=np.int64))
+    tenure = np.maximum(np.asarray(tenure, dtype=np.int64), 0)
+    start_date = np.asarray(start_date, dtype="datetime64[D]")
+
+    loan_index = np.repeat(np.arange(len(loan_id)), tenure)
+    first_row = np.cumsum(tenure) - tenure
+    installment = np.arange(len(loan_index), dtype=np.int64) - first_row[loan_index] + 1
+
+    months = tenure[loan_index]
+    amount = amount[loan_index]
+    interest = interest[loan_index]
+    principal_part = amount // months
+    interest_part = interest // months
+    last = installment == months
+    principal = principal_part + np.where(last, amount - principal_part * months, 0)
+    interest = interest_part + np.where(last, interest - interest_part * months, 0)
+
+    return {
+        "loan_id": loan_id[loan_index],
+        "installment": installment,
+        "due_date": add_months(start_date[loan_index], installment),
+        "payment": principal + interest,
+        "principal": principal,
+        "interest": interest,
+        "balance": np.where(last, 0, amount - principal_part * installment),
+    }
+
+
+def iter_book_schedules(queryset=None, batch_size=10000):
+    """
+    Builds the schedules of every loan in keyset-ordered batches.
+
+    Args:
+        queryset: Loans to build schedules for, every loan by default.
+        batch_size (int): Number of loans read and scheduled at a time.
+
+    Yields:
+        dict: ``bulk_schedules`` output for one batch of loans.
+    """
+
+    loans = (queryset if queryset is not None else LoanData.objects.all()).order_by(
+        "loan_id"
+    ).values_list(*LOAN_SCHEDULE_FIELDS)
+    last = None
+    while True:
+        batch = loans if last is None else loans.filter(loan_id__gt=last)
+        batch = list(batch[:batch_size])
+        if not batch:
+            return
+        loan_id, amount, rate, tenure, start_date = zip(*batch)
+        yield bulk_schedules(
+            loan_id,
+            [to_cents(value) for value in amount],
+            [to_cents(value) for value in rate],
+            tenure,
+            start_date,
+        )
+        if len(batch) < batch_size:
+            return
+        last = batch[-1][0]
@@ -0,0 +1,216 @@
+"""
+Vectorized credit scoring engine.
+
+The scoring rules of ``CheckLoanApproval`` expressed over NumPy arrays with
+one element per customer, so many customers are scored at once without the
+ORM or per-customer Python loops. Money is carried in integer cents, which
+keeps the volume headroom and EMI-to-salary checks exact.
+"""
+
+from decimal import Decimal
+
+import numpy as np
+
+FACTOR_COLUMNS = (
+    "total_loans",
+    "loans_paid_on_time",
+    "current_year_loans",
+    "total_loan_amount",
+    "approved_limit",
+    "current_emis_sum",
+    "monthly_salary",
+)
+MONEY_COLUMNS = ("total_loan_amount", "current_emis_sum")
+
+# (lower bound, upper bound, approved, interest rate); bounds are exclusive.
+INTEREST_TIERS = (
+    (50, np.inf, True, 8),
+    (30, 50, True, 12),
+    (10, 30, True, 16),
+    (-np.inf, 10, False, 0),
+)
+
+
+def to_cents(value):
+    """
+    Converts a money amount to integer cents, exactly for Decimals and ints.
+    """
+
+    if isinstance(value, float):
+        value = Decimal(repr(value))
+    return int((Decimal(value) * 100).to_integral_value())
+
+
+def factor_columns(factors_list):
+    """
+    Turns per-customer factor dicts into columnar arrays.
+
+    Args:
+        factors_list: Sequence of dicts holding ``FACTOR_COLUMNS``, as
+            returned by ``CheckLoanApproval.get_credit_factors``.
+
+    Returns:
+        dict: One int64 array per factor; money columns are in cents.
+    """
+
+    columns = {}
+    for column in FACTOR_COLUMNS:
+        convert = to_cents if column in MONEY_COLUMNS else int
+        columns[column] = np.fromiter(
+            (convert(factors[column]) for factors in factors_list),
+            dtype=np.int64,
+            count=len(factors_list),
+        )
+    return columns
+
+
+def aggregate_loan_columns(
+    customer_index,
+    customers,
+    tenure,
+    emi_paid_on_time,
+    loan_amount_cents,
+    emi_cents,
+    active,
+    start_year,
+    current_year,
+):
+    """
+    Aggregates columnar loan attributes into per-customer factor columns.
+
+    Loans are grouped by ``customer_index``, the position of each loan's
+    customer in the output arrays.
+
+    Args:
+        customer_index: Customer position of every loan.
+        customers (int): Number of customers.
+        tenure: Tenure of every loan.
+        emi_paid_on_time: EMIs paid on time of every loan.
+        loan_amount_cents: Loan amount of every loan, in cents.
+        emi_cents: Monthly EMI of every loan, in cents.
+        active: Whether every loan is still running.
+        start_year: Start year of every loan.
+        current_year (int): Year counted as the current one.
+
+    Returns:
+        dict: ``total_loans``, ``loans_paid_on_time``, ``current_year_loans``,
+        ``total_loan_amount`` and ``current_emis_sum`` arrays. Customer
+        limits and salaries are added by the caller.
+    """
+
+    customer_index = np.asarray(customer_index, dtype=np.int64)
+
+    def count(mask=None):
+        return np.bincount(customer_index, weights=mask, minlength=customers).astype(np.int64)
+
+    def total(values):
+        # Sums in integers; bincount weights would go through float64.
+        sums = np.zeros(customers, dtype=np.int64)
+        np.add.at(sums, customer_index, np.asarray(values, dtype=np.int64))
+        return sums
+
+    return {
+        "total_loans": count(),
+        "loans_paid_on_time": count(np.asarray(tenure) == np.asarray(emi_paid_on_time)),
+        "current_year_loans": count(np.asarray(start_year) == current_year),
+        "total_loan_amount": total(loan_amount_cents),
+        "current_emis_sum": total(np.where(active, emi_cents, 0)),
+    }
+
+
+def credit_scores(columns):
+    """
+    Computes the credit score of every customer.
+
+    Mirrors the original rules term by term and in the same floating point
+    operation order, so scores are bit-identical to the per-customer logic:
+    each of on-time ratio, loan count, current-year loans and volume
+    headroom weighs 25%; the score is 0 when current EMIs exceed half the
+    salary or there is no headroom, and 100 for customers without loans.
+
+    Args:
+        columns (dict): Arrays from ``factor_columns``.
+
+    Returns:
+        numpy.ndarray: float64 credit scores.
+    """
+
+    total_loans = columns["total_loans"]
+    has_loans = total_loans != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        paid_on_time = (
+            (columns["loans_paid_on_time"] / np.where(has_loans, total_loans, 1)) * 100 * 25
+        ) / 100
+    loan_count = ((total_loans / 10) * 100 * 25) / 100
+
+    current_year_loans = columns["current_year_loans"]
+    current_year = np.select(
+        [current_year_loans == 0, current_year_loans == 1], [(100 * 25) / 100, (50 * 25) / 100], 0
+    )
+
+    approved_limit = columns["approved_limit"]
+    # int(limit - total amount) truncates toward zero.
+    headroom_cents = approved_limit * 100 - columns["total_loan_amount"]
+    eligible = np.sign(headroom_cents) * (np.abs(headroom_cents) // 100)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        volume = np.where(
+            eligible > 0, ((eligible / approved_limit) * 100 * 25) / 100, 0.0
+        )
+
+    emis_within_salary = columns["current_emis_sum"] <= columns["monthly_salary"] * 50
+    scores = np.where(
+        emis_within_salary & (volume != 0),
+        paid_on_time + loan_count + current_year + volume,
+        0.0,
+    )
+    return np.where(has_loans, scores, 100.0)
+
+
+def interest_tiers(scores):
+    """
+    Maps credit scores to approvals and interest rates.
+
+    Returns:
+        tuple: ``approved`` and ``interest_rate`` arrays, and a ``valid``
+        mask that is False for scores of exactly 10, 30 or 50, which fall
+        between the tiers.
+    """
+
+    approved = np.zeros(len(scores), dtype=bool)
+    interest_rate = np.zeros(len(scores), dtype=np.int64)
+    valid = np.zeros(len(scores), dtype=bool)
+    for lower, upper, tier_approved, tier_rate in INTEREST_TIERS:
+        in_tier = (scores > lower) & (scores < upper)
+        approved[in_tier] = tier_approved
+        interest_rate[in_tier] = tier_rate
+        valid |= in_tier
+    return approved, interest_rate, valid
+
+
+def loan_decisions(factors_list):
+    """
+    Scores many customers at once.
+
+    Args:
+        factors_list: Sequence of credit factor dicts.
+
+    Returns:
+        list: One decision dict per customer in the shape of
+        ``CheckLoanApproval.loan_approval``, or None where the score falls
+        on a tier boundary.
+    """
+
+    if not factors_list:
+        return []
+    scores = credit_scores(factor_columns(factors_list))
+    approved, interest_rate, valid = interest_tiers(scores)
+    return [
+        {
+            "approval": bool(approved[i]),
+            "interest_rate": int(interest_rate[i]),
+            "corrected_interest_rate": int(interest_rate[i]),
+        }
+        if valid[i]
+        else None
+        for i in range(len(factors_list))
+    ]
@@ -1,3 +1,4 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
 from rest_framework import serializers
 
 from customer_management.models import CustomerData
@@ -21,9 +22,54 @@ class CreateLoanSerializer(serializers.ModelSerializer):
         )
 
 
+class BatchCustomerField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves customers from the ``customers`` dict in the serializer context
+    instead of querying each one.
+    """
+
+    def to_internal_value(self, data):
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            return self.context["customers"][CustomerData._meta.pk.to_python(data)]
+        except KeyError:
+            self.fail("does_not_exist", pk_value=data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
+class CreateLoanBatchSerializer(CreateLoanSerializer):
+    """
+    ``CreateLoanSerializer`` for applications of a bulk request, whose
+    customers are read once per batch and passed in the context.
+    """
+
+    customer_id = BatchCustomerField(queryset=CustomerData.objects.all())
+
+
+class LoanCustomerSerializer(serializers.ModelSerializer):
+
+    class Meta:
+        model = CustomerData
+        fields = (
+            "customer_id",
+            "first_name",
+            "last_name",
+            "phone_number",
+            "age",
+        )
+
+
 class ViewLoanSerializer(serializers.ModelSerializer):
+    """
+    Serializes a loan with its customer nested as a single object.
+
+    Querysets passed in should ``select_related("customer_id")`` (see
+    ``ViewLoan.get_queryset``) so the customer is read through the join.
+    """
 
-    customer = serializers.SerializerMethodField()
+    customer = LoanCustomerSerializer(source="customer_id", read_only=True)
 
     class Meta:
         model = LoanData
@@ -36,17 +82,6 @@ class ViewLoanSerializer(serializers.ModelSerializer):
             "tenure",
         )
 
-    def get_customer(self, obj):
-        return CustomerData.objects.filter(
-            customer_id=obj.customer_id.customer_id
-        ).values(
-            "customer_id",
-            "first_name",
-            "last_name",
-            "phone_number",
-            "age",
-        )
-
 
 class ViewCustomerLoanSerializer(serializers.ModelSerializer):
 
@@ -0,0 +1,122 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from customer_management.models import CustomerData
+from loan_management.cache import bump_customer_versions
+from loan_management.debt import (
+    DEBT_FIELDS,
+    adjust_current_debt,
+    debt_contribution,
+    recompute_current_debt,
+)
+from loan_management.models import CreditProfile, LoanData
+from loan_management.profiles import apply_loan_created, refresh_credit_profiles
+
+DECISION_FIELDS = ("monthly_salary", "approved_limit")
+
+
+@receiver(post_init, sender=CustomerData)
+def remember_customer_limits(sender, instance, **kwargs):
+    """
+    Remembers the loaded salary and limit to detect decision-relevant changes.
+    """
+
+    instance._decision_values = tuple(getattr(instance, f) for f in DECISION_FIELDS)
+
+
+@receiver(post_save, sender=CustomerData)
+def create_credit_profile(sender, instance, created, raw=False, **kwargs):
+    """
+    Starts every new customer with an empty credit profile.
+    """
+
+    if created and not raw:
+        CreditProfile.objects.get_or_create(customer_id=instance)
+
+
+@receiver(post_save, sender=CustomerData)
+def invalidate_customer_decisions(sender, instance, created, **kwargs):
+    """
+    Invalidates cached decisions when the customer's salary or limit changes.
+    """
+
+    values = tuple(getattr(instance, f) for f in DECISION_FIELDS)
+    if created or values != instance._decision_values:
+        bump_customer_versions([instance.customer_id])
+    instance._decision_values = values
+
+
+@receiver(post_delete, sender=CustomerData)
+def invalidate_deleted_customer_decisions(sender, instance, **kwargs):
+    bump_customer_versions([instance.customer_id])
+
+
+@receiver(post_init, sender=LoanData)
+def remember_loan_customer(sender, instance, **kwargs):
+    """
+    Remembers the loaded customer so reassigned loans update both profiles,
+    and the loaded debt values so saves can adjust ``current_debt``.
+
+    Deferred fields are read from the instance dict, so loading a partial
+    loan costs no extra query.
+    """
+
+    loaded = instance.__dict__
+    instance._profile_customer_id = loaded.get("customer_id_id")
+    instance._debt_values = tuple(loaded.get(field) for field in DEBT_FIELDS)
+
+
+@receiver(post_save, sender=LoanData)
+def update_credit_profile(sender, instance, created, raw=False, **kwargs):
+    """
+    Keeps the customer's credit profile in step with saved loans.
+    """
+
+    if raw:
+        return
+    customer_ids = {instance.customer_id_id, instance._profile_customer_id} - {None}
+    if created:
+        apply_loan_created(instance)
+    else:
+        refresh_credit_profiles(customer_ids)
+    update_current_debt(instance, created, customer_ids)
+    bump_customer_versions(customer_ids)
+    instance._profile_customer_id = instance.customer_id_id
+    instance._debt_values = tuple(getattr(instance, field) for field in DEBT_FIELDS)
+
+
+def update_current_debt(loan, created, customer_ids):
+    """
+    Moves the loan's previous debt contribution to its current one.
+
+    Loans saved without their previous values loaded recompute the debt of
+    the affected customers instead.
+    """
+
+    customer_id, amount = debt_contribution(
+        tuple(getattr(loan, field) for field in DEBT_FIELDS)
+    )
+    changes = {customer_id: amount}
+    if not created:
+        if None in loan._debt_values:
+            recompute_current_debt(customer_ids)
+            return
+        previous_customer_id, previous_amount = debt_contribution(loan._debt_values)
+        changes[previous_customer_id] = changes.get(previous_customer_id, 0) - previous_amount
+    adjust_current_debt(changes)
+
+
+@receiver(post_delete, sender=LoanData)
+def remove_from_credit_profile(sender, instance, **kwargs):
+    """
+    Recomputes the customer's credit profile after a loan is deleted and
+    removes the loan from their current debt.
+    """
+
+    refresh_credit_profiles([instance.customer_id_id], create=False)
+    if None in instance._debt_values:
+        recompute_current_debt([instance.customer_id_id])
+    else:
+        customer_id, amount = debt_contribution(instance._debt_values)
+        adjust_current_debt({customer_id: -amount})
+    bump_customer_versions([instance.customer_id_id])
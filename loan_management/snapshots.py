@@ -0,0 +1,287 @@
+"""
+Dated credit score snapshots of the whole portfolio.
+
+``take_score_snapshot`` scores every customer straight from the loan table with
+the vectorized engine and stores the results per day. ``snapshot_decisions``
+serves eligibility reads from the latest snapshot, falling back to live
+scoring for customers that changed since it was taken.
+"""
+
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from customer_management.models import CustomerData
+from loan_management import scoring
+from loan_management.models import CreditScoreSnapshot, LoanData
+
+DEFAULT_SNAPSHOT_SETTINGS = {
+    "ENABLED": False,
+    "MAX_AGE_DAYS": 0,
+    "LIVE_IF_CHANGED": True,
+    "KEEP_DAYS": 30,
+}
+
+
+def snapshot_settings():
+    """
+    Returns ``LOAN_SCORE_SNAPSHOTS`` merged over the defaults.
+    """
+
+    return {**DEFAULT_SNAPSHOT_SETTINGS, **getattr(settings, "LOAN_SCORE_SNAPSHOTS", {})}
+
+
+def score_chunk(customers, loans, snapshot_date, current_year):
+    """
+    Scores a chunk of customers from their loans.
+
+    Args:
+        customers (list): ``(customer_id, approved_limit, monthly_salary)``
+            tuples.
+        loans: Iterable of ``(customer_id, tenure, emi_paid_on_time,
+            loan_amount, emi_monthly_repayment, start_date, end_date)``
+            tuples. Loans of customers outside the chunk are ignored.
+        snapshot_date (date): Date deciding which loans count as active.
+        current_year (int): Year counted as the current one.
+
+    Returns:
+        tuple: ``credit_scores`` and ``interest_tiers`` results, in the order
+        of ``customers``, and the number of loans scored.
+    """
+
+    index = {customer[0]: position for position, customer in enumerate(customers)}
+    columns = {
+        "customer_index": [],
+        "tenure": [],
+        "emi_paid_on_time": [],
+        "loan_amount_cents": [],
+        "emi_cents": [],
+        "active": [],
+        "start_year": [],
+    }
+    for customer_id, tenure, paid_on_time, amount, emi, start_date, end_date in loans:
+        position = index.get(customer_id)
+        if position is None:
+            continue
+        columns["customer_index"].append(position)
+        columns["tenure"].append(tenure)
+        columns["emi_paid_on_time"].append(paid_on_time)
+        columns["loan_amount_cents"].append(scoring.to_cents(amount))
+        columns["emi_cents"].append(scoring.to_cents(emi))
+        columns["active"].append(end_date >= snapshot_date)
+        columns["start_year"].append(start_date.year)
+
+    loan_count = len(columns["customer_index"])
+    factors = scoring.aggregate_loan_columns(
+        customers=len(customers), current_year=current_year, **columns
+    )
+    factors["approved_limit"] = np.array([c[1] for c in customers], dtype=np.int64)
+    factors["monthly_salary"] = np.array([c[2] for c in customers], dtype=np.int64)
+    scores = scoring.credit_scores(factors)
+    return scores, scoring.interest_tiers(scores), loan_count
+
+
+def _write_snapshots(snapshots, snapshot_date):
+    """
+    Upserts one chunk of snapshots, replacing earlier runs of the same day.
+    """
+
+    features = connection.features
+    options = {}
+    with transaction.atomic():
+        if features.supports_update_conflicts:
+            options = {
+                "update_conflicts": True,
+                "update_fields": [
+                    "credit_score",
+                    "approval",
+                    "interest_rate",
+                    "approved_limit",
+                    "monthly_salary",
+                    "computed_at",
+                ],
+            }
+            # MySQL matches on every unique key and does not accept a target.
+            if features.supports_update_conflicts_with_target:
+                options["unique_fields"] = ["customer_id", "snapshot_date"]
+        else:
+            CreditScoreSnapshot.objects.filter(
+                snapshot_date=snapshot_date,
+                customer_id__in=[snapshot.customer_id_id for snapshot in snapshots],
+            ).delete()
+        CreditScoreSnapshot.objects.bulk_create(snapshots, **options)
+
+
+def take_score_snapshot(current_year, snapshot_date=None, chunk_size=1000):
+    """
+    Scores every customer and stores the results as a dated snapshot.
+
+    Customers are read in keyset-ordered chunks. The loans of each chunk are
+    streamed ordered by customer and scored together by the vectorized
+    engine, so the job costs two queries and one upsert per chunk instead of
+    a scoring query per customer. Re-running it on the same day overwrites
+    that day's snapshot.
+
+    Args:
+        current_year (int): Year counted as the current one.
+        snapshot_date (date): Date of the snapshot, today by default. It also
+            decides which loans count as active.
+        chunk_size (int): Number of customers scored per chunk.
+
+    Returns:
+        dict: Snapshot date, customer and loan counts, and timing.
+    """
+
+    snapshot_date = snapshot_date or date.today()
+    started = time.perf_counter()
+    summary = {
+        "snapshot_date": snapshot_date.isoformat(),
+        "customers": 0,
+        "loans": 0,
+        "approved": 0,
+        "between_tiers": 0,
+        "chunks": 0,
+    }
+
+    customers = CustomerData.objects.order_by("customer_id").values_list(
+        "customer_id", "approved_limit", "monthly_salary"
+    )
+    last = None
+    while True:
+        chunk = customers if last is None else customers.filter(customer_id__gt=last)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            break
+        # Loan writes after this point leave the profile newer than the snapshot.
+        computed_at = timezone.now()
+        loans = (
+            LoanData.objects.filter(
+                customer_id__gte=chunk[0][0], customer_id__lte=chunk[-1][0]
+            )
+            .order_by("customer_id")
+            .values_list(
+                "customer_id",
+                "tenure",
+                "emi_paid_on_time",
+                "loan_amount",
+                "emi_monthly_repayment",
+                "start_date",
+                "end_date",
+            )
+        )
+        scores, (approved, interest_rate, valid), loan_count = score_chunk(
+            chunk, loans.iterator(chunk_size=chunk_size), snapshot_date, current_year
+        )
+        _write_snapshots(
+            [
+                CreditScoreSnapshot(
+                    customer_id_id=customer_id,
+                    snapshot_date=snapshot_date,
+                    credit_score=float(scores[i]),
+                    approval=bool(approved[i]) if valid[i] else None,
+                    interest_rate=int(interest_rate[i]) if valid[i] else None,
+                    approved_limit=approved_limit,
+                    monthly_salary=monthly_salary,
+                    computed_at=computed_at,
+                )
+                for i, (customer_id, approved_limit, monthly_salary) in enumerate(chunk)
+            ],
+            snapshot_date,
+        )
+
+        summary["customers"] += len(chunk)
+        summary["loans"] += loan_count
+        summary["approved"] += int((approved & valid).sum())
+        summary["between_tiers"] += int((~valid).sum())
+        summary["chunks"] += 1
+        last = chunk[-1][0]
+        if len(chunk) < chunk_size:
+            break
+
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    summary["customers_per_second"] = (
+        round(summary["customers"] / summary["seconds"], 1) if summary["seconds"] else 0.0
+    )
+    return summary
+
+
+def prune_score_snapshots(keep_days, today=None):
+    """
+    Deletes snapshots older than ``keep_days`` days.
+
+    Returns:
+        int: Number of snapshots deleted.
+    """
+
+    today = today or date.today()
+    cutoff = today - timedelta(days=keep_days)
+    deleted, _ = CreditScoreSnapshot.objects.filter(snapshot_date__lt=cutoff).delete()
+    return deleted
+
+
+def snapshot_decisions(customer_ids, today=None):
+    """
+    Reads eligibility decisions from the latest score snapshots.
+
+    Only snapshots at most ``MAX_AGE_DAYS`` old are used. With
+    ``LIVE_IF_CHANGED``, customers whose loans, salary or limit changed
+    after their snapshot was computed are left out, so the caller scores
+    them live. Scores between interest tiers are always left out.
+
+    Args:
+        customer_ids: Customer IDs to look up.
+        today: Date the snapshot age is measured from.
+
+    Returns:
+        dict: Decisions keyed by customer ID, in the shape of
+        ``CheckLoanApproval.loan_approval``. Empty when snapshots are disabled.
+    """
+
+    options = snapshot_settings()
+    if not options["ENABLED"]:
+        return {}
+    today = today or date.today()
+    rows = (
+        CreditScoreSnapshot.objects.filter(
+            customer_id__in=customer_ids,
+            snapshot_date__gte=today - timedelta(days=options["MAX_AGE_DAYS"]),
+            snapshot_date__lte=today,
+        )
+        # Older snapshots come first, so the latest one wins below.
+        .order_by("customer_id", "snapshot_date")
+        .values(
+            "customer_id",
+            "approval",
+            "interest_rate",
+            "approved_limit",
+            "monthly_salary",
+            "computed_at",
+            current_limit=F("customer_id__approved_limit"),
+            current_salary=F("customer_id__monthly_salary"),
+            profile_updated_at=F("customer_id__credit_profile__updated_at"),
+        )
+    )
+
+    latest = {row["customer_id"]: row for row in rows}
+    decisions = {}
+    for customer_id, row in latest.items():
+        if row["approval"] is None:
+            continue
+        if options["LIVE_IF_CHANGED"] and (
+            row["current_limit"] != row["approved_limit"]
+            or row["current_salary"] != row["monthly_salary"]
+            or row["profile_updated_at"] is None
+            or row["profile_updated_at"] > row["computed_at"]
+        ):
+            continue
+        decisions[customer_id] = {
+            "approval": row["approval"],
+            "interest_rate": row["interest_rate"],
+            "corrected_interest_rate": row["interest_rate"],
+        }
+    return decisions
@@ -0,0 +1,297 @@
+import csv
+import os
+import random
+from datetime import date
+
+import openpyxl
+from django.db import connection, transaction
+from django.db.models import Max
+
+from customer_management.models import CustomerData
+from loan_management.debt import recompute_current_debt
+from loan_management.models import LoanData
+from loan_management.profiles import refresh_credit_profiles
+
+FIRST_NAMES = ("Aaron", "Adrian", "Agnes", "Alejandrina", "Jane", "John", "Maria", "Ravi")
+LAST_NAMES = ("Crespo", "Doe", "Garcia", "Lamb", "Roe", "Sharma", "Spears", "Wong")
+TENURES = (6, 12, 24, 36, 60, 120, 138)
+INTEREST_RATES = (8, 8.5, 10, 12, 14, 16, 16.93)
+
+# Headers of the data files ``inject_customer_data`` and ``inject_loan_data`` read.
+CUSTOMER_HEADERS = (
+    "Customer ID",
+    "First Name",
+    "Last Name",
+    "Age",
+    "Phone Number",
+    "Monthly Salary",
+    "Approved Limit",
+)
+LOAN_HEADERS = (
+    "Customer ID",
+    "Loan ID",
+    "Loan Amount",
+    "Tenure",
+    "Interest Rate",
+    "Monthly payment",
+    "EMIs paid on Time",
+    "Date of Approval",
+    "End Date",
+)
+
+
+def next_id(model):
+    """
+    Returns the first primary key above every existing row of a model.
+    """
+
+    pk = model._meta.pk.name
+    return (model.objects.aggregate(last=Max(pk))["last"] or 0) + 1
+
+
+class SyntheticBook:
+    """
+    Generator of a reproducible synthetic book of customers and loans.
+
+    Rows come out as tuples in the column order of the import files (see
+    ``CUSTOMER_HEADERS`` and ``LOAN_HEADERS``), so the same rows can be
+    inserted directly or written to files for the import tasks.
+
+    Args:
+        customers (int): Number of customers.
+        min_loans (int): Fewest loans per customer.
+        max_loans (int): Most loans per customer; counts are uniform in between.
+        on_time_ratio (float): Share of loans with every EMI paid on time.
+        start_year (int): Earliest year a loan starts in.
+        end_year (int): Latest year a loan starts in.
+        min_salary (int): Lowest monthly salary.
+        max_salary (int): Highest monthly salary.
+        seed (int): Seed of the random generator.
+    """
+
+    def __init__(
+        self,
+        customers,
+        min_loans=0,
+        max_loans=10,
+        on_time_ratio=0.6,
+        start_year=2015,
+        end_year=2023,
+        min_salary=20000,
+        max_salary=200000,
+        seed=0,
+    ) -> None:
+        if not 0 <= min_loans <= max_loans:
+            raise ValueError("Expected 0 <= min_loans <= max_loans.")
+        if start_year > end_year:
+            raise ValueError("Expected start_year <= end_year.")
+        if not 0 < min_salary <= max_salary:
+            raise ValueError("Expected 0 < min_salary <= max_salary.")
+        self.customers = customers
+        self.min_loans = min_loans
+        self.max_loans = max_loans
+        self.on_time_ratio = on_time_ratio
+        self.start_year = start_year
+        self.end_year = end_year
+        self.min_salary = min_salary
+        self.max_salary = max_salary
+        self.rng = random.Random(seed)
+
+    def customer_row(self, customer_id):
+        rng = self.rng
+        monthly_salary = rng.randint(self.min_salary // 1000, self.max_salary // 1000) * 1000
+        return (
+            customer_id,
+            rng.choice(FIRST_NAMES),
+            rng.choice(LAST_NAMES),
+            rng.randint(21, 70),
+            rng.randint(6000000000, 9999999999),
+            monthly_salary,
+            36 * monthly_salary,
+        )
+
+    def loan_row(self, loan_id, customer_id, approved_limit):
+        """
+        Returns one loan row. EMIs use the flat-interest formula of ``CreateLoan``.
+        """
+
+        rng = self.rng
+        loan_amount = rng.randint(10, max(11, approved_limit // 2000)) * 1000
+        tenure = rng.choice(TENURES)
+        interest_rate = rng.choice(INTEREST_RATES)
+        start_date = date(rng.randint(self.start_year, self.end_year), rng.randint(1, 12), 1)
+        years, month = divmod(start_date.month - 1 + tenure, 12)
+        if rng.random() < self.on_time_ratio:
+            emi_paid_on_time = tenure
+        else:
+            emi_paid_on_time = rng.randint(0, tenure - 1)
+        return (
+            customer_id,
+            loan_id,
+            loan_amount,
+            tenure,
+            interest_rate,
+            round((loan_amount * interest_rate / 100 + loan_amount) / tenure, 2),
+            emi_paid_on_time,
+            start_date,
+            date(start_date.year + years, month + 1, 1),
+        )
+
+    def rows(self, first_customer_id=1, first_loan_id=1):
+        """
+        Yields every customer row with the rows of its loans.
+
+        Yields:
+            tuple: The customer row and a list of loan rows.
+        """
+
+        loan_id = first_loan_id
+        for customer_id in range(first_customer_id, first_customer_id + self.customers):
+            customer = self.customer_row(customer_id)
+            loans = []
+            for _ in range(self.rng.randint(self.min_loans, self.max_loans)):
+                loans.append(self.loan_row(loan_id, customer_id, customer[6]))
+                loan_id += 1
+            yield customer, loans
+
+
+def _insert_sql(model, columns):
+    qn = connection.ops.quote_name
+    return (
+        f"INSERT INTO {qn(model._meta.db_table)} "
+        f"({', '.join(qn(model._meta.get_field(c).column) for c in columns)}) "
+        f"VALUES ({', '.join(['%s'] * len(columns))})"
+    )
+
+
+def insert_book(book, batch_size=10000, refresh_profiles=True):
+    """
+    Inserts a synthetic book with batched multi-row inserts.
+
+    Rows bypass model instances and signals; the driver's ``executemany``
+    turns each batch into multi-row ``INSERT`` statements. IDs continue
+    after the highest existing ones.
+
+    Args:
+        book (SyntheticBook): The book to insert.
+        batch_size (int): Number of loans per transaction.
+        refresh_profiles (bool): Build the credit profiles of each batch of
+            customers. Missing profiles are otherwise rebuilt on first use.
+
+    Returns:
+        tuple: ``range`` of the created customer IDs and of the created loan IDs.
+    """
+
+    first_customer_id = next_id(CustomerData)
+    first_loan_id = next_id(LoanData)
+    customer_sql = _insert_sql(
+        CustomerData,
+        (
+            "customer_id",
+            "first_name",
+            "last_name",
+            "age",
+            "phone_number",
+            "monthly_salary",
+            "approved_limit",
+            "current_debt",
+        ),
+    )
+    loan_sql = _insert_sql(
+        LoanData,
+        (
+            "customer_id",
+            "loan_id",
+            "loan_amount",
+            "tenure",
+            "interest_rate",
+            "emi_monthly_repayment",
+            "emi_paid_on_time",
+            "start_date",
+            "end_date",
+        ),
+    )
+
+    def flush(customers, loans):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(customer_sql, customers)
+            if loans:
+                cursor.executemany(loan_sql, loans)
+            recompute_current_debt([customer[0] for customer in customers])
+            if refresh_profiles:
+                refresh_credit_profiles([customer[0] for customer in customers])
+
+    customers = []
+    loans = []
+    loan_count = 0
+    for customer, customer_loans in book.rows(first_customer_id, first_loan_id):
+        customers.append(customer + (0,))
+        loans.extend(customer_loans)
+        if len(loans) >= batch_size or len(customers) >= batch_size:
+            flush(customers, loans)
+            loan_count += len(loans)
+            customers, loans = [], []
+    if customers:
+        flush(customers, loans)
+        loan_count += len(loans)
+
+    return (
+        range(first_customer_id, first_customer_id + book.customers),
+        range(first_loan_id, first_loan_id + loan_count),
+    )
+
+
+def write_book(book, directory, file_format="csv", first_customer_id=None, first_loan_id=None):
+    """
+    Writes a synthetic book to customer and loan data files.
+
+    The files have the column layout ``inject_customer_data`` and
+    ``inject_loan_data`` expect. XLSX files are written in openpyxl's
+    write-only mode, so memory stays flat.
+
+    Args:
+        book (SyntheticBook): The book to write.
+        directory (str): Directory the files are created in.
+        file_format (str): "csv" or "xlsx".
+        first_customer_id (int): First customer ID, after the existing ones by default.
+        first_loan_id (int): First loan ID, after the existing ones by default.
+
+    Returns:
+        tuple: Paths of the customer file and the loan file.
+    """
+
+    if first_customer_id is None:
+        first_customer_id = next_id(CustomerData)
+    if first_loan_id is None:
+        first_loan_id = next_id(LoanData)
+    customer_path = os.path.join(directory, f"customer_data.{file_format}")
+    loan_path = os.path.join(directory, f"loan_data.{file_format}")
+    rows = book.rows(first_customer_id, first_loan_id)
+
+    if file_format == "csv":
+        with open(customer_path, "w", newline="") as customer_file, open(
+            loan_path, "w", newline=""
+        ) as loan_file:
+            customers = csv.writer(customer_file)
+            loans = csv.writer(loan_file)
+            customers.writerow(CUSTOMER_HEADERS)
+            loans.writerow(LOAN_HEADERS)
+            for customer, customer_loans in rows:
+                customers.writerow(customer)
+                loans.writerows(customer_loans)
+    elif file_format == "xlsx":
+        customer_workbook = openpyxl.Workbook(write_only=True)
+        loan_workbook = openpyxl.Workbook(write_only=True)
+        customers = customer_workbook.create_sheet()
+        loans = loan_workbook.create_sheet()
+        customers.append(CUSTOMER_HEADERS)
+        loans.append(LOAN_HEADERS)
+        for customer, customer_loans in rows:
+            customers.append(customer)
+            for loan in customer_loans:
+                loans.append(loan)
+        customer_workbook.save(customer_path)
+        loan_workbook.save(loan_path)
+    else:
+        raise ValueError(f"Unsupported file format: {file_format}")
+    return customer_path, loan_path
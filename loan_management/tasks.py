@@ -1,56 +1,348 @@
-import openpyxl
-from celery import shared_task
+import logging
+from datetime import date
 
+from celery import chain, shared_task
+from django.db import connection
+
+from customer_management.ingest import (
+    chunked_import,
+    import_file,
+    log_import,
+    mysql_bulk_load,
+    run_import_job,
+)
 from customer_management.models import CustomerData
+from customer_management.tasks import customer_import_chord, merge_import_results
+from loan_management.cache import bump_customer_versions
+from loan_management.debt import recompute_current_debt
 from loan_management.models import LoanData
+from loan_management.profiles import refresh_credit_profiles
+from loan_management.snapshots import (
+    prune_score_snapshots,
+    snapshot_settings,
+    take_score_snapshot,
+)
+from loan_management.utils import CheckLoanApproval
+
+logger = logging.getLogger(__name__)
+
+LOAN_COLUMNS = (
+    "customer_id",
+    "loan_id",
+    "loan_amount",
+    "tenure",
+    "interest_rate",
+    "monthly_repayment",
+    "emis_paid_on_time",
+    "start_date",
+    "end_date",
+)
+
+
+def build_loan(row):
+    """
+    Builds an unsaved loan from a row of the loan data file.
+
+    Only the customer's ID is assigned; ``resolve_loan_customers`` checks
+    that the customers exist for a whole batch at once.
+
+    Args:
+        row (tuple): Cell values of one row.
+
+    Returns:
+        LoanData: The loan, or None for rows without a customer.
+    """
+
+    customer_id, loan_id, loan_amount, tenure, interest_rate, monthly_repayment, emis_paid_on_time, start_date, end_date = row
+    if not customer_id:
+        return None
+
+    return LoanData(
+        customer_id_id=int(customer_id),
+        loan_id=int(loan_id),
+        loan_amount=float(loan_amount),
+        tenure=int(tenure),
+        interest_rate=float(interest_rate),
+        emi_monthly_repayment=float(monthly_repayment),
+        emi_paid_on_time=float(emis_paid_on_time),
+        start_date=start_date,
+        end_date=end_date
+    )
+
+
+def resolve_loan_customers(batch):
+    """
+    Checks that the customers referenced by a batch of loans exist.
+
+    Loans already in the database are upserted, possibly to another
+    customer, so the current owner of each is recorded on the loan as
+    ``_profile_customer_id`` for ``update_loan_customers``.
+
+    Args:
+        batch (list): ``(row_num, loan)`` pairs.
+
+    Returns:
+        tuple: The pairs with known customers, and ``(row_num, error)``
+        rejects for loans referencing unknown customers.
+    """
+
+    known = set(
+        CustomerData.objects.filter(
+            customer_id__in={loan.customer_id_id for _, loan in batch}
+        ).values_list("customer_id", flat=True)
+    )
+    owners = dict(
+        LoanData.objects.filter(
+            loan_id__in={loan.loan_id for _, loan in batch}
+        ).values_list("loan_id", "customer_id")
+    )
+    accepted = []
+    rejected = []
+    for row_num, loan in batch:
+        if loan.customer_id_id in known:
+            loan._profile_customer_id = owners.get(loan.loan_id)
+            accepted.append((row_num, loan))
+        else:
+            rejected.append((row_num, f"Unknown customer {loan.customer_id_id}"))
+    return accepted, rejected
+
+
+def update_loan_customers(loans):
+    """
+    Brings credit profiles, current debt and cached decisions in line with
+    inserted loans.
+
+    ``bulk_create`` skips model signals, so this runs inside each batch
+    transaction instead.
+    """
+
+    customer_ids = {loan.customer_id_id for loan in loans}
+    customer_ids.update(
+        loan._profile_customer_id
+        for loan in loans
+        if getattr(loan, "_profile_customer_id", None) is not None
+    )
+    refresh_credit_profiles(customer_ids)
+    recompute_current_debt(customer_ids)
+    bump_customer_versions(customer_ids)
+
+
+def previous_loan_owners(accepted_rows_sql):
+    """
+    Returns the current owners of the loans a native bulk load will upsert.
+
+    Args:
+        accepted_rows_sql (str): SQL selecting the accepted staging rows.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT t.customer_id_id FROM {LoanData._meta.db_table} t "
+            f"JOIN ({accepted_rows_sql}) a ON t.loan_id = CAST(a.loan_id AS UNSIGNED)"
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def update_bulk_loaded_customers(accepted_rows_sql, previous_owners=()):
+    """
+    Counterpart of ``update_loan_customers`` for natively bulk-loaded loans.
+
+    Args:
+        accepted_rows_sql (str): SQL selecting the upserted staging rows.
+        previous_owners: Customers that owned the upserted loans before.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT CAST(a.customer_id AS UNSIGNED) FROM ({accepted_rows_sql}) a"
+        )
+        customer_ids = {row[0] for row in cursor.fetchall()}
+    customer_ids.update(previous_owners or ())
+    refresh_credit_profiles(customer_ids)
+    recompute_current_debt(customer_ids)
+    bump_customer_versions(customer_ids)
+
+
+def bulk_load_loans(file_path):
+    """
+    Imports a loan CSV file through MySQL ``LOAD DATA LOCAL INFILE``.
+
+    Applies the same column mapping and checks as ``build_loan`` and
+    ``resolve_loan_customers``. ``start_date`` is set to the current date,
+    as ``auto_now`` does for ``bulk_create``.
+    """
+
+    numeric = r"'^-?[0-9]+(\\.[0-9]+)?$'"
+    return mysql_bulk_load(
+        file_path,
+        LoanData,
+        LOAN_COLUMNS,
+        key="loan_id",
+        select={
+            "customer_id_id": "CAST(s.customer_id AS UNSIGNED)",
+            "loan_id": "CAST(s.loan_id AS UNSIGNED)",
+            "loan_amount": "CAST(s.loan_amount AS DECIMAL(10, 2))",
+            "tenure": "CAST(s.tenure AS SIGNED)",
+            "interest_rate": "CAST(s.interest_rate AS DECIMAL(5, 2))",
+            "emi_monthly_repayment": "CAST(s.monthly_repayment AS DECIMAL(10, 2))",
+            "emi_paid_on_time": "TRUNCATE(CAST(s.emis_paid_on_time AS DECIMAL(20, 6)), 0)",
+            "start_date": "CURRENT_DATE",
+            "end_date": "CAST(s.end_date AS DATE)",
+        },
+        skip="COALESCE(customer_id, '') = ''",
+        checks=[
+            (
+                "NOT (s.customer_id REGEXP '^[0-9]+$' "
+                "AND s.loan_id REGEXP '^[0-9]+$' "
+                "AND s.tenure REGEXP '^-?[0-9]+$' "
+                f"AND s.loan_amount REGEXP {numeric} "
+                f"AND s.interest_rate REGEXP {numeric} "
+                f"AND s.monthly_repayment REGEXP {numeric} "
+                f"AND s.emis_paid_on_time REGEXP {numeric} "
+                "AND s.end_date REGEXP '^[0-9]{4}-[0-9]{1,2}-[0-9]{1,2}')",
+                "'Invalid values'",
+            ),
+            (
+                f"NOT EXISTS (SELECT 1 FROM {CustomerData._meta.db_table} c "
+                "WHERE c.customer_id = s.customer_id)",
+                "CONCAT('Unknown customer ', s.customer_id)",
+            ),
+        ],
+        before_insert=previous_loan_owners,
+        after_load=update_bulk_loaded_customers,
+    )
 
 
 @shared_task
-def inject_loan_data(file_path):
+def inject_loan_data(
+    file_path, batch_size=1000, start_row=None, end_row=None, restart=False
+):
+    """
+    Asynchronous task to inject loan data from a data file into the database.
+
+    Accepts XLSX, CSV and JSONL files. Rows are streamed from the file and
+    upserted with ``bulk_create`` in batches, each in its own transaction.
+    Customers are resolved with one query per batch; loans referencing
+    unknown customers are reported as rejects. Whole CSV files are loaded
+    natively on MySQL. The import runs as a resumable job, see
+    ``inject_customer_data``.
+
+    Args:
+        file_path (str): The path to the file containing loan data.
+        batch_size (int): Number of rows inserted per batch.
+        start_row (int): First row to import, or None for the first data row.
+        end_row (int): Last row to import, or None for the rest of the file.
+        restart (bool): Import the whole file or range again even if an
+            earlier run completed or left a checkpoint.
+
+    Returns:
+        dict: Row counts, rejected rows, rows/sec and peak memory of the import.
+    """
+
+    def run(resume_row, checkpoint):
+        return import_file(
+            file_path,
+            LOAN_COLUMNS,
+            build_loan,
+            LoanData,
+            batch_size=batch_size,
+            start_row=resume_row,
+            end_row=end_row,
+            bulk_load=bulk_load_loans,
+            validate_batch=resolve_loan_customers,
+            after_batch=update_loan_customers,
+            checkpoint=checkpoint,
+        )
+
+    summary = run_import_job("loan", file_path, run, start_row, end_row, restart=restart)
+    return log_import("Loan", file_path, summary)
+
+
+def loan_import_chord(file_path, chunk_size=50000, batch_size=1000, timed=True):
+    """
+    Builds the chord importing loan data in row ranges across workers.
+    """
+
+    return chunked_import(
+        inject_loan_data,
+        merge_import_results,
+        file_path,
+        "Loan",
+        chunk_size,
+        timed=timed,
+        batch_size=batch_size,
+    )
+
+
+def start_data_import(file_path, parallel=False, chunk_size=50000):
     """
-    Asynchronous task to inject loan data from an Excel file into the database.
+    Initiates the asynchronous task to import loan data from a data file.
 
     Args:
-        file_path (str): The path to the Excel file containing loan data.
+        file_path (str): The path to the XLSX, CSV or JSONL file containing loan data.
+        parallel (bool): Split the file into row ranges imported by one
+            subtask each, merged by a final callback. XLSX files are not
+            split (see ``chunked_import``).
+        chunk_size (int): Number of rows per subtask in parallel mode.
+    """
+    if parallel:
+        return loan_import_chord(file_path, chunk_size).apply_async()
+    return inject_loan_data.delay(file_path)
 
-    Raises:
-        Exception: Any unexpected error during data insertion.
 
-    Prints:
-        str: Print statements indicating the creation of loan data objects.
+def start_full_import(customer_file_path, loan_file_path, chunk_size=50000):
     """
-    workbook = openpyxl.load_workbook(file_path)
-    sheet = workbook.active
-    count = 1
-    for row_num in range(2, sheet.max_row + 1):
-        try:
-            row = [cell.value for cell in sheet[row_num]]
-            customer_id, loan_id, loan_amount, tenure, interest_rate, monthly_repayment, emis_paid_on_time, start_date, end_date = row
-            if customer_id:
-                customer_ins = CustomerData.objects.get(customer_id=customer_id)
-            
-                LoanData.objects.create(
-                    customer_id=customer_ins,
-                    loan_id=int(loan_id),
-                    loan_amount=float(loan_amount),
-                    tenure=int(tenure),
-                    interest_rate=float(interest_rate),
-                    emi_monthly_repayment=float(monthly_repayment),
-                    emi_paid_on_time=float(emis_paid_on_time),
-                    start_date=start_date,
-                    end_date=end_date
-                )
-                print(f"Created loan data object: {count}")
-                count += 1
-        except Exception as e:
-            print("Error while inserting data:", e)
+    Imports customers and then loans, each fanned out across workers.
 
+    Every customer chunk finishes before the first loan chunk starts, so
+    loans never reference customers that are still being imported.
 
-def start_data_import(file_path):
+    Args:
+        customer_file_path (str): The path to the customer data file.
+        loan_file_path (str): The path to the loan data file.
+        chunk_size (int): Number of rows per subtask.
     """
-    Initiates the asynchronous task to import loan data from an Excel file.
+    return chain(
+        customer_import_chord(customer_file_path, chunk_size),
+        loan_import_chord(loan_file_path, chunk_size, timed=False),
+    ).apply_async()
+
+
+@shared_task
+def rescore_portfolio(snapshot_date=None, chunk_size=1000):
+    """
+    Recomputes every customer's credit score and interest tier.
+
+    Meant to run nightly from Celery beat (see ``CELERY_BEAT_SCHEDULE``).
+    The scores are stored as a dated snapshot, which eligibility reads use
+    as a fast path when ``LOAN_SCORE_SNAPSHOTS`` is enabled. Snapshots older
+    than ``KEEP_DAYS`` are deleted afterwards.
 
     Args:
-        file_path (str): The path to the Excel file containing loan data.
+        snapshot_date (str): ISO date of the snapshot, or None for today.
+        chunk_size (int): Number of customers scored per chunk.
+
+    Returns:
+        dict: Customer and loan counts and timing of the run.
     """
-    inject_loan_data.delay(file_path)
\ No newline at end of file
+
+    if snapshot_date is not None:
+        snapshot_date = date.fromisoformat(snapshot_date)
+    summary = take_score_snapshot(
+        CheckLoanApproval.current_year, snapshot_date, chunk_size=chunk_size
+    )
+    summary["pruned"] = prune_score_snapshots(
+        snapshot_settings()["KEEP_DAYS"], date.fromisoformat(summary["snapshot_date"])
+    )
+    logger.info(
+        "Score snapshot for %s: %s customers and %s loans scored in %ss "
+        "(%s customers/sec, %s between tiers), %s old snapshots pruned",
+        summary["snapshot_date"],
+        summary["customers"],
+        summary["loans"],
+        summary["seconds"],
+        summary["customers_per_second"],
+        summary["between_tiers"],
+        summary["pruned"],
+    )
+    return summary
@@ -1,12 +1,56 @@
-from datetime import date
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+import csv
+from datetime import date, datetime
+from decimal import ROUND_HALF_UP, Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
+import numpy as np
+import openpyxl
+from asgiref.sync import sync_to_async
+from celery import current_app
+from dateutil.relativedelta import relativedelta
+from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.urls import reverse
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, connections, transaction
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from prometheus_client import REGISTRY
 from rest_framework import status
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
 from rest_framework.test import APIClient
-from .models import LoanData
+from . import cache as cache_module
+from . import scoring
+from .benchmarks import compare_to_baseline, contention_benchmarks, run_benchmarks
+from .cache import BaseDecisionCache, LRUDecisionCache, RedisDecisionCache, get_decision_cache
+from .idempotency import IdempotencyKeyReused, IdempotencyStore, request_fingerprint
+from .lean import dumps, lean_enabled
+from .models import CreditProfile, CreditScoreSnapshot, LoanData
+from .profiles import (
+    active_loans_queryset,
+    find_profile_drift,
+    loans_per_year_queryset,
+    refresh_credit_profiles,
+)
+from .schedules import bulk_schedules, iter_schedule
+from .serializers import ViewLoanSerializer
+from .synthetic import SyntheticBook, insert_book
+from .snapshots import snapshot_decisions, take_score_snapshot
+from .tasks import inject_loan_data, rescore_portfolio, start_full_import
+from .utils import CheckLoanApproval
+from .views import CreateLoanBulk, lock_customers
 
+from config.db_router import ReplicaRouter, replica_reads
 from customer_management.models import CustomerData
+from customer_management.tasks import inject_customer_data
 
 
 class CheckEligibilityAPITestCase(TestCase):
@@ -139,6 +183,366 @@ class CreateLoanAPITestCase(TestCase):
         self.assertIsNotNone(LoanData.objects.get(pk=loan_id))
 
 
+class CreateLoanLockingTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = CustomerData.objects.create(
+            customer_id=14,
+            first_name="John",
+            last_name="Doe",
+            age=30,
+            phone_number=1234567890,
+            monthly_salary=50000,
+            approved_limit=50000 * 36,
+        )
+        self.payload = {
+            "customer_id": 14,
+            "loan_amount": 900000,
+            "interest_rate": 12,
+            "tenure": 12,
+        }
+
+    def test_lock_customers(self):
+        CustomerData.objects.create(
+            customer_id=9,
+            first_name="Jane",
+            last_name="Roe",
+            age=35,
+            phone_number=1234567891,
+            monthly_salary=40000,
+            approved_limit=40000 * 36,
+        )
+
+        self.assertEqual(list(lock_customers([14, 999, 9])), [9, 14])
+
+    def test_decision_is_taken_under_the_lock(self):
+        def lock_after_concurrent_loan(customer_ids):
+            # Another request for the customer commits just before the lock is granted.
+            LoanData.objects.create(
+                customer_id=self.customer,
+                loan_amount=900000,
+                interest_rate=12,
+                tenure=12,
+                emi_monthly_repayment=84000,
+                emi_paid_on_time=0,
+                end_date=date.today() + relativedelta(months=12),
+            )
+            return lock_customers(customer_ids)
+
+        with mock.patch(
+            "loan_management.views.lock_customers", side_effect=lock_after_concurrent_loan
+        ) as lock:
+            response = self.client.post(reverse("create_loan"), self.payload, format="json")
+
+        lock.assert_called_once_with([14])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data["loan_approved"])
+        self.assertEqual(LoanData.objects.filter(customer_id=14).count(), 1)
+
+    @override_settings(LOAN_DECISION_CACHE={"BACKEND": "lru"})
+    def test_decision_ignores_the_decision_cache(self):
+        cache = LRUDecisionCache()
+        with mock.patch.object(cache_module, "_decision_cache", cache):
+            self.assertTrue(CheckLoanApproval(14).loan_approval()["approval"])
+            # A concurrent loan whose version bump has not landed yet.
+            with mock.patch.object(cache, "bump_version"):
+                LoanData.objects.create(
+                    customer_id=self.customer,
+                    loan_amount=900000,
+                    interest_rate=12,
+                    tenure=12,
+                    emi_monthly_repayment=84000,
+                    emi_paid_on_time=0,
+                    end_date=date.today() + relativedelta(months=12),
+                )
+            response = self.client.post(reverse("create_loan"), self.payload, format="json")
+
+        self.assertFalse(response.data["loan_approved"])
+        self.assertEqual(LoanData.objects.filter(customer_id=14).count(), 1)
+
+    def test_failed_creation_rolls_back(self):
+        with mock.patch(
+            "loan_management.views.CreateLoan.perform_create",
+            autospec=True,
+            side_effect=lambda view, serializer: (serializer.save(), 1 / 0),
+        ):
+            response = self.client.post(reverse("create_loan"), self.payload, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(LoanData.objects.exists())
+
+
+@skipUnless(connection.features.has_select_for_update, "needs row-level locks")
+class CreateLoanContentionTestCase(TransactionTestCase):
+    def test_concurrent_applications_grant_one_loan_per_customer(self):
+        results = contention_benchmarks(threads=4, rounds=2)
+
+        for result in results.values():
+            self.assertEqual(result["failed_requests"], 0)
+            self.assertEqual(result["max_loans_per_customer"], 1)
+
+
+class CreateLoanBulkAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for customer_id, monthly_salary in ((14, 50000), (15, 80000)):
+            CustomerData.objects.create(
+                customer_id=customer_id,
+                first_name="John",
+                last_name="Doe",
+                age=30,
+                phone_number=1234567890,
+                monthly_salary=monthly_salary,
+                approved_limit=monthly_salary * 36,
+            )
+        application = {"loan_amount": 100000, "interest_rate": 12, "tenure": 12}
+        self.items = [
+            {"customer_id": 14, **application},
+            {"customer_id": 15, **application, "loan_amount": 250000.5},
+            {"customer_id": 14, **application},
+            {"customer_id": 999, **application},
+            {"customer_id": 14, **application},
+            {"customer_id": 15, "interest_rate": 12, "tenure": 12},
+            {"customer_id": 15, **application, "tenure": 0},
+            "not an application",
+            {"customer_id": "14", **application},
+            {"customer_id": 14, **application},
+        ]
+
+    def state(self):
+        loans = list(
+            LoanData.objects.order_by("loan_id").values_list(
+                "customer_id", "loan_amount", "emi_monthly_repayment", "end_date"
+            )
+        )
+        profiles = list(
+            CreditProfile.objects.order_by("customer_id").values_list(
+                "customer_id", "total_loans", "total_loan_amount", "active_emi_sum"
+            )
+        )
+        debts = list(CustomerData.objects.order_by("customer_id").values_list("current_debt"))
+        return loans, profiles, debts
+
+    def without_loan_ids(self, results):
+        return [{k: v for k, v in result.items() if k != "loan_id"} for result in results]
+
+    def test_bulk_matches_sequential_create_loan(self):
+        savepoint = transaction.savepoint()
+        expected = [
+            self.client.post(reverse("create_loan"), item, format="json").json()
+            for item in self.items
+        ]
+        expected_state = self.state()
+        transaction.savepoint_rollback(savepoint)
+
+        response = self.client.post(reverse("create_loan_bulk"), self.items, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()
+        self.assertEqual(self.without_loan_ids(results), self.without_loan_ids(expected))
+        self.assertEqual(self.state(), expected_state)
+        self.assertEqual(
+            [result.get("loan_approved") for result in results],
+            [True, True, True, None, True, None, None, None, False, False],
+        )
+        self.assertEqual(
+            {
+                (result["loan_id"], result["customer_id"])
+                for result in results
+                if result.get("loan_approved")
+            },
+            set(LoanData.objects.values_list("loan_id", "customer_id")),
+        )
+
+    def test_loan_ids_without_returning_inserts(self):
+        with mock.patch.object(
+            type(connection.features),
+            "can_return_rows_from_bulk_insert",
+            new_callable=mock.PropertyMock,
+            return_value=False,
+        ):
+            response = self.client.post(reverse("create_loan_bulk"), self.items, format="json")
+
+        for result in response.json():
+            if result.get("loan_approved"):
+                loan = LoanData.objects.get(pk=result["loan_id"])
+                self.assertEqual(loan.customer_id_id, result["customer_id"])
+                self.assertEqual(str(loan.loan_amount), result["loan_amount"])
+
+    def test_batches_use_grouped_queries(self):
+        url = reverse("create_loan_bulk")
+        with CaptureQueriesContext(connection) as small:
+            self.client.post(url, self.items[:2], format="json")
+        with CaptureQueriesContext(connection) as large:
+            self.client.post(url, self.items[:2] * 5, format="json")
+
+        self.assertEqual(len(large), len(small))
+
+    def test_applications_are_split_into_batches(self):
+        with mock.patch("loan_management.views.CreateLoanBulk.batch_size", 3):
+            response = self.client.post(reverse("create_loan_bulk"), self.items, format="json")
+
+        self.assertEqual(len(response.json()), len(self.items))
+        self.assertEqual(LoanData.objects.count(), 4)
+
+    def test_rejects_non_list_body(self):
+        response = self.client.post(reverse("create_loan_bulk"), self.items[0], format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_failed_request_can_be_retried(self):
+        caches["default"].clear()
+        insert_loans = CreateLoanBulk.insert_loans
+        calls = []
+
+        def fail_third_batch(view, loans):
+            calls.append(len(loans))
+            if len(calls) == 3:
+                raise RuntimeError("connection lost")
+            insert_loans(view, loans)
+
+        url = reverse("create_loan_bulk")
+        headers = {"HTTP_IDEMPOTENCY_KEY": "bulk-retry"}
+        with mock.patch("loan_management.views.CreateLoanBulk.batch_size", 3):
+            with mock.patch.object(CreateLoanBulk, "insert_loans", fail_third_batch):
+                response = self.client.post(url, self.items, format="json", **headers)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.json(), {"error_message": "connection lost"})
+            self.assertEqual(LoanData.objects.count(), 0)
+
+            response = self.client.post(url, self.items, format="json", **headers)
+        self.assertNotIn("Idempotent-Replayed", response)
+        self.assertEqual(LoanData.objects.count(), 4)
+
+    def test_claim_timeout_grows_with_request(self):
+        caches["default"].clear()
+        cache = caches["default"]
+        with override_settings(
+            LOAN_IDEMPOTENCY={"LOCK_TIMEOUT": 60, "LOCK_TIMEOUT_PER_ITEM": 2}
+        ), mock.patch.object(cache, "add", wraps=cache.add) as add:
+            self.client.post(
+                reverse("create_loan_bulk"),
+                self.items,
+                format="json",
+                HTTP_IDEMPOTENCY_KEY="bulk-timeout",
+            )
+        self.assertEqual(add.call_args.kwargs["timeout"], 60 + 2 * len(self.items))
+
+
+class IdempotencyKeyTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        caches["default"].clear()
+        CustomerData.objects.create(
+            customer_id=14,
+            first_name="John",
+            last_name="Doe",
+            age=30,
+            phone_number=1234567890,
+            monthly_salary=50000,
+            approved_limit=50000 * 36,
+        )
+        self.payload = {
+            "customer_id": 14,
+            "loan_amount": 200000,
+            "interest_rate": 8,
+            "tenure": 14,
+        }
+
+    def create_loan(self, payload=None, key="retry-1"):
+        headers = {"HTTP_IDEMPOTENCY_KEY": key} if key else {}
+        return self.client.post(
+            reverse("create_loan"), payload or self.payload, format="json", **headers
+        )
+
+    def test_repeats_replay_the_stored_response(self):
+        with mock.patch.object(
+            CheckLoanApproval,
+            "loan_approval",
+            autospec=True,
+            side_effect=CheckLoanApproval.loan_approval,
+        ) as loan_approval:
+            first = self.create_loan()
+            second = self.create_loan({**self.payload})
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertFalse(first.has_header("Idempotent-Replayed"))
+        self.assertEqual(loan_approval.call_count, 1)
+        self.assertEqual(LoanData.objects.count(), 1)
+
+    def test_requests_without_key_are_not_deduplicated(self):
+        self.create_loan(key=None)
+        self.create_loan(key=None)
+
+        self.assertEqual(LoanData.objects.count(), 2)
+
+    def test_key_reused_with_different_request(self):
+        self.create_loan()
+        response = self.create_loan({**self.payload, "loan_amount": 100000})
+
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertIn("error_message", response.data)
+        self.assertEqual(LoanData.objects.count(), 1)
+
+    def test_failed_requests_release_the_key(self):
+        payload = {**self.payload, "customer_id": 999}
+        self.assertEqual(self.create_loan(payload).status_code, status.HTTP_400_BAD_REQUEST)
+
+        CustomerData.objects.create(
+            customer_id=999,
+            first_name="Jane",
+            last_name="Roe",
+            age=35,
+            phone_number=1234567891,
+            monthly_salary=50000,
+            approved_limit=50000 * 36,
+        )
+        response = self.create_loan(payload)
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(response.has_header("Idempotent-Replayed"))
+
+    @override_settings(LOAN_IDEMPOTENCY={"WAIT_TIMEOUT": 0.1, "POLL_INTERVAL": 0.01})
+    def test_repeat_of_running_request_times_out(self):
+        store = IdempotencyStore("create-loan")
+        store.acquire("retry-1", request_fingerprint(self.payload))
+
+        response = self.create_loan()
+
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(LoanData.objects.count(), 0)
+
+    def test_concurrent_repeat_waits_for_first_request(self):
+        store = IdempotencyStore("create-loan", {"POLL_INTERVAL": 0.01})
+        fingerprint = request_fingerprint(self.payload)
+        token, record = store.acquire("retry-1", fingerprint)
+        self.assertIsNotNone(token)
+        self.assertIsNone(record)
+
+        finisher = threading.Timer(
+            0.05, store.complete, ("retry-1", fingerprint, 201, {"loan_id": 1})
+        )
+        finisher.start()
+        token, record = store.acquire("retry-1", fingerprint)
+        finisher.join()
+
+        self.assertIsNone(token)
+        self.assertEqual(record["data"], {"loan_id": 1})
+
+    def test_released_key_can_be_claimed_again(self):
+        store = IdempotencyStore("create-loan")
+        token, _ = store.acquire("retry-1", "a")
+        store.release("retry-1", "stale-token")
+        with self.assertRaises(IdempotencyKeyReused):
+            store.acquire("retry-1", "b")
+
+        store.release("retry-1", token)
+        self.assertIsNotNone(store.acquire("retry-1", "b")[0])
+
+
 class ViewLoanAPITestCase(TestCase):
     def setUp(self):
         self.client = APIClient()
@@ -170,10 +574,10 @@ class ViewLoanAPITestCase(TestCase):
         response = self.client.get(reverse("view_loan", kwargs={"loan_id": 10004}))
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.json()), 1)
 
         # Check details of the loan and associated customer
-        loan_data = response.data[0]
+        loan_data = response.json()[0]
         self.assertEqual(loan_data["loan_id"], 10004)
         self.assertEqual(loan_data["loan_amount"], "200000.00")
         self.assertEqual(loan_data["interest_rate"], "8.00")
@@ -181,13 +585,51 @@ class ViewLoanAPITestCase(TestCase):
         self.assertEqual(loan_data["tenure"], 14)
 
         # Check details of the associated customer
-        customer_data = loan_data["customer"][0]
+        customer_data = loan_data["customer"]
         self.assertEqual(customer_data["customer_id"], 16)
         self.assertEqual(customer_data["first_name"], "John")
         self.assertEqual(customer_data["last_name"], "Doe")
         self.assertEqual(customer_data["phone_number"], 1234567890)
         self.assertEqual(customer_data["age"], 30)
 
+    def test_view_loan_api_query_count(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("view_loan", kwargs={"loan_id": 10004}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_view_loan_serializer_query_count(self):
+        for loan_id in range(10005, 10010):
+            customer = CustomerData.objects.create(
+                first_name="Jane",
+                last_name="Roe",
+                age=35,
+                phone_number=1234567891,
+                monthly_salary=40000,
+                approved_limit=40000 * 36,
+            )
+            LoanData.objects.create(
+                loan_id=loan_id,
+                customer_id=customer,
+                loan_amount=100000,
+                interest_rate=8,
+                tenure=12,
+                emi_monthly_repayment=8698.84,
+                emi_paid_on_time=2,
+                start_date=date(2022, 10, 11),
+                end_date=date(2024, 10, 11),
+            )
+
+        with self.assertNumQueries(1):
+            data = ViewLoanSerializer(
+                LoanData.objects.select_related("customer_id"), many=True
+            ).data
+
+        self.assertEqual(len(data), 6)
+        self.assertEqual(
+            {loan["customer"]["first_name"] for loan in data}, {"John", "Jane"}
+        )
+
 
 class ViewCustomerLoansAPITestCase(TestCase):
     def setUp(self):
@@ -220,12 +662,1514 @@ class ViewCustomerLoansAPITestCase(TestCase):
         response = self.client.get(reverse("view_loans", kwargs={"customer_id": 88}))
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 1)
+        self.assertEqual(len(response.json()), 1)
 
         # Check details of the loan and associated customer
-        loan_data = response.data[0]
+        loan_data = response.json()[0]
         self.assertEqual(loan_data["loan_id"], 10004)
         self.assertEqual(loan_data["loan_amount"], "200000.00")
         self.assertEqual(loan_data["interest_rate"], "8.00")
         self.assertEqual(loan_data["emi_monthly_repayment"], "15428.57")
         self.assertEqual(loan_data["repayments_left"], 10)
+
+    def create_more_loans(self):
+        for loan_id in range(10005, 10010):
+            LoanData.objects.create(
+                loan_id=loan_id,
+                customer_id=self.customer_data,
+                loan_amount=100000,
+                interest_rate=8,
+                tenure=12,
+                emi_monthly_repayment=8698.84,
+                emi_paid_on_time=2,
+                start_date=date(2022, 10, 11),
+                end_date=date(2024, 10, 11),
+            )
+
+    def test_view_customer_loans_cursor_pagination(self):
+        self.create_more_loans()
+        url = reverse("view_loans", kwargs={"customer_id": 88})
+
+        loan_ids = []
+        next_url = url + "?page_size=4"
+        while next_url:
+            with self.assertNumQueries(1):
+                response = self.client.get(next_url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertLessEqual(len(response.data["results"]), 4)
+            loan_ids += [loan["loan_id"] for loan in response.data["results"]]
+            next_url = response.data["next"]
+
+        self.assertEqual(loan_ids, list(range(10004, 10010)))
+
+    def test_view_customer_loans_stream(self):
+        self.create_more_loans()
+        url = reverse("view_loans", kwargs={"customer_id": 88})
+        expected = self.client.get(url).content
+
+        with mock.patch(
+            "loan_management.views.ViewCustomerLoans.stream_batch_size", 4
+        ):
+            response = self.client.get(url + "?stream=1")
+            content = b"".join(response.streaming_content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(content, expected)
+        self.assertEqual(len(json.loads(content)), 6)
+
+
+class LeanSerializationTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.async_client = AsyncClient()
+        self.customer = CustomerData.objects.create(
+            customer_id=42,
+            first_name="Zoë \u2028Ñandú",
+            last_name='O"Brien\u2029 \\ 李',
+            age=51,
+            phone_number=9876543210,
+            monthly_salary=80000,
+            approved_limit=80000 * 36,
+        )
+        for loan_id, amount, rate, emi, paid in (
+            (20003, "150000.50", "0.05", "12500.04", 12),
+            (20001, 200000, 8, "15428.57", 4),
+            (20002, "99999999.99", "16.75", "0.10", 0),
+        ):
+            LoanData.objects.create(
+                loan_id=loan_id,
+                customer_id=self.customer,
+                loan_amount=amount,
+                interest_rate=rate,
+                tenure=12,
+                emi_monthly_repayment=emi,
+                emi_paid_on_time=paid,
+                start_date=date(2023, 1, 5),
+                end_date=date(2024, 1, 5),
+            )
+
+    def get_both(self, name, **kwargs):
+        url = reverse(name, kwargs=kwargs)
+        with override_settings(LOAN_LEAN_SERIALIZATION=False):
+            expected = self.client.get(url)
+        return expected, self.client.get(url)
+
+    def test_lean_views_match_serializers(self):
+        for name, kwargs in (
+            ("view_loan", {"loan_id": 20003}),
+            ("view_loan", {"loan_id": 99999}),
+            ("view_loans", {"customer_id": 42}),
+            ("view_loans", {"customer_id": 99999}),
+        ):
+            expected, response = self.get_both(name, **kwargs)
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response["Content-Type"], "application/json")
+            self.assertEqual(response.content, expected.content)
+
+        response = self.client.get(reverse("view_loan", kwargs={"loan_id": 20003}))
+        self.assertIn(b"\\u2028", response.content)
+        self.assertIn("Zoë".encode(), response.content)
+
+    def test_lean_views_render_decimals_and_repayments(self):
+        response = self.client.get(reverse("view_loans", kwargs={"customer_id": 42}))
+
+        self.assertEqual(
+            [
+                (loan["loan_id"], loan["loan_amount"], loan["interest_rate"], loan["repayments_left"])
+                for loan in response.json()
+            ],
+            [
+                (20001, "200000.00", "8.00", 8),
+                (20002, "99999999.99", "16.75", 12),
+                (20003, "150000.50", "0.05", 0),
+            ],
+        )
+
+    def test_lean_views_query_count(self):
+        with self.assertNumQueries(1):
+            self.client.get(reverse("view_loan", kwargs={"loan_id": 20001}))
+        with self.assertNumQueries(1):
+            self.client.get(reverse("view_loans", kwargs={"customer_id": 42}))
+
+    def test_dumps_without_orjson(self):
+        data = [{"name": "Zoë\u2028", "amount": Decimal("1.50"), "count": 3}]
+        expected = JSONRenderer().render([{**data[0], "amount": "1.50"}])
+
+        with mock.patch("loan_management.lean.orjson", None):
+            self.assertEqual(dumps(data), expected)
+        self.assertEqual(dumps(data), expected)
+
+    def test_lean_enabled(self):
+        self.assertTrue(lean_enabled(mock.Mock(accepted_renderer=JSONRenderer())))
+        self.assertFalse(lean_enabled(mock.Mock(accepted_renderer=BrowsableAPIRenderer())))
+        with override_settings(LOAN_LEAN_SERIALIZATION=False):
+            self.assertFalse(lean_enabled())
+
+    async def test_async_lean_views_match_serializers(self):
+        for sync_name, async_name, kwargs in (
+            ("view_loan", "async_view_loan", {"loan_id": 20002}),
+            ("view_loans", "async_view_loans", {"customer_id": 42}),
+        ):
+            expected, _ = await sync_to_async(self.get_both)(sync_name, **kwargs)
+
+            response = await self.async_client.get(reverse(async_name, kwargs=kwargs))
+
+            self.assertEqual(response.content, expected.content)
+
+
+class CheckLoanApprovalTestCase(TestCase):
+    def setUp(self):
+        self.customer_data = CustomerData.objects.create(
+            customer_id=21,
+            first_name="Jane",
+            last_name="Roe",
+            age=35,
+            phone_number=9876543210,
+            monthly_salary=50000,
+            approved_limit=50000 * 36,
+        )
+
+        for tenure, emi_paid_on_time in ((12, 12), (24, 4), (36, 36)):
+            LoanData.objects.create(
+                customer_id=self.customer_data,
+                loan_amount=100000,
+                interest_rate=8.00,
+                tenure=tenure,
+                emi_monthly_repayment=5000.00,
+                emi_paid_on_time=emi_paid_on_time,
+                start_date=date(2022, 1, 1),
+                end_date=date(2099, 1, 1),
+            )
+
+    def test_credit_factors(self):
+        factors = CheckLoanApproval(21).get_credit_factors()
+
+        self.assertEqual(factors["total_loans"], 3)
+        self.assertEqual(factors["loans_paid_on_time"], 2)
+        self.assertEqual(factors["total_loan_amount"], 300000)
+        self.assertEqual(factors["current_emis_sum"], 15000)
+        self.assertEqual(factors["approved_limit"], 50000 * 36)
+        self.assertEqual(factors["monthly_salary"], 50000)
+
+    def test_loan_approval_runs_a_single_query(self):
+        with self.assertNumQueries(1):
+            result = CheckLoanApproval(21).loan_approval()
+
+        self.assertEqual(
+            result,
+            {"approval": True, "interest_rate": 8, "corrected_interest_rate": 8},
+        )
+
+    def test_unknown_customer(self):
+        with self.assertRaises(CustomerData.DoesNotExist):
+            CheckLoanApproval(999).loan_approval()
+
+
+class CheckEligibilityBatchAPITestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+        for customer_id in (31, 32):
+            CustomerData.objects.create(
+                customer_id=customer_id,
+                first_name="John",
+                last_name="Doe",
+                age=30,
+                phone_number=1234567890,
+                monthly_salary=50000,
+                approved_limit=50000 * 36,
+            )
+
+        # customer 32 already pays EMIs above half of the salary
+        LoanData.objects.create(
+            customer_id_id=32,
+            loan_amount=500000,
+            interest_rate=12.00,
+            tenure=12,
+            emi_monthly_repayment=30000.00,
+            emi_paid_on_time=2,
+            start_date=date(2023, 6, 23),
+            end_date=date(2099, 6, 23),
+        )
+
+    def test_check_eligibility_batch_api(self):
+        items = [
+            {"customer_id": 31, "loan_amount": 200000, "interest_rate": 8, "tenure": 14},
+            {"customer_id": 32, "loan_amount": 100000, "interest_rate": 12, "tenure": 6},
+            {"customer_id": 999, "loan_amount": 100000, "interest_rate": 12, "tenure": 6},
+        ]
+
+        with self.assertNumQueries(1):
+            response = self.client.post(
+                reverse("check_eligibility_batch"), items, format="json"
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data,
+            [
+                {
+                    "customer_id": 31,
+                    "interest_rate": 8,
+                    "tenure": 14,
+                    "approval": True,
+                    "corrected_interest_rate": 8,
+                },
+                {
+                    "customer_id": 32,
+                    "interest_rate": 0,
+                    "tenure": 6,
+                    "approval": False,
+                    "corrected_interest_rate": 0,
+                },
+                {"error_message": "CustomerData matching query does not exist."},
+            ],
+        )
+
+    def test_batch_matches_single_endpoint(self):
+        item = {"customer_id": 32, "loan_amount": 100000, "interest_rate": 12, "tenure": 6}
+
+        single = self.client.post(reverse("check_eligibility"), dict(item), format="json")
+        batch = self.client.post(
+            reverse("check_eligibility_batch"), [item], format="json"
+        )
+
+        self.assertEqual(batch.data, [single.data])
+
+    def test_rejects_non_list_payload(self):
+        response = self.client.post(
+            reverse("check_eligibility_batch"), {"customer_id": 31}, format="json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CreditProfileTestCase(TestCase):
+    def setUp(self):
+        self.customer_data = CustomerData.objects.create(
+            customer_id=41,
+            first_name="John",
+            last_name="Doe",
+            age=30,
+            phone_number=1234567890,
+            monthly_salary=50000,
+            approved_limit=50000 * 36,
+        )
+
+    def create_loan(self, **kwargs):
+        loan_data = {
+            "customer_id": self.customer_data,
+            "loan_amount": 100000,
+            "interest_rate": 8.00,
+            "tenure": 12,
+            "emi_monthly_repayment": 9000.00,
+            "emi_paid_on_time": 12,
+            "start_date": date(2023, 6, 23),
+            "end_date": date(2099, 6, 23),
+        }
+        loan_data.update(kwargs)
+        return LoanData.objects.create(**loan_data)
+
+    def test_refresh_without_upsert_target(self):
+        # MySQL upserts match on every unique key and take no target. SQLite
+        # cannot run such an upsert, so only the options are checked.
+        def check_options(objs, **options):
+            get_field = CreditProfile._meta.get_field
+            CreditProfile.objects.all()._check_bulk_create_options(
+                False,
+                options.get("update_conflicts", False),
+                [get_field(name) for name in options.get("update_fields", ())],
+                [get_field(name) for name in options.get("unique_fields", ())],
+            )
+            return list(objs)
+
+        self.create_loan()
+        with mock.patch.object(
+            type(connection.features),
+            "supports_update_conflicts_with_target",
+            new_callable=mock.PropertyMock,
+            return_value=False,
+        ), mock.patch.object(
+            CreditProfile.objects, "bulk_create", side_effect=check_options
+        ) as bulk_create:
+            profiles = refresh_credit_profiles([41])
+
+        self.assertNotIn("unique_fields", bulk_create.call_args.kwargs)
+        self.assertEqual(profiles[41].total_loans, 1)
+
+    def test_profile_follows_loan_writes(self):
+        loan = self.create_loan()
+        self.create_loan(loan_amount=50000, emi_paid_on_time=3, end_date=date(2020, 1, 1))
+
+        profile = CreditProfile.objects.get(customer_id=41)
+        self.assertEqual(profile.total_loans, 2)
+        self.assertEqual(profile.loans_paid_on_time, 1)
+        self.assertEqual(profile.total_loan_amount, 150000)
+        self.assertEqual(profile.active_emi_sum, 9000)
+        self.assertEqual(profile.active_emi_expires, date(2099, 6, 23))
+        self.assertEqual(profile.loans_per_year, {str(date.today().year): 2})
+
+        loan.emi_paid_on_time = 4
+        loan.save()
+        profile.refresh_from_db()
+        self.assertEqual(profile.loans_paid_on_time, 0)
+
+        loan.delete()
+        profile.refresh_from_db()
+        self.assertEqual(profile.total_loans, 1)
+        self.assertEqual(profile.active_emi_sum, 0)
+        self.assertIsNone(profile.active_emi_expires)
+        self.assertEqual(find_profile_drift([41]), [])
+
+        self.customer_data.delete()
+        self.assertFalse(CreditProfile.objects.exists())
+
+    def test_stale_active_emis_are_refreshed(self):
+        self.create_loan(end_date=date(2099, 6, 23))
+        LoanData.objects.update(end_date=date(2020, 1, 1))
+        CreditProfile.objects.update(active_emi_expires=date(2020, 1, 1))
+
+        factors = CheckLoanApproval(41).get_credit_factors()
+
+        self.assertEqual(factors["current_emis_sum"], 0)
+        self.assertIsNone(CreditProfile.objects.get(customer_id=41).active_emi_expires)
+
+    def test_rebuild_command(self):
+        self.create_loan()
+        CreditProfile.objects.update(total_loans=7)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_credit_profiles", "--check", stdout=StringIO())
+
+        call_command("rebuild_credit_profiles", stdout=StringIO())
+        self.assertEqual(CreditProfile.objects.get(customer_id=41).total_loans, 1)
+        call_command("rebuild_credit_profiles", "--check", stdout=StringIO())
+
+    def test_scoring_queries_use_composite_indexes(self):
+        # The plans name the index on SQLite ("USING COVERING INDEX ...") and
+        # on MySQL (the "key" column), so a dropped index shows up here.
+        self.create_loan()
+
+        plan = active_loans_queryset([41], date.today()).explain()
+        self.assertIn("loan_customer_end_date_idx", plan)
+
+        plan = loans_per_year_queryset([41]).explain()
+        self.assertIn("loan_customer_start_date_idx", plan)
+
+
+class FakeRedis:
+    """
+    Minimal in-memory stand-in for the redis client used by the caches.
+    """
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, name):
+        return self.data.get(name)
+
+    def set(self, name, value, ex=None, nx=False):
+        if nx and name in self.data:
+            return None
+        self.data[name] = str(value).encode()
+        return True
+
+    def incr(self, name):
+        value = int(self.data.get(name, 0)) + 1
+        self.data[name] = str(value).encode()
+        return value
+
+    def info(self, section=None):
+        return {"evicted_keys": 0}
+
+
+@override_settings(LOAN_DECISION_CACHE={"BACKEND": "lru", "MAX_ENTRIES": 2})
+class DecisionCacheTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer_data = CustomerData.objects.create(
+            customer_id=51,
+            first_name="John",
+            last_name="Doe",
+            age=30,
+            phone_number=1234567890,
+            monthly_salary=50000,
+            approved_limit=50000 * 36,
+        )
+
+    def create_loan(self):
+        LoanData.objects.create(
+            customer_id=self.customer_data,
+            loan_amount=100000,
+            interest_rate=8.00,
+            tenure=12,
+            emi_monthly_repayment=30000.00,
+            emi_paid_on_time=12,
+            start_date=date(2023, 6, 23),
+            end_date=date(2099, 6, 23),
+        )
+
+    def assert_cached_decisions(self, cache):
+        self.assertTrue(CheckLoanApproval(51).loan_approval()["approval"])
+        with self.assertNumQueries(0):
+            self.assertTrue(CheckLoanApproval(51).loan_approval()["approval"])
+
+        # EMIs above half of the salary invalidate the cached approval
+        self.create_loan()
+        self.assertFalse(CheckLoanApproval(51).loan_approval()["approval"])
+
+        self.customer_data.monthly_salary = 100000
+        self.customer_data.save()
+        self.assertTrue(CheckLoanApproval(51).loan_approval()["approval"])
+
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 3)
+
+    def test_lru_backend(self):
+        self.assertIsInstance(get_decision_cache(), LRUDecisionCache)
+
+        cache = LRUDecisionCache(max_entries=2)
+        with mock.patch.object(cache_module, "_decision_cache", cache):
+            self.assert_cached_decisions(cache)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_redis_backend(self):
+        cache = RedisDecisionCache(client=FakeRedis())
+        with mock.patch.object(cache_module, "_decision_cache", cache):
+            self.assert_cached_decisions(cache)
+
+    def test_cached_decision_is_not_shared(self):
+        self.client.post(
+            reverse("create_loan"),
+            {"customer_id": 51, "loan_amount": 1000, "interest_rate": 8, "tenure": 12},
+            format="json",
+        )
+        self.assertNotIn("customer_id", CheckLoanApproval(51).loan_approval())
+
+    def test_backends_must_implement_interface(self):
+        class IncompleteDecisionCache(BaseDecisionCache):
+            def get(self, key):
+                return None
+
+        with self.assertRaises(TypeError):
+            IncompleteDecisionCache()
+
+    def test_lru_versions_are_bounded(self):
+        cache = LRUDecisionCache(max_entries=10, max_versions=2)
+        cache.set(cache.make_key(1, cache.get_version(1)), {"approval": True})
+        for customer_id in (2, 3):
+            cache.bump_version(customer_id)
+
+        self.assertEqual(list(cache._versions), ["2", "3"])
+        # Customer 1 restarts at a new version, missing its old decision.
+        self.assertIsNone(cache.get(cache.make_key(1, cache.get_version(1))))
+        self.assertEqual(list(cache._versions), ["3", "1"])
+
+    def test_counters_are_exported(self):
+        def samples():
+            return [
+                REGISTRY.get_sample_value(f"loan_decision_cache_{name}_total", {"backend": "lru"})
+                or 0
+                for name in ("hits", "misses")
+            ]
+
+        hits, misses = samples()
+        CheckLoanApproval(51).loan_approval()
+        CheckLoanApproval(51).loan_approval()
+
+        self.assertEqual(samples(), [hits + 1, misses + 1])
+        content = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('loan_decision_cache_hits_total{backend="lru"}', content)
+
+    def test_redis_evictions_are_exported(self):
+        client = FakeRedis()
+        client.info = lambda section=None: {"evicted_keys": 7}
+        with mock.patch.object(cache_module, "_decision_cache", RedisDecisionCache(client=client)):
+            content = self.client.get(reverse("metrics")).content.decode()
+
+        self.assertIn("loan_decision_cache_redis_evicted_keys 7.0", content)
+
+    @override_settings(REPLICA_STICKY_SECONDS=5)
+    def test_replica_decisions_expire(self):
+        cache = LRUDecisionCache()
+        now = time.monotonic()
+        with mock.patch.object(cache_module, "_decision_cache", cache), mock.patch.object(
+            cache_module, "current_read_alias", return_value="replica"
+        ):
+            with mock.patch.object(cache_module.time, "monotonic", return_value=now):
+                CheckLoanApproval(51).loan_approval()
+                CheckLoanApproval(51).loan_approval()
+            self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "evictions": 0})
+
+            with mock.patch.object(cache_module.time, "monotonic", return_value=now + 5):
+                CheckLoanApproval(51).loan_approval()
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 2, "evictions": 0})
+
+    def test_redis_replica_decisions_expire(self):
+        client = FakeRedis()
+        cache = RedisDecisionCache(client=client, timeout=86400)
+        with mock.patch.object(client, "set", wraps=client.set) as client_set:
+            with mock.patch.object(cache_module, "current_read_alias", return_value="replica"):
+                cache.get_or_compute(51, lambda: {"approval": True})
+            cache.get_or_compute(52, lambda: {"approval": True})
+
+        self.assertEqual(
+            [call.kwargs["ex"] for call in client_set.call_args_list if "ex" in call.kwargs],
+            [settings.REPLICA_STICKY_SECONDS, 86400],
+        )
+
+
+LOAN_FILE_HEADERS = [
+    "Customer ID",
+    "Loan ID",
+    "Loan Amount",
+    "Tenure",
+    "Interest Rate",
+    "Monthly payment",
+    "EMIs paid on Time",
+    "Date of Approval",
+    "End Date",
+]
+
+
+class InjectLoanDataTestCase(TestCase):
+    def setUp(self):
+        self.customer_data = CustomerData.objects.create(
+            customer_id=61,
+            first_name="John",
+            last_name="Doe",
+            age=30,
+            phone_number=1234567890,
+            monthly_salary=50000,
+            approved_limit=50000 * 36,
+        )
+
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(LOAN_FILE_HEADERS)
+        sheet.append([61, 7001, 900000, 138, 16.93, 5000, 138, datetime(2018, 8, 1), datetime(2099, 2, 1)])
+        sheet.append([61, 7002, 100000, 12, 8.5, 9000, 4, datetime(2019, 1, 1), datetime(2020, 1, 1)])
+        sheet.append([62, 7003, 100000, 12, 8.5, 9000, 4, datetime(2019, 1, 1), datetime(2020, 1, 1)])
+        sheet.append([61, "abc", 100000, 12, 8.5, 9000, 4, datetime(2019, 1, 1), datetime(2020, 1, 1)])
+
+        self.file = tempfile.NamedTemporaryFile(suffix=".xlsx")
+        workbook.save(self.file.name)
+
+    def tearDown(self):
+        self.file.close()
+
+    def test_inject_loan_data(self):
+        # customers are resolved per batch, never with a per-row lookup
+        with mock.patch.object(
+            CustomerData.objects, "get", side_effect=AssertionError
+        ):
+            summary = inject_loan_data(self.file.name, batch_size=2)
+
+        self.assertEqual(
+            list(LoanData.objects.order_by("loan_id").values_list("loan_id", flat=True)),
+            [7001, 7002],
+        )
+        self.assertEqual(summary["rows_imported"], 2)
+        self.assertEqual(summary["rows_rejected"], 2)
+        self.assertEqual(
+            summary["rejects"],
+            [
+                {"row": 5, "error": "invalid literal for int() with base 10: 'abc'"},
+                {"row": 4, "error": "Unknown customer 62"},
+            ],
+        )
+
+        profile = CreditProfile.objects.get(customer_id=61)
+        self.assertEqual(profile.total_loans, 2)
+        self.assertEqual(profile.loans_paid_on_time, 1)
+        self.assertEqual(profile.active_emi_sum, 5000)
+
+    def test_parallel_full_import(self):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(["Customer ID", "First Name", "Last Name", "Age", "Phone Number", "Monthly Salary", "Approved Limit"])
+        sheet.append([62, "Jane", "Roe", 35, 9876543210, 40000, 1440000])
+        sheet.append([63, "Jim", "Poe", 45, 9876543211, 30000, 1080000])
+        customer_file = tempfile.NamedTemporaryFile(suffix=".xlsx")
+        self.addCleanup(customer_file.close)
+        workbook.save(customer_file.name)
+
+        # XLSX files are imported by one task, so the loans come from a CSV.
+        loan_file = tempfile.NamedTemporaryFile("w", suffix=".csv", newline="")
+        self.addCleanup(loan_file.close)
+        writer = csv.writer(loan_file)
+        writer.writerow(LOAN_FILE_HEADERS)
+        for row in openpyxl.load_workbook(self.file.name).active.iter_rows(
+            min_row=2, values_only=True
+        ):
+            writer.writerow(
+                [value.date().isoformat() if isinstance(value, datetime) else value for value in row]
+            )
+        loan_file.flush()
+
+        current_app.conf.task_always_eager = True
+        self.addCleanup(setattr, current_app.conf, "task_always_eager", False)
+        result = start_full_import(customer_file.name, loan_file.name, chunk_size=2)
+
+        summary = result.get()
+        self.assertEqual(summary["chunks"], 2)
+        self.assertEqual(summary["rows_imported"], 3)
+        self.assertEqual(summary["rows_rejected"], 1)
+        self.assertEqual(
+            list(LoanData.objects.order_by("loan_id").values_list("loan_id", flat=True)),
+            [7001, 7002, 7003],
+        )
+
+
+class BenchmarkTestCase(TestCase):
+    def test_run_benchmarks(self):
+        results = run_benchmarks(
+            customers=3, loans_per_customer=2, requests=2, import_rows=3
+        )
+
+        self.assertEqual(CustomerData.objects.filter(loans__isnull=False).distinct().count(), 6)
+        benchmarks = results["benchmarks"]
+        self.assertEqual(
+            set(benchmarks),
+            {
+                "loan_approval",
+                "api_register",
+                "api_check_eligibility",
+                "api_create_loan",
+                "api_view_loan",
+                "api_view_loans",
+                "import_customers",
+                "import_loans",
+            },
+        )
+        self.assertEqual(benchmarks["api_view_loan"]["max_queries"], 1)
+        self.assertEqual(benchmarks["import_loans"]["rows"], 3)
+        self.assertEqual(compare_to_baseline(results, results), [])
+
+    @override_settings(DATABASE_REPLICAS=["replica"])
+    def test_command_reads_from_primary(self):
+        replicas = []
+
+        def fake_run_benchmarks(**kwargs):
+            replicas.append(list(settings.DATABASE_REPLICAS))
+            return {"meta": {}, "benchmarks": {}}
+
+        creation = type(connection.creation)
+        with tempfile.TemporaryDirectory() as directory, mock.patch.object(
+            creation, "create_test_db"
+        ), mock.patch.object(creation, "destroy_test_db"), mock.patch(
+            "loan_management.management.commands.benchmark.run_benchmarks",
+            side_effect=fake_run_benchmarks,
+        ):
+            call_command(
+                "benchmark", "--output", os.path.join(directory, "out.json"), stdout=StringIO()
+            )
+        self.assertEqual(replicas, [[]])
+
+    def test_compare_to_baseline(self):
+        baseline = {
+            "benchmarks": {
+                "api_view_loan": {"p95_ms": 2.0, "max_queries": 1},
+                "import_loans": {"p95_ms": 100.0, "max_queries": 20, "rows_per_second": 1000.0},
+            }
+        }
+        results = {
+            "benchmarks": {
+                "api_view_loan": {"p95_ms": 2.3, "max_queries": 2},
+                "import_loans": {"p95_ms": 130.0, "max_queries": 20, "rows_per_second": 700.0},
+                "api_register": {"p95_ms": 5.0, "max_queries": 5},
+            }
+        }
+
+        self.assertEqual(
+            compare_to_baseline(results, baseline, tolerance=0.2),
+            [
+                "api_view_loan: max queries 1 -> 2",
+                "import_loans: p95 100.0ms -> 130.0ms",
+                "import_loans: 1000.0 -> 700.0 rows/sec",
+            ],
+        )
+
+
+class RequestMetricsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        customer = CustomerData.objects.create(
+            customer_id=16,
+            first_name="John",
+            last_name="Doe",
+            age=30,
+            phone_number=1234567890,
+            monthly_salary=50000,
+            approved_limit=50000 * 36,
+        )
+        LoanData.objects.create(
+            loan_id=10004,
+            customer_id=customer,
+            loan_amount=200000,
+            interest_rate=8,
+            tenure=14,
+            emi_monthly_repayment=15428.57,
+            emi_paid_on_time=4,
+            start_date=date(2022, 10, 11),
+            end_date=date(2024, 10, 11),
+        )
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse("view_loan", kwargs={"loan_id": 10004}))
+
+        timings = dict(
+            entry.split(";", 1) for entry in response["Server-Timing"].split(", ")
+        )
+        self.assertEqual(set(timings), {"db", "view", "serialize", "total"})
+        self.assertIn('desc="1 queries"', timings["db"])
+
+    def test_metrics_endpoint(self):
+        self.client.get(reverse("view_loans", kwargs={"customer_id": 16}))
+
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        content = response.content.decode()
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",url_name="view_loans"}',
+            content,
+        )
+        self.assertIn(
+            'http_request_db_queries_bucket{le="1.0",method="GET",url_name="view_loans"}',
+            content,
+        )
+
+
+class SyntheticDataTestCase(TestCase):
+    def test_generate_synthetic_data(self):
+        call_command(
+            "generate_synthetic_data",
+            "--customers=5",
+            "--min-loans=1",
+            "--max-loans=3",
+            "--on-time-ratio=1",
+            "--start-year=2020",
+            "--end-year=2021",
+            "--batch-size=2",
+            stdout=StringIO(),
+        )
+
+        self.assertEqual(CustomerData.objects.count(), 5)
+        loans = LoanData.objects.all()
+        self.assertTrue(5 <= len(loans) <= 15)
+        for loan in loans:
+            self.assertEqual(loan.emi_paid_on_time, loan.tenure)
+            self.assertIn(loan.start_date.year, (2020, 2021))
+            self.assertGreater(loan.end_date, loan.start_date)
+        self.assertEqual(find_profile_drift(range(1, 6)), [])
+
+    def test_generated_files_import_cleanly(self):
+        for file_format in ("csv", "xlsx"):
+            with self.subTest(file_format=file_format), tempfile.TemporaryDirectory() as directory:
+                call_command(
+                    "generate_synthetic_data",
+                    "--customers=4",
+                    f"--output-dir={directory}",
+                    f"--format={file_format}",
+                    stdout=StringIO(),
+                )
+                customers = inject_customer_data(
+                    os.path.join(directory, f"customer_data.{file_format}")
+                )
+                loans = inject_loan_data(os.path.join(directory, f"loan_data.{file_format}"))
+
+                self.assertEqual(customers["rows_imported"], 4)
+                self.assertEqual(customers["rows_rejected"], 0)
+                self.assertEqual(loans["rows_rejected"], 0)
+                self.assertEqual(LoanData.objects.count(), loans["rows_imported"])
+                LoanData.objects.all().delete()
+                CustomerData.objects.all().delete()
+
+
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.async_client = AsyncClient()
+        customer = CustomerData.objects.create(
+            customer_id=16,
+            first_name="John",
+            last_name="Doe",
+            age=30,
+            phone_number=1234567890,
+            monthly_salary=50000,
+            approved_limit=50000 * 36,
+        )
+        LoanData.objects.create(
+            loan_id=10004,
+            customer_id=customer,
+            loan_amount=200000,
+            interest_rate=8,
+            tenure=14,
+            emi_monthly_repayment=15428.57,
+            emi_paid_on_time=4,
+            start_date=date(2022, 10, 11),
+            end_date=date(2099, 10, 11),
+        )
+
+    async def test_async_check_eligibility(self):
+        payload = {"customer_id": 16, "loan_amount": 100000, "interest_rate": 12, "tenure": 12}
+        expected = await sync_to_async(self.client.post)(
+            reverse("check_eligibility"), payload, format="json"
+        )
+
+        response = await self.async_client.post(
+            reverse("async_check_eligibility"), payload, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.content, expected.content)
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+
+    async def test_async_check_eligibility_unknown_customer(self):
+        response = await self.async_client.post(
+            reverse("async_check_eligibility"),
+            {"customer_id": 999, "loan_amount": 100000},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("error_message", json.loads(response.content))
+
+    async def test_async_loan_views_match_sync_views(self):
+        for sync_name, async_name, kwargs in (
+            ("view_loan", "async_view_loan", {"loan_id": 10004}),
+            ("view_loans", "async_view_loans", {"customer_id": 16}),
+        ):
+            expected = await sync_to_async(self.client.get)(reverse(sync_name, kwargs=kwargs))
+
+            response = await self.async_client.get(reverse(async_name, kwargs=kwargs))
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.content, expected.content)
+            self.assertIn('desc="1 queries"', response["Server-Timing"])
+
+    async def test_aloan_approval_matches_loan_approval(self):
+        expected = await sync_to_async(CheckLoanApproval(16).loan_approval)()
+
+        self.assertEqual(await CheckLoanApproval(16).aloan_approval(), expected)
+
+
+def reference_loan_approval(factors):
+    """
+    The per-customer scoring logic the engine replaced, kept as the oracle
+    for the property tests.
+    """
+
+    if factors["total_loans"] == 0:
+        credit_rating = 100
+    else:
+        timely_paid_perc = (factors["loans_paid_on_time"] / factors["total_loans"]) * 100
+        loan_timely_paid = (timely_paid_perc * 25) / 100
+        total_loans = ((factors["total_loans"] / 10) * 100 * 25) / 100
+        if factors["current_year_loans"] == 0:
+            current_yr_loans = (100 * 25) / 100
+        elif factors["current_year_loans"] == 1:
+            current_yr_loans = (50 * 25) / 100
+        else:
+            current_yr_loans = 0
+        loan_limit = factors["approved_limit"]
+        eligible_loan = int(loan_limit - factors["total_loan_amount"])
+        if eligible_loan > 0:
+            eligible_loan_perc = (eligible_loan / loan_limit) * 100
+        else:
+            eligible_loan_perc = 0
+        loan_volume = (eligible_loan_perc * 25) / 100
+        if factors["current_emis_sum"] > (factors["monthly_salary"] * 50) / 100:
+            credit_rating = 0
+        elif loan_volume == 0:
+            credit_rating = 0
+        else:
+            credit_rating = loan_timely_paid + total_loans + current_yr_loans + loan_volume
+
+    if credit_rating > 50:
+        return credit_rating, {"approval": True, "interest_rate": 8, "corrected_interest_rate": 8}
+    elif 50 > credit_rating > 30:
+        return credit_rating, {"approval": True, "interest_rate": 12, "corrected_interest_rate": 12}
+    elif 30 > credit_rating > 10:
+        return credit_rating, {"approval": True, "interest_rate": 16, "corrected_interest_rate": 16}
+    elif 10 > credit_rating:
+        return credit_rating, {"approval": False, "interest_rate": 0, "corrected_interest_rate": 0}
+    return credit_rating, None
+
+
+class ScoringEngineTestCase(TestCase):
+    def random_factors(self, rng):
+        total_loans = rng.choice([0, 1, 2, 3, 5, 10, rng.randint(0, 300)])
+        monthly_salary = rng.randint(0, 500) * 1000
+        approved_limit = rng.choice([0, 36 * monthly_salary, rng.randint(1, 10**8)])
+        return {
+            "total_loans": total_loans,
+            "loans_paid_on_time": rng.randint(0, total_loans),
+            "current_year_loans": rng.randint(0, min(total_loans, 3)),
+            "total_loan_amount": Decimal(rng.randint(0, 10**10)) / 100,
+            "approved_limit": approved_limit,
+            "current_emis_sum": rng.choice(
+                [Decimal(0), Decimal(monthly_salary * 50) / 100, Decimal(rng.randint(0, 10**8)) / 100]
+            ),
+            "monthly_salary": monthly_salary,
+        }
+
+    def test_engine_matches_per_customer_logic(self):
+        rng = random.Random(17)
+        for _ in range(20):
+            factors_list = [self.random_factors(rng) for _ in range(500)]
+
+            scores = scoring.credit_scores(scoring.factor_columns(factors_list))
+            decisions = scoring.loan_decisions(factors_list)
+
+            for factors, score, decision in zip(factors_list, scores, decisions):
+                expected_score, expected_decision = reference_loan_approval(factors)
+                self.assertEqual(score, expected_score, factors)
+                self.assertEqual(decision, expected_decision, factors)
+
+    def test_tier_boundaries(self):
+        factors = {
+            "total_loans": 2,
+            "loans_paid_on_time": 0,
+            "current_year_loans": 1,
+            "total_loan_amount": Decimal("500.00"),
+            "approved_limit": 1000,
+            "current_emis_sum": Decimal("0.00"),
+            "monthly_salary": 100,
+        }
+        self.assertEqual(reference_loan_approval(factors), (30.0, None))
+        self.assertEqual(scoring.loan_decisions([factors]), [None])
+        with self.assertRaises(UnboundLocalError):
+            CheckLoanApproval(1).loan_approval(factors)
+
+    def test_aggregate_loan_columns_matches_profiles(self):
+        book = SyntheticBook(20, min_loans=0, max_loans=6, start_year=2021, end_year=2024, seed=3)
+        customer_ids, _ = insert_book(book, batch_size=7)
+        today = date.today()
+
+        loans = list(LoanData.objects.order_by("loan_id"))
+        index = {customer_id: i for i, customer_id in enumerate(customer_ids)}
+        columns = scoring.aggregate_loan_columns(
+            [index[loan.customer_id_id] for loan in loans],
+            len(customer_ids),
+            tenure=[loan.tenure for loan in loans],
+            emi_paid_on_time=[loan.emi_paid_on_time for loan in loans],
+            loan_amount_cents=[scoring.to_cents(loan.loan_amount) for loan in loans],
+            emi_cents=[scoring.to_cents(loan.emi_monthly_repayment) for loan in loans],
+            active=[loan.end_date >= today for loan in loans],
+            start_year=[loan.start_date.year for loan in loans],
+            current_year=CheckLoanApproval.current_year,
+        )
+        customers = CustomerData.objects.in_bulk(list(customer_ids))
+        columns["approved_limit"] = np.array([customers[pk].approved_limit for pk in customer_ids])
+        columns["monthly_salary"] = np.array([customers[pk].monthly_salary for pk in customer_ids])
+
+        bulk_factors = CheckLoanApproval.get_bulk_credit_factors(list(customer_ids))
+        expected = scoring.factor_columns([bulk_factors[pk] for pk in customer_ids])
+        for column in scoring.FACTOR_COLUMNS:
+            np.testing.assert_array_equal(columns[column], expected[column], column)
+        self.assertEqual(
+            CheckLoanApproval.bulk_loan_approval(list(customer_ids)),
+            {
+                pk: reference_loan_approval(bulk_factors[pk])[1]
+                for pk in customer_ids
+            },
+        )
+
+
+class ScoreSnapshotTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        book = SyntheticBook(30, min_loans=0, max_loans=5, start_year=2021, end_year=2024, seed=11)
+        self.customer_ids, _ = insert_book(book)
+        self.live = CheckLoanApproval.bulk_loan_approval(self.customer_ids)
+
+    def test_snapshot_matches_live_scoring(self):
+        summary = take_score_snapshot(CheckLoanApproval.current_year, chunk_size=7)
+        self.assertEqual(summary["customers"], 30)
+        self.assertEqual(summary["chunks"], 5)
+        self.assertEqual(summary["loans"], LoanData.objects.count())
+
+        # Re-running on the same day replaces the snapshot.
+        take_score_snapshot(CheckLoanApproval.current_year, chunk_size=7)
+        self.assertEqual(CreditScoreSnapshot.objects.count(), 30)
+
+        for snapshot in CreditScoreSnapshot.objects.all():
+            check = CheckLoanApproval(snapshot.customer_id_id)
+            check.factors = check.get_credit_factors()
+            self.assertEqual(snapshot.credit_score, check.calculate_credit())
+            decision = self.live[snapshot.customer_id_id]
+            if isinstance(decision, Exception):
+                self.assertIsNone(snapshot.approval)
+            else:
+                self.assertEqual(snapshot.approval, decision["approval"])
+                self.assertEqual(snapshot.interest_rate, decision["interest_rate"])
+
+    def test_snapshots_are_ignored_unless_enabled(self):
+        take_score_snapshot(CheckLoanApproval.current_year)
+        self.assertEqual(snapshot_decisions(self.customer_ids), {})
+
+    @override_settings(LOAN_SCORE_SNAPSHOTS={"ENABLED": True})
+    def test_eligibility_reads_snapshot_until_customer_changes(self):
+        take_score_snapshot(CheckLoanApproval.current_year)
+        customer_id = self.customer_ids[0]
+        # A marker rate shows which path answered.
+        CreditScoreSnapshot.objects.filter(customer_id=customer_id).update(
+            approval=True, interest_rate=99
+        )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(CheckLoanApproval(customer_id).loan_approval()["interest_rate"], 99)
+        self.assertEqual(
+            CheckLoanApproval.bulk_loan_approval(self.customer_ids[:3])[customer_id]["interest_rate"],
+            99,
+        )
+
+        LoanData.objects.create(
+            customer_id_id=customer_id,
+            loan_amount=1000,
+            tenure=12,
+            interest_rate=10,
+            emi_monthly_repayment=100,
+            emi_paid_on_time=12,
+            end_date=date(2030, 1, 1),
+        )
+        self.assertNotEqual(CheckLoanApproval(customer_id).loan_approval()["interest_rate"], 99)
+        self.assertNotIn(customer_id, snapshot_decisions([customer_id]))
+
+        with override_settings(LOAN_SCORE_SNAPSHOTS={"ENABLED": True, "LIVE_IF_CHANGED": False}):
+            self.assertEqual(CheckLoanApproval(customer_id).loan_approval()["interest_rate"], 99)
+
+    @override_settings(LOAN_SCORE_SNAPSHOTS={"ENABLED": True})
+    def test_string_customer_id_reads_snapshot(self):
+        take_score_snapshot(CheckLoanApproval.current_year)
+        customer_id = self.customer_ids[0]
+        CreditScoreSnapshot.objects.filter(customer_id=customer_id).update(
+            approval=True, interest_rate=99
+        )
+
+        self.assertEqual(CheckLoanApproval(str(customer_id)).loan_approval()["interest_rate"], 99)
+
+    @override_settings(LOAN_SCORE_SNAPSHOTS={"ENABLED": True, "MAX_AGE_DAYS": 3})
+    def test_latest_snapshot_between_tiers_is_not_skipped(self):
+        take_score_snapshot(CheckLoanApproval.current_year)
+        customer_id = self.customer_ids[0]
+        snapshot = CreditScoreSnapshot.objects.get(customer_id=customer_id)
+        CreditScoreSnapshot.objects.create(
+            customer_id_id=customer_id,
+            snapshot_date=snapshot.snapshot_date - relativedelta(days=1),
+            credit_score=snapshot.credit_score,
+            approval=True,
+            interest_rate=99,
+            approved_limit=snapshot.approved_limit,
+            monthly_salary=snapshot.monthly_salary,
+            computed_at=snapshot.computed_at,
+        )
+        CreditScoreSnapshot.objects.filter(pk=snapshot.pk).update(approval=None, interest_rate=None)
+
+        self.assertNotIn(customer_id, snapshot_decisions([customer_id]))
+
+    @override_settings(LOAN_SCORE_SNAPSHOTS={"ENABLED": True, "LIVE_IF_CHANGED": False})
+    def test_create_loan_scores_live(self):
+        customer = CustomerData.objects.create(
+            first_name="John",
+            last_name="Doe",
+            age=30,
+            phone_number=1234567890,
+            monthly_salary=10000,
+            approved_limit=10000 * 36,
+        )
+        take_score_snapshot(CheckLoanApproval.current_year)
+        payload = {
+            "customer_id": customer.customer_id,
+            "loan_amount": 100000,
+            "interest_rate": 12,
+            "tenure": 12,
+        }
+
+        responses = [
+            self.client.post(reverse("create_loan"), payload, format="json")
+            for _ in range(4)
+        ]
+
+        self.assertEqual(
+            [response.data["loan_approved"] for response in responses],
+            [True, False, False, False],
+        )
+        # Eligibility reads still come from the snapshot.
+        self.assertTrue(CheckLoanApproval(customer.customer_id).loan_approval()["approval"])
+        self.assertFalse(
+            CheckLoanApproval(customer.customer_id).loan_approval(use_snapshot=False)["approval"]
+        )
+
+    @override_settings(LOAN_SCORE_SNAPSHOTS={"ENABLED": True})
+    def test_salary_change_falls_back_to_live_scoring(self):
+        take_score_snapshot(CheckLoanApproval.current_year)
+        customer_id = self.customer_ids[1]
+        self.assertIn(customer_id, snapshot_decisions([customer_id]))
+
+        customer = CustomerData.objects.get(customer_id=customer_id)
+        customer.monthly_salary += 1000
+        customer.save()
+        self.assertNotIn(customer_id, snapshot_decisions([customer_id]))
+
+    @override_settings(LOAN_SCORE_SNAPSHOTS={"ENABLED": True, "KEEP_DAYS": 7})
+    def test_rescore_task_prunes_old_snapshots(self):
+        rescore_portfolio.apply(args=["2024-01-01"])
+        summary = rescore_portfolio.apply(args=["2024-01-10"]).get()
+
+        self.assertEqual(summary["pruned"], 30)
+        self.assertEqual(
+            set(CreditScoreSnapshot.objects.values_list("snapshot_date", flat=True)),
+            {date(2024, 1, 10)},
+        )
+        # Snapshots older than MAX_AGE_DAYS are not served.
+        self.assertEqual(snapshot_decisions(self.customer_ids), {})
+
+
+class LoanScheduleTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = CustomerData.objects.create(
+            first_name="Ada",
+            last_name="Lovelace",
+            age=36,
+            phone_number=9999999999,
+            monthly_salary=100000,
+            approved_limit=3600000,
+        )
+
+    def random_loans(self, count, seed=0):
+        rng = random.Random(seed)
+        return [
+            LoanData(
+                loan_id=i + 1,
+                loan_amount=Decimal(rng.randint(1, 10**9)) / 100,
+                interest_rate=Decimal(rng.randint(0, 2500)) / 100,
+                tenure=rng.choice([0, 1, 3, 7, 12, 36, rng.randint(1, 360)]),
+                start_date=date(2020, 1, 1) + relativedelta(days=rng.randint(0, 1500)),
+            )
+            for i in range(count)
+        ]
+
+    def test_bulk_schedules_match_lazy_schedules(self):
+        loans = self.random_loans(300)
+        schedule = bulk_schedules(
+            [loan.loan_id for loan in loans],
+            [scoring.to_cents(loan.loan_amount) for loan in loans],
+            [scoring.to_cents(loan.interest_rate) for loan in loans],
+            [loan.tenure for loan in loans],
+            [loan.start_date for loan in loans],
+        )
+        expected = [
+            (
+                loan.loan_id,
+                row["installment"],
+                row["due_date"],
+                row["payment"],
+                row["principal"],
+                row["interest"],
+                row["balance"],
+            )
+            for loan in loans
+            for row in iter_schedule(loan)
+        ]
+        actual = list(
+            zip(
+                schedule["loan_id"].tolist(),
+                schedule["installment"].tolist(),
+                schedule["due_date"].tolist(),
+                [Decimal(c).scaleb(-2) for c in schedule["payment"].tolist()],
+                [Decimal(c).scaleb(-2) for c in schedule["principal"].tolist()],
+                [Decimal(c).scaleb(-2) for c in schedule["interest"].tolist()],
+                [Decimal(c).scaleb(-2) for c in schedule["balance"].tolist()],
+            )
+        )
+        self.assertEqual(actual, expected)
+
+    def test_schedule_repays_loan_and_flat_interest(self):
+        for loan in self.random_loans(50, seed=1):
+            rows = list(iter_schedule(loan))
+            self.assertEqual(len(rows), max(loan.tenure, 0))
+            if not rows:
+                continue
+            self.assertEqual(sum(row["principal"] for row in rows), loan.loan_amount)
+            self.assertEqual(
+                sum(row["interest"] for row in rows),
+                (loan.loan_amount * loan.interest_rate / 100).quantize(
+                    Decimal("0.01"), rounding=ROUND_HALF_UP
+                ),
+            )
+            self.assertEqual(rows[-1]["balance"], 0)
+            self.assertEqual(
+                rows[-1]["due_date"], loan.start_date + relativedelta(months=loan.tenure)
+            )
+
+    def test_view_loan_schedule_streams_installments(self):
+        loan = LoanData.objects.create(
+            customer_id=self.customer,
+            loan_amount=1000,
+            tenure=3,
+            interest_rate=12,
+            emi_monthly_repayment=Decimal("373.33"),
+            emi_paid_on_time=0,
+            end_date=date.today() + relativedelta(months=3),
+        )
+
+        response = self.client.get(reverse("view_loan_schedule", kwargs={"loan_id": loan.loan_id}))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        installments = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(
+            [row["payment"] for row in installments], ["373.33", "373.33", "373.34"]
+        )
+        self.assertEqual(installments[-1]["balance"], "0.00")
+        self.assertEqual(installments[-1]["due_date"], loan.end_date.isoformat())
+
+        response = self.client.get(reverse("view_loan_schedule", kwargs={"loan_id": 10**6}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_export_schedules_command(self):
+        for tenure in (2, 0, 5):
+            LoanData.objects.create(
+                customer_id=self.customer,
+                loan_amount=500,
+                tenure=tenure,
+                interest_rate=10,
+                emi_monthly_repayment=10,
+                emi_paid_on_time=0,
+                end_date=date.today(),
+            )
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "schedules.csv")
+            out = StringIO()
+            call_command("export_schedules", path, "--batch-size", "2", stdout=out)
+            with open(path, newline="") as csv_file:
+                rows = list(csv.DictReader(csv_file))
+
+        self.assertIn("Wrote 7 installments of 2 loans", out.getvalue())
+        self.assertEqual(len(rows), 7)
+        self.assertEqual(rows[0]["principal"], "250.00")
+        self.assertEqual(rows[-1]["balance"], "0.00")
+
+
+class CurrentDebtTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.customer = CustomerData.objects.create(
+            first_name="Grace",
+            last_name="Hopper",
+            age=40,
+            phone_number=8888888888,
+            monthly_salary=100000,
+            approved_limit=3600000,
+        )
+        self.other = CustomerData.objects.create(
+            first_name="Alan",
+            last_name="Turing",
+            age=41,
+            phone_number=7777777777,
+            monthly_salary=100000,
+            approved_limit=3600000,
+        )
+
+    def debt(self, customer):
+        return CustomerData.objects.get(pk=customer.pk).current_debt
+
+    def create_loan(self, customer, amount, tenure=12, paid=0):
+        return LoanData.objects.create(
+            customer_id=customer,
+            loan_amount=amount,
+            tenure=tenure,
+            interest_rate=10,
+            emi_monthly_repayment=100,
+            emi_paid_on_time=paid,
+            end_date=date(2099, 1, 1),
+        )
+
+    def test_create_loan_api_adds_to_current_debt(self):
+        data = {"customer_id": self.customer.pk, "loan_amount": 200000.5, "interest_rate": 8, "tenure": 14}
+        response = self.client.post(reverse("create_loan"), data, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.debt(self.customer), Decimal("200000.50"))
+
+    def test_loan_updates_and_deletes_adjust_current_debt(self):
+        loan = self.create_loan(self.customer, Decimal("1000.25"))
+        self.create_loan(self.customer, 500, tenure=6, paid=6)
+        self.assertEqual(self.debt(self.customer), Decimal("1000.25"))
+
+        # Paying the last EMI closes the loan.
+        loan = LoanData.objects.get(pk=loan.pk)
+        loan.emi_paid_on_time = 12
+        loan.save()
+        self.assertEqual(self.debt(self.customer), 0)
+
+        loan.emi_paid_on_time = 11
+        loan.customer_id = self.other
+        loan.save()
+        self.assertEqual(self.debt(self.customer), 0)
+        self.assertEqual(self.debt(self.other), Decimal("1000.25"))
+
+        # A partially loaded loan falls back to recomputing.
+        partial = LoanData.objects.only("loan_id", "customer_id").get(pk=loan.pk)
+        partial.loan_amount = 300
+        partial.save()
+        self.assertEqual(self.debt(self.other), Decimal("300.00"))
+
+        LoanData.objects.get(pk=loan.pk).delete()
+        self.assertEqual(self.debt(self.other), 0)
+
+    def test_imports_keep_current_debt(self):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(LOAN_FILE_HEADERS)
+        sheet.append([self.customer.pk, 9001, 1000, 12, 8.5, 90, 4, datetime(2019, 1, 1), datetime(2020, 1, 1)])
+        sheet.append([self.customer.pk, 9002, 500, 12, 8.5, 45, 12, datetime(2019, 1, 1), datetime(2020, 1, 1)])
+        with tempfile.NamedTemporaryFile(suffix=".xlsx") as loan_file:
+            workbook.save(loan_file.name)
+            inject_loan_data(loan_file.name)
+            inject_loan_data(loan_file.name, restart=True)
+        self.assertEqual(self.debt(self.customer), Decimal("1000.00"))
+
+        # Re-importing the customer does not reset the debt.
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(["Customer ID", "First Name", "Last Name", "Age", "Phone Number", "Monthly Salary", "Approved Limit"])
+        sheet.append([self.customer.pk, "Grace", "Hopper", 40, 8888888888, 100000, 3600000])
+        with tempfile.NamedTemporaryFile(suffix=".xlsx") as customer_file:
+            workbook.save(customer_file.name)
+            inject_customer_data(customer_file.name)
+        self.assertEqual(self.debt(self.customer), Decimal("1000.00"))
+
+    def test_reconcile_current_debt_command(self):
+        self.create_loan(self.customer, 700)
+        self.create_loan(self.other, 300)
+        CustomerData.objects.filter(pk=self.customer.pk).update(current_debt=5)
+
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command("reconcile_current_debt", "--check", stdout=out)
+        self.assertIn(f"Customer {self.customer.pk}: 5.00 stored, 700.00 expected", out.getvalue())
+
+        out = StringIO()
+        call_command("reconcile_current_debt", "--batch-size", "1", stdout=out)
+        self.assertIn("Reconciled the current debt of 2 customers, 1 had drifted.", out.getvalue())
+        self.assertEqual(self.debt(self.customer), Decimal("700.00"))
+        call_command("reconcile_current_debt", "--check", stdout=StringIO())
+
+
+@skipUnless("replica" in settings.DATABASES, "needs a replica database")
+class ReplicaRoutingTestCase(TransactionTestCase):
+    databases = {"default", "replica"} & set(settings.DATABASES)
+
+    def setUp(self):
+        self.client = APIClient()
+        caches["default"].clear()
+        book = SyntheticBook(2, min_loans=2, max_loans=2, seed=21)
+        self.customer_ids, self.loan_ids = insert_book(book)
+
+    def replicate(self):
+        for model in (CustomerData, CreditProfile, LoanData):
+            model.objects.using("replica").all().delete()
+            model.objects.using("replica").bulk_create(model.objects.using("default").all())
+
+    def test_read_only_views_read_from_replica(self):
+        self.replicate()
+        customer_id = self.customer_ids[0]
+        LoanData.objects.filter(customer_id=customer_id).update(loan_amount=1)
+
+        response = self.client.get(reverse("view_loans", kwargs={"customer_id": customer_id}))
+        self.assertNotIn("1.00", [loan["loan_amount"] for loan in response.json()])
+        response = self.client.get(reverse("view_loans", kwargs={"customer_id": customer_id}) + "?stream=1")
+        loans = json.loads(b"".join(response.streaming_content))
+        self.assertNotIn("1.00", [loan["loan_amount"] for loan in loans])
+
+        with CaptureQueriesContext(connections["default"]) as primary, CaptureQueriesContext(
+            connections["replica"]
+        ) as replica:
+            response = self.client.post(
+                reverse("check_eligibility"),
+                {"customer_id": customer_id, "loan_amount": 1000, "interest_rate": 10, "tenure": 12},
+                format="json",
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(primary), 0)
+        self.assertGreater(len(replica), 0)
+
+    async def test_async_views_read_from_replica(self):
+        await sync_to_async(self.replicate)()
+        customer_id = self.customer_ids[0]
+        client = AsyncClient()
+        aliases = []
+        db_for_read = ReplicaRouter.db_for_read
+
+        def record_alias(router, model, **hints):
+            alias = db_for_read(router, model, **hints)
+            aliases.append(alias)
+            return alias
+
+        with mock.patch.object(
+            ReplicaRouter, "db_for_read", autospec=True, side_effect=record_alias
+        ):
+            responses = [
+                await client.post(
+                    reverse("async_check_eligibility"),
+                    {"customer_id": customer_id, "loan_amount": 1000, "interest_rate": 10, "tenure": 12},
+                    content_type="application/json",
+                ),
+                await client.get(reverse("async_view_loan", kwargs={"loan_id": self.loan_ids[0]})),
+                await client.get(reverse("async_view_loans", kwargs={"customer_id": customer_id})),
+            ]
+
+        self.assertEqual([response.status_code for response in responses], [200] * 3)
+        self.assertEqual(set(aliases), {"replica"})
+
+    async def test_async_view_loan_falls_back_to_primary(self):
+        await sync_to_async(self.replicate)()
+        loan_id = self.loan_ids[0]
+        await LoanData.objects.using("replica").filter(pk=loan_id).adelete()
+
+        response = await AsyncClient().get(reverse("async_view_loan", kwargs={"loan_id": loan_id}))
+        self.assertEqual(response.json()[0]["loan_id"], loan_id)
+
+    def test_view_loan_falls_back_to_primary(self):
+        self.replicate()
+        loan = LoanData.objects.using("default").get(pk=self.loan_ids[0])
+        LoanData.objects.using("replica").filter(pk=loan.pk).delete()
+
+        response = self.client.get(reverse("view_loan", kwargs={"loan_id": loan.pk}))
+        self.assertEqual(response.json()[0]["loan_id"], loan.pk)
+
+    def test_create_loan_pins_customer_to_primary(self):
+        self.replicate()
+        customer_id = self.customer_ids[1]
+        response = self.client.post(
+            reverse("create_loan"),
+            {"customer_id": customer_id, "loan_amount": 1000, "interest_rate": 10, "tenure": 12},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(LoanData.objects.using("replica").filter(pk=response.data["loan_id"]).exists())
+
+        url = reverse("view_loans", kwargs={"customer_id": customer_id})
+        self.assertEqual(len(self.client.get(url).json()), 3)
+        caches["default"].clear()
+        self.assertEqual(len(self.client.get(url).json()), 2)
+
+    def test_writes_and_transactions_stay_on_primary(self):
+        router = ReplicaRouter()
+        with replica_reads() as alias:
+            self.assertEqual(alias, "replica")
+            self.assertEqual(router.db_for_read(LoanData), "replica")
+            self.assertEqual(router.db_for_write(LoanData), "default")
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(LoanData), "default")
+                self.assertEqual(LoanData.objects.count(), 4)
+            self.assertEqual(LoanData.objects.count(), 0)
+        self.assertIsNone(router.db_for_read(LoanData))
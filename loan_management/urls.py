@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     path(
@@ -8,11 +8,41 @@ urlpatterns = [
         views.CheckEligibility.as_view(),
         name="check_eligibility",
     ),
+    path(
+        "check-eligibility/batch",
+        views.CheckEligibilityBatch.as_view(),
+        name="check_eligibility_batch",
+    ),
     path("create-loan", views.CreateLoan.as_view(), name="create_loan"),
+    path(
+        "create-loan/bulk",
+        views.CreateLoanBulk.as_view(),
+        name="create_loan_bulk",
+    ),
     path("view-loan/<int:loan_id>", views.ViewLoan.as_view(), name="view_loan"),
+    path(
+        "view-loan/<int:loan_id>/schedule",
+        views.ViewLoanSchedule.as_view(),
+        name="view_loan_schedule",
+    ),
     path(
         "view-loans/<int:customer_id>",
         views.ViewCustomerLoans.as_view(),
         name="view_loans",
     ),
+    path(
+        "async/check-eligibility",
+        async_views.AsyncCheckEligibility.as_view(),
+        name="async_check_eligibility",
+    ),
+    path(
+        "async/view-loan/<int:loan_id>",
+        async_views.AsyncViewLoan.as_view(),
+        name="async_view_loan",
+    ),
+    path(
+        "async/view-loans/<int:customer_id>",
+        async_views.AsyncViewCustomerLoans.as_view(),
+        name="async_view_loans",
+    ),
 ]
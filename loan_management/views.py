@@ -1,25 +1,124 @@
+from collections import defaultdict, deque
 from datetime import date
 from dateutil.relativedelta import relativedelta
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.db.models import Max
+from django.http import StreamingHttpResponse
 
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework import generics
 from rest_framework.response import Response
 
+from config.db_router import replica_reads
+from customer_management.models import CustomerData
+from loan_management import scoring
+from loan_management.idempotency import idempotent, per_item_lock_timeout
+from loan_management.lean import (
+    build_loan,
+    customer_loan_rows,
+    lean_enabled,
+    loan_rows,
+    render_lean,
+)
 from loan_management.models import LoanData
+from loan_management.pagination import (
+    LoanCursorPagination,
+    iter_keyset,
+    stream_json_array,
+)
+from loan_management.schedules import iter_schedule
+from loan_management.tasks import update_loan_customers
 from loan_management.utils import CheckLoanApproval
 from .serializers import (
+    CreateLoanBatchSerializer,
     CreateLoanSerializer,
     ViewCustomerLoanSerializer,
     ViewLoanSerializer,
 )
 
 
+def declined_response(customer_id):
+    """
+    Builds the response to a declined loan application.
+    """
+
+    return {
+        "loan_id": None,
+        "customer_id": customer_id,
+        "loan_approved": False,
+        "message": "Dear customer, Unfortunately we couldn't approve the loan of your current demand.",
+        "monthly_installement": 0.0,
+    }
+
+
+def approved_response(loan_data):
+    """
+    Builds the response to an approved loan application.
+
+    Args:
+        loan_data (dict): The created loan serialized by ``CreateLoanSerializer``.
+    """
+
+    loan_data["loan_approved"] = True
+    loan_data["message"] = (
+        "Congratulations, your loan is approved. Thank you for using our services."
+    )
+    return loan_data
+
+
+def complete_application(serializer, data):
+    """
+    Adds the monthly EMI, repayment count and end date to a validated application.
+
+    Args:
+        serializer (CreateLoanSerializer): The validated application.
+        data (dict): The application as submitted.
+    """
+
+    loan_amount = data["loan_amount"]
+    tenure = data["tenure"]
+    monthly_emi = (
+        (loan_amount * data["interest_rate"] / 100) + loan_amount
+    ) / tenure
+    serializer.validated_data["emi_monthly_repayment"] = monthly_emi
+    serializer.validated_data["emi_paid_on_time"] = 0
+    serializer.validated_data["end_date"] = date.today() + relativedelta(
+        months=tenure
+    )
+
+
+def lock_customers(customer_ids):
+    """
+    Locks customer rows until the surrounding transaction ends.
+
+    Loan creation takes this lock before scoring, so concurrent applications
+    of one customer are decided and inserted one after the other while other
+    customers are not blocked. Rows are locked in primary key order, so
+    transactions locking several customers cannot deadlock.
+
+    Args:
+        customer_ids: IDs of the customers to lock.
+
+    Returns:
+        dict: The locked customers keyed by ID, in ID order.
+    """
+
+    return {
+        customer.customer_id: customer
+        for customer in CustomerData.objects.select_for_update()
+        .filter(customer_id__in=customer_ids)
+        .order_by("customer_id")
+    }
+
+
 class CheckEligibility(APIView):
     """
     API View for checking loan eligibility.
 
     Allows checking the eligibility of a customer for a loan and provides the result.
+    The customer is scored from a replica unless they are pinned to the
+    primary after a recent write (see ``config.db_router``).
 
     Methods:
         post(request, *args, **kwargs): Handles POST requests for checking loan eligibility.
@@ -36,7 +135,8 @@ class CheckEligibility(APIView):
         try:
             data = request.data
             check_loan_ins = CheckLoanApproval(data["customer_id"])
-            result = check_loan_ins.loan_approval()
+            with replica_reads([data["customer_id"]]):
+                result = check_loan_ins.loan_approval()
             response_data = data
             del response_data["loan_amount"]
             response_data.update(result)
@@ -47,11 +147,61 @@ class CheckEligibility(APIView):
             return Response(error_response_data, status=status.HTTP_400_BAD_REQUEST)
 
 
+class CheckEligibilityBatch(APIView):
+    """
+    API View for checking loan eligibility of many customers at once.
+
+    Accepts a list of eligibility requests, loads the credit factors of every
+    referenced customer with grouped queries and scores them in one pass.
+
+    Methods:
+        post(request, *args, **kwargs): Handles POST requests for batch eligibility checks.
+            Returns one result per item, in the same shape as ``CheckEligibility``.
+
+    Returns:
+        Response: A list of per-item eligibility results or an error message.
+    """
+
+    def post(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list):
+            error_response_data = {"error_message": "Expected a list of items."}
+            return Response(error_response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        customer_ids = [
+            item["customer_id"]
+            for item in items
+            if isinstance(item, dict) and isinstance(item.get("customer_id"), (int, str))
+        ]
+        with replica_reads(customer_ids):
+            results = CheckLoanApproval.bulk_loan_approval(customer_ids)
+
+        response_data = []
+        for item in items:
+            try:
+                result = results[item["customer_id"]]
+                if isinstance(result, Exception):
+                    raise result
+                item_response_data = dict(item)
+                del item_response_data["loan_amount"]
+                item_response_data.update(result)
+                response_data.append(item_response_data)
+            except Exception as e:
+                response_data.append({"error_message": str(e)})
+
+        return Response(response_data, status=status.HTTP_200_OK)
+
+
 class CreateLoan(generics.CreateAPIView):
     """
     API View for creating a new loan.
 
     Allows customers to apply for a loan, checks eligibility, and creates a new loan record if approved.
+    The decision and the insert run in one transaction holding a lock on the
+    customer's row, so concurrent applications of a customer cannot both
+    pass the limit and EMI checks.
+    Requests carrying an ``Idempotency-Key`` header are run once; repeats get
+    the stored response (see ``loan_management.idempotency``).
 
     Attributes:
         serializer_class (class): The serializer class for creating a new loan.
@@ -59,6 +209,7 @@ class CreateLoan(generics.CreateAPIView):
     Methods:
         post(request, *args, **kwargs): Handles POST requests for creating a new loan.
             Checks loan eligibility, processes loan creation, and returns the result.
+        create_loan(data): Scores the customer and inserts the loan if approved.
 
     Raises:
         Exception: Any unexpected error during the loan creation process.
@@ -69,85 +220,362 @@ class CreateLoan(generics.CreateAPIView):
 
     serializer_class = CreateLoanSerializer
 
+    @idempotent("create-loan")
     def post(self, request, *args, **kwargs):
         try:
             data = request.data
-            check_loan_ins = CheckLoanApproval(data["customer_id"])
-            result = check_loan_ins.loan_approval()
-            result["customer_id"] = data["customer_id"]
-
-            if not result["approval"]:
-                response_data = {
-                    "loan_id": None,
-                    "customer_id": result["customer_id"],
-                    "loan_approved": result["approval"],
-                    "message": "Dear customer, Unfortunately we couldn't approve the loan of your current demand.",
-                    "monthly_installement": 0.0,
-                }
-                return Response(response_data, status=status.HTTP_200_OK)
-
-            serializer = self.get_serializer(data=data)
-            serializer.is_valid(raise_exception=True)
-
-            loan_amount = data["loan_amount"]
-            tenure = data["tenure"]
-            monthly_emi = (
-                (loan_amount * data["interest_rate"] / 100) + loan_amount
-            ) / tenure
-            serializer.validated_data["emi_monthly_repayment"] = monthly_emi
-            serializer.validated_data["emi_paid_on_time"] = 0
-            serializer.validated_data["end_date"] = date.today() + relativedelta(
-                months=tenure
-            )
+            with transaction.atomic():
+                lock_customers([data["customer_id"]])
+                response_data, status_code = self.create_loan(data)
+            return Response(response_data, status=status_code)
+        except Exception as e:
+            error_response_data = {"error_message": str(e)}
+            return Response(error_response_data, status=status.HTTP_400_BAD_REQUEST)
 
-            self.perform_create(serializer)
-            response = serializer.data
-            response["loan_approved"] = result["approval"]
-            response["message"] = (
-                "Congratulations, your loan is approved. Thank you for using our services."
-            )
+    def create_loan(self, data):
+        """
+        Scores the customer and creates the loan if approved.
+
+        Must run in a transaction holding the customer's ``lock_customers``
+        lock, so no other loan of the customer is created between the
+        decision and the insert.
+
+        Args:
+            data (dict): The loan application.
+
+        Returns:
+            tuple: The response data and status code.
+        """
+
+        check_loan_ins = CheckLoanApproval(data["customer_id"])
+        result = check_loan_ins.loan_approval(use_snapshot=False, use_cache=False)
+
+        if not result["approval"]:
+            return declined_response(data["customer_id"]), status.HTTP_200_OK
+
+        serializer = self.get_serializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        complete_application(serializer, data)
+
+        self.perform_create(serializer)
+        return approved_response(serializer.data), status.HTTP_201_CREATED
+
+
+class CreateLoanBulk(APIView):
+    """
+    API View for creating many loans at once.
+
+    Accepts a list of loan applications in the shape ``CreateLoan`` takes and
+    processes them in batches of ``batch_size``, all in one transaction that
+    locks every affected customer up front. Each batch reads the credit
+    factors of its customers with grouped queries and scores them with the
+    vectorized engine. Applications of the same customer are decided in
+    order, each seeing the loans approved before it, so the results match
+    posting them to ``CreateLoan`` one by one. Approved loans are inserted
+    with a single ``bulk_create`` per batch. Requests carrying an
+    ``Idempotency-Key`` header are run once; a request that fails part way
+    leaves no loans behind, so it can be retried with the same key.
+
+    Attributes:
+        batch_size (int): Number of applications per batch.
+
+    Methods:
+        post(request, *args, **kwargs): Handles POST requests for bulk loan creation.
+            Returns one result per application, in the shape of ``CreateLoan``'s responses.
+        lock_all_customers(items): Locks the customers of every application.
+        create_batch(items): Decides and creates the loans of one batch.
+        insert_loans(loans): Inserts approved loans and updates their customers.
+
+    Raises:
+        Exception: Any unexpected error during bulk loan creation, which rolls
+            back every loan of the request.
+
+    Returns:
+        Response: A list of per-application results or an error message.
+    """
 
-            return Response(response, status=status.HTTP_201_CREATED)
+    batch_size = 1000
+
+    @idempotent("create-loan-bulk", lock_timeout=per_item_lock_timeout)
+    def post(self, request, *args, **kwargs):
+        items = request.data
+        if not isinstance(items, list):
+            error_response_data = {"error_message": "Expected a list of items."}
+            return Response(error_response_data, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            response_data = []
+            with transaction.atomic():
+                self.lock_all_customers(items)
+                for start in range(0, len(items), self.batch_size):
+                    response_data += self.create_batch(items[start : start + self.batch_size])
+            return Response(response_data, status=status.HTTP_200_OK)
         except Exception as e:
             error_response_data = {"error_message": str(e)}
             return Response(error_response_data, status=status.HTTP_400_BAD_REQUEST)
 
+    def lock_all_customers(self, items):
+        """
+        Locks the customers of every application in primary key order.
+
+        The batches lock their own customers again, but taking every lock
+        first keeps the locking order of the whole request sorted, so
+        concurrent bulk requests cannot deadlock.
+
+        Args:
+            items (list): Loan applications.
+        """
+
+        to_pk = CustomerData._meta.pk.to_python
+        customer_ids = set()
+        for item in items:
+            try:
+                customer_ids.add(to_pk(item["customer_id"]))
+            except Exception:
+                # Reported per application by create_batch.
+                continue
+        customer_ids = sorted(customer_ids)
+        for start in range(0, len(customer_ids), self.batch_size):
+            lock_customers(customer_ids[start : start + self.batch_size])
+
+    def create_batch(self, items):
+        """
+        Decides and creates the loans of one batch of applications.
+
+        Must run in a transaction, which holds the customers' locks until the
+        request's loans are inserted.
+
+        Args:
+            items (list): Loan applications.
+
+        Returns:
+            list: One result per application.
+        """
+
+        results = [None] * len(items)
+        to_pk = CustomerData._meta.pk.to_python
+        queues = {}
+        for index, item in enumerate(items):
+            try:
+                queues.setdefault(to_pk(item["customer_id"]), deque()).append(index)
+            except Exception as e:
+                results[index] = {"error_message": str(e)}
+
+        customers = lock_customers(list(queues))
+        bulk_factors = CheckLoanApproval.get_bulk_credit_factors(list(customers))
+        for customer_id in [pk for pk in queues if pk not in bulk_factors]:
+            for index in queues.pop(customer_id):
+                results[index] = {
+                    "error_message": "CustomerData matching query does not exist."
+                }
+
+        approved = []
+        while queues:
+            # Each round decides the next application of every customer, so
+            # later applications see the loans approved in earlier rounds.
+            current = [(pk, queue.popleft()) for pk, queue in queues.items()]
+            queues = {pk: queue for pk, queue in queues.items() if queue}
+            decisions = scoring.loan_decisions([bulk_factors[pk] for pk, _ in current])
+            for (customer_id, index), decision in zip(current, decisions):
+                data = items[index]
+                factors = bulk_factors[customer_id]
+                try:
+                    if decision is None:
+                        # Raises the error CreateLoan reports for tier boundaries.
+                        decision = CheckLoanApproval(customer_id).loan_approval(factors)
+                    if not decision["approval"]:
+                        results[index] = declined_response(data["customer_id"])
+                        continue
+
+                    serializer = CreateLoanBatchSerializer(
+                        data=data, context={"customers": customers}
+                    )
+                    serializer.is_valid(raise_exception=True)
+                    complete_application(serializer, data)
+                    loan = LoanData(**serializer.validated_data)
+                except Exception as e:
+                    results[index] = {"error_message": str(e)}
+                    continue
+                CheckLoanApproval.add_loan_to_factors(factors, loan)
+                approved.append((index, loan))
+
+        self.insert_loans([loan for _, loan in approved])
+        for index, loan in approved:
+            results[index] = approved_response(CreateLoanSerializer(loan).data)
+        return results
+
+    def insert_loans(self, loans):
+        """
+        Inserts approved loans with one ``bulk_create`` and sets their IDs.
+
+        ``bulk_create`` skips model signals, so credit profiles, current debt
+        and cached decisions are brought up to date afterwards. Backends that
+        cannot return the IDs of inserted rows, such as MySQL, read them back:
+        the customers are locked, so their loans above the previous highest
+        ID are the ones just inserted, in insert order.
+
+        Args:
+            loans (list): Unsaved loans.
+        """
+
+        if not loans:
+            return
+        last_id = None
+        if not connection.features.can_return_rows_from_bulk_insert:
+            last_id = LoanData.objects.aggregate(last_id=Max("loan_id"))["last_id"] or 0
+
+        LoanData.objects.bulk_create(loans)
+
+        if last_id is not None:
+            loan_ids = defaultdict(deque)
+            for customer_id, loan_id in (
+                LoanData.objects.filter(
+                    customer_id__in={loan.customer_id_id for loan in loans},
+                    loan_id__gt=last_id,
+                )
+                .order_by("loan_id")
+                .values_list("customer_id", "loan_id")
+            ):
+                loan_ids[customer_id].append(loan_id)
+            for loan in loans:
+                loan.loan_id = loan_ids[loan.customer_id_id].popleft()
+        update_loan_customers(loans)
+
 
 class ViewLoan(generics.ListAPIView):
     """
     API View for viewing loan details.
 
-    Allows retrieving details of a specific loan.
+    Allows retrieving details of a specific loan. The customer is fetched
+    in the same query through a join. The loan is read from a replica, and
+    from the primary when the replica does not have it yet. JSON responses
+    are built from ``.values()`` rows (see ``loan_management.lean``).
 
     Attributes:
         serializer_class (class): The serializer class for viewing loan details.
 
     Methods:
         get_queryset(): Returns the queryset of loan data for the specified loan ID.
+        list_data(lean): Returns the loans as lean rows or serializer data.
     """
 
     serializer_class = ViewLoanSerializer
 
     def get_queryset(self):
-        queryset = LoanData.objects.filter(loan_id=self.kwargs.get("loan_id"))
+        queryset = LoanData.objects.select_related("customer_id").filter(
+            loan_id=self.kwargs.get("loan_id")
+        )
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        lean = lean_enabled(request)
+        with replica_reads() as alias:
+            data = self.list_data(lean)
+        if not data and alias != DEFAULT_DB_ALIAS:
+            # A loan created moments ago may not have reached the replica yet.
+            data = self.list_data(lean)
+        if lean:
+            return render_lean(request, data)
+        return Response(data)
+
+    def list_data(self, lean):
+        queryset = self.filter_queryset(self.get_queryset())
+        if lean:
+            return [build_loan(row) for row in loan_rows(queryset)]
+        return self.get_serializer(queryset, many=True).data
+
 
 class ViewCustomerLoans(generics.ListAPIView):
     """
     API View for viewing customer's loans.
 
     Allows retrieving details of loans associated with a specific customer.
+    Without query parameters every loan is returned in one list. Passing
+    ``page_size`` or ``cursor`` switches to keyset pagination on ``loan_id``,
+    and ``stream=1`` streams the full list as it is read from the database.
+    Loans are read from a replica unless the customer is pinned to the
+    primary after a recent write (see ``config.db_router``). The full list
+    is built from ``.values()`` rows (see ``loan_management.lean``).
 
     Attributes:
         serializer_class (class): The serializer class for viewing customer's loan details.
+        pagination_class (class): Opt-in keyset pagination.
+        stream_batch_size (int): Number of loans fetched per query when streaming.
 
     Methods:
         get_queryset(): Returns the queryset of loan data for the specified customer ID.
+        stream(using): Streams every loan of the customer as a JSON array.
     """
 
     serializer_class = ViewCustomerLoanSerializer
+    pagination_class = LoanCursorPagination
+    stream_batch_size = 1000
 
     def get_queryset(self):
-        queryset = LoanData.objects.filter(customer_id=self.kwargs.get("customer_id"))
+        queryset = LoanData.objects.filter(
+            customer_id=self.kwargs.get("customer_id")
+        ).order_by("loan_id")
         return queryset
+
+    def list(self, request, *args, **kwargs):
+        with replica_reads([self.kwargs.get("customer_id")]) as alias:
+            if request.query_params.get("stream") in ("1", "true"):
+                return self.stream(alias)
+            if lean_enabled(request) and not self.paginator.is_requested(request):
+                loans = list(customer_loan_rows(self.get_queryset()))
+                return render_lean(request, loans)
+            return super().list(request, *args, **kwargs)
+
+    def stream(self, using=None):
+        # The stream is read after the view returns, so the alias is bound here.
+        loans = iter_keyset(
+            self.get_queryset().using(using), "loan_id", self.stream_batch_size
+        )
+        serializer_class = self.get_serializer_class()
+        items = (serializer_class(loan).data for loan in loans)
+        return StreamingHttpResponse(
+            stream_json_array(items), content_type="application/json"
+        )
+
+
+class ViewLoanSchedule(APIView):
+    """
+    API View for viewing a loan's amortization schedule.
+
+    Installments are generated lazily and streamed as a JSON array, so long
+    tenures are never built in memory. Amounts are rendered as strings, like
+    the other loan views render decimals.
+
+    Methods:
+        get(request, loan_id, *args, **kwargs): Streams the loan's installments.
+
+    Returns:
+        StreamingHttpResponse: The installments, or an error message if the
+        loan does not exist.
+    """
+
+    def get(self, request, loan_id, *args, **kwargs):
+        loan = (
+            LoanData.objects.filter(loan_id=loan_id)
+            .only("loan_amount", "interest_rate", "tenure", "start_date")
+            .first()
+        )
+        if loan is None:
+            return Response(
+                {"error_message": "Loan not found."}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        items = (
+            {
+                "installment": installment["installment"],
+                "due_date": installment["due_date"].isoformat(),
+                "payment": str(installment["payment"]),
+                "principal": str(installment["principal"]),
+                "interest": str(installment["interest"]),
+                "balance": str(installment["balance"]),
+            }
+            for installment in iter_schedule(loan)
+        )
+        return StreamingHttpResponse(
+            stream_json_array(items), content_type="application/json"
+        )